@@ -1,40 +1,205 @@
-import redis
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 from app.config import get_settings
+from typing import Dict, Optional
+from loguru import logger
+import asyncio
+import time
 
 settings = get_settings()
 
-# Try to connect to Redis, but make it optional
-# Skip if REDIS_URL is empty or not set
+# Circuit breaker states
+CLOSED = "closed"        # Healthy: callers use Redis
+OPEN = "open"            # Failing: callers go straight to their fallback
+HALF_OPEN = "half_open"  # Probing whether Redis is back
+
+# Created by init_redis() during app startup, so importing this module never
+# touches the network. Both stay None if Redis is not configured.
+redis_pool = None
 redis_client = None
-REDIS_AVAILABLE = False
 
-if settings.REDIS_URL and settings.REDIS_URL.strip():
+_state = OPEN
+_consecutive_failures = 0
+_probe_delay = 0.0
+_monitor_task: Optional[asyncio.Task] = None
+
+# Exposed through /health
+_metrics: Dict = {
+    "state": OPEN,
+    "state_changed_at": None,
+    "transitions": {CLOSED: 0, OPEN: 0, HALF_OPEN: 0},
+    "checks": 0,
+    "failures": 0,
+    "last_error": None,
+}
+
+
+def _record_command_error(error: Exception):
+    """Count a command's connection failure; an exhausted pool says nothing about the server's health"""
+    if not str(error).startswith("Too many connections"):
+        record_redis_failure(error)
+
+
+def _record_command_success():
+    """A command succeeded, so earlier failures weren't consecutive"""
+    global _consecutive_failures
+    _consecutive_failures = 0
+
+
+class _MonitoredPipeline(redis.client.Pipeline):
+    """Pipeline whose execute() feeds the circuit breaker like a single command"""
+    
+    async def execute(self, raise_on_error: bool = True):
+        try:
+            result = await super().execute(raise_on_error)
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            _record_command_error(e)
+            raise
+        _record_command_success()
+        return result
+
+
+class _MonitoredRedis(redis.Redis):
+    """Client that reports the outcome of every command and pipeline to the circuit breaker"""
+    
+    async def execute_command(self, *args, **options):
+        try:
+            result = await super().execute_command(*args, **options)
+        except (RedisConnectionError, RedisTimeoutError) as e:
+            _record_command_error(e)
+            raise
+        _record_command_success()
+        return result
+    
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> _MonitoredPipeline:
+        return _MonitoredPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def _set_state(state: str):
+    """Move the breaker to a new state and record the transition"""
+    global _state
+    if state == _state:
+        return
+    logger.log("INFO" if state == CLOSED else "WARNING", f"Redis circuit {_state} -> {state}")
+    _state = state
+    _metrics["state"] = state
+    _metrics["state_changed_at"] = time.time()
+    _metrics["transitions"][state] += 1
+
+
+def record_redis_failure(error: Exception):
+    """Count a failed Redis call; enough consecutive failures open the circuit"""
+    global _consecutive_failures, _probe_delay
+    _consecutive_failures += 1
+    _metrics["failures"] += 1
+    _metrics["last_error"] = str(error)
+    if _state == HALF_OPEN or (_state == CLOSED and _consecutive_failures >= settings.REDIS_FAILURE_THRESHOLD):
+        # Back off further each time a probe fails
+        _probe_delay = min(max(_probe_delay * 2, settings.REDIS_PROBE_MIN_SECONDS), settings.REDIS_PROBE_MAX_SECONDS)
+        _set_state(OPEN)
+
+
+def _record_success():
+    """A health check passed: close the circuit and reset the backoff"""
+    global _consecutive_failures, _probe_delay
+    _consecutive_failures = 0
+    _probe_delay = 0.0
+    _set_state(CLOSED)
+
+
+async def _check() -> bool:
+    """Ping Redis with a bounded wait"""
+    _metrics["checks"] += 1
     try:
-        redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-        # Test connection
-        redis_client.ping()
-        REDIS_AVAILABLE = True
-        print("[INFO] Redis connected successfully.")
+        await asyncio.wait_for(redis_client.ping(), timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS)
     except Exception as e:
-        print(f"[WARNING] Redis not available: {e}. Running without Redis cache.")
-        redis_client = None
-        REDIS_AVAILABLE = False
-else:
-    print("[INFO] REDIS_URL not set. Running without Redis cache.")
+        # Connection errors were already counted by the client
+        if not isinstance(e, (RedisConnectionError, RedisTimeoutError)):
+            record_redis_failure(e)
+        return False
+    _record_success()
+    return True
+
+
+async def _monitor():
+    """Ping Redis periodically while healthy and probe with exponential backoff while open"""
+    while True:
+        try:
+            if _state == CLOSED:
+                await asyncio.sleep(settings.REDIS_HEALTH_INTERVAL_SECONDS)
+                await _check()
+            else:
+                await asyncio.sleep(_probe_delay)
+                _set_state(HALF_OPEN)
+                await _check()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Redis health monitor error: {e}")
+            await asyncio.sleep(settings.REDIS_HEALTH_INTERVAL_SECONDS)
+
+
+async def init_redis():
+    """Create the connection pool and client and start the health monitor"""
+    global redis_pool, redis_client, _monitor_task, _probe_delay
+    
+    # Redis is optional: skip if REDIS_URL is empty or not set
+    if not settings.REDIS_URL or not settings.REDIS_URL.strip():
+        print("[INFO] REDIS_URL not set. Running without Redis cache.")
+        return
+    
+    redis_pool = redis.ConnectionPool.from_url(
+        settings.REDIS_URL,
+        decode_responses=True,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        health_check_interval=30
+    )
+    redis_client = _MonitoredRedis(connection_pool=redis_pool)
+    
+    # Test connection; if Redis is down the monitor keeps probing and closes the circuit once it is back
+    if await _check():
+        print("[INFO] Redis connected successfully.")
+    else:
+        print(f"[WARNING] Redis not available: {_metrics['last_error']}. Running without Redis cache.")
+        _probe_delay = settings.REDIS_PROBE_MIN_SECONDS
+    _monitor_task = asyncio.create_task(_monitor())
+
+
+async def close_redis():
+    """Stop the health monitor and close every pooled connection"""
+    global redis_pool, redis_client, _monitor_task
+    if _monitor_task is not None:
+        _monitor_task.cancel()
+        await asyncio.gather(_monitor_task, return_exceptions=True)
+        _monitor_task = None
+    _set_state(OPEN)
+    if redis_client is not None:
+        await redis_client.aclose()
+    if redis_pool is not None:
+        await redis_pool.disconnect()
+    redis_client = None
+    redis_pool = None
 
 
 def get_redis():
-    """Get Redis client (may be None if Redis is unavailable)"""
+    """Get the asyncio Redis client (None if Redis is not configured).
+    
+    Use get_redis().pipeline() to batch multi-key operations into one round-trip.
+    """
     return redis_client
 
 
 def is_redis_available():
-    """Check if Redis is available"""
-    if not REDIS_AVAILABLE or redis_client is None:
-        return False
-    try:
-        redis_client.ping()
-        return True
-    except:
-        return False
+    """Whether the circuit is closed; an in-memory check, so callers fail fast to their fallback"""
+    return _state == CLOSED and redis_client is not None
+
 
+def get_redis_health() -> Dict:
+    """Circuit state and health-check counters"""
+    return {
+        **_metrics,
+        "transitions": dict(_metrics["transitions"]),
+        "probe_backoff_seconds": _probe_delay if _state != CLOSED else None
+    }
@@ -1,14 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from slowapi.errors import RateLimitExceeded
-from slowapi import Limiter, _rate_limit_exceeded_handler
 from app.config import get_settings
 from app.database.postgres import engine, Base
 from app.database.mongo import connect_to_mongo, close_mongo_connection
+from app.database.redis import init_redis, close_redis, get_redis_health
 from app.middleware.logging import log_requests
-from app.middleware.rate_limiter import limiter
-from app.routes import auth, posts, comments, users, admin, chapters, bookmarks, reading_progress, feed
+from app.utils.process_pool import shutdown_analytics_executor
+from app.services.analytics_jobs import start_analytics_workers, stop_analytics_workers
+from app.services.rollup_service import rollup_scheduler
+from app.services.email_outbox import start_email_sender, stop_email_sender
+from app.routes import auth, posts, comments, users, admin, chapters, bookmarks, reading_progress, feed, analytics, leaderboards, books
+import asyncio
 import uvicorn
 
 settings = get_settings()
@@ -35,10 +38,6 @@ app.add_middleware(
 # Request logging
 app.middleware("http")(log_requests)
 
-# Rate limiting (configured but not actively used in all routes)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # Include routers
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX)
 app.include_router(posts.router, prefix=settings.API_V1_PREFIX)
@@ -46,9 +45,12 @@ app.include_router(comments.router, prefix=settings.API_V1_PREFIX)
 app.include_router(users.router, prefix=settings.API_V1_PREFIX)
 app.include_router(admin.router, prefix=settings.API_V1_PREFIX)
 app.include_router(chapters.router, prefix=settings.API_V1_PREFIX)
+app.include_router(books.router, prefix=settings.API_V1_PREFIX)
 app.include_router(bookmarks.router, prefix=settings.API_V1_PREFIX)
 app.include_router(reading_progress.router, prefix=settings.API_V1_PREFIX)
 app.include_router(feed.router, prefix=settings.API_V1_PREFIX)
+app.include_router(analytics.router, prefix=settings.API_V1_PREFIX)
+app.include_router(leaderboards.router, prefix=settings.API_V1_PREFIX)
 
 
 @app.on_event("startup")
@@ -59,12 +61,31 @@ async def startup_event():
     
     # Connect to MongoDB
     await connect_to_mongo()
+    
+    # Connect to Redis (optional)
+    await init_redis()
+    
+    # Start consuming analytics jobs
+    start_analytics_workers()
+    
+    # Deliver queued emails in the background
+    start_email_sender()
+    
+    # Keep the daily rollups current
+    app.state.rollup_task = asyncio.create_task(rollup_scheduler())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connections"""
+    await stop_analytics_workers()
+    await stop_email_sender()
+    app.state.rollup_task.cancel()
     await close_mongo_connection()
+    await close_redis()
+    
+    # Stop analytics worker processes
+    shutdown_analytics_executor()
 
 
 @app.get("/")
@@ -79,8 +100,12 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+    """Health check endpoint; Redis is optional, so an open circuit degrades rather than fails"""
+    redis_health = get_redis_health()
+    return {
+        "status": "healthy" if redis_health["state"] == "closed" else "degraded",
+        "redis": redis_health
+    }
 
 
 if __name__ == "__main__":
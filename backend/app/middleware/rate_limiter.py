@@ -1,5 +1,202 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+"""
+Rate limiting shared by every app process.
 
-limiter = Limiter(key_func=get_remote_address)
+Each policy allows `limit` requests per `window` seconds per client (the
+user for authenticated routes, otherwise the client IP), counted with a
+sliding-window counter: the current fixed window's count plus the previous
+window's count weighted by how much of it still overlaps the sliding
+window. The check-and-increment is one Lua script call in Redis; while the
+Redis circuit is open, each process limits on its own with the same
+algorithm in memory. Rejected requests get 429 with a Retry-After header.
 
+Behind a reverse proxy the client IP comes from X-Forwarded-For, but only
+when the connection comes from one of TRUSTED_PROXIES; otherwise anyone
+could pick their own rate-limit key by sending the header.
+"""
+from fastapi import Depends, HTTPException, Request, status
+from app.config import get_settings
+from app.database.redis import get_redis, is_redis_available
+from app.services.principal_cache import Principal
+from app.utils.dependencies import get_current_principal
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+from loguru import logger
+import ipaddress
+import math
+import time
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """At most `limit` requests per `window` seconds per user or client IP"""
+    name: str
+    limit: int
+    window: int
+    per_user: bool = False
+
+
+POLICIES: Dict[str, RateLimitPolicy] = {
+    policy.name: policy for policy in (
+        RateLimitPolicy("login", limit=10, window=60),
+        RateLimitPolicy("register", limit=5, window=60 * 60),
+        RateLimitPolicy("token_refresh", limit=30, window=60),
+        RateLimitPolicy("password_reset", limit=5, window=60 * 60),
+        RateLimitPolicy("comment", limit=20, window=60, per_user=True),
+        RateLimitPolicy("engagement", limit=120, window=60, per_user=True),
+    )
+}
+
+# KEYS: current window, previous window. ARGV: limit, previous window weight, key TTL (ms).
+# Returns {allowed, current count, previous count}; only allowed requests are counted.
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[2]) + current >= tonumber(ARGV[1]) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[3])
+end
+return {1, current, previous}
+"""
+
+_script = None
+_script_client = None
+
+# In-process fallback: (policy, client, window index) -> count
+_local_counts: Dict[Tuple[str, str, int], int] = {}
+_local_pruned_at = 0.0
+
+
+def _retry_after(policy: RateLimitPolicy, current: int, previous: int, elapsed: float) -> int:
+    """Seconds until the sliding-window estimate drops back under the limit"""
+    window = policy.window
+    if current < policy.limit and previous:
+        # Wait for enough of the previous window to slide out
+        wait = window * (1 - (policy.limit - current) / previous) - elapsed
+    else:
+        # Only the next window helps, once this one has partly slid out too
+        wait = (window - elapsed) + max(0.0, window * (1 - policy.limit / max(current, 1)))
+    return max(1, math.ceil(wait))
+
+
+def _prune_local(now: float):
+    """Drop fallback counters of windows that can no longer affect a decision"""
+    global _local_pruned_at
+    if now - _local_pruned_at < 60:
+        return
+    _local_pruned_at = now
+    for key in [key for key in _local_counts if key[2] < int(now // POLICIES[key[0]].window) - 1]:
+        del _local_counts[key]
+
+
+def _check_local(policy: RateLimitPolicy, client: str, window_index: int, weight: float) -> Tuple[bool, int, int]:
+    """Sliding-window check in process memory"""
+    current_key = (policy.name, client, window_index)
+    current = _local_counts.get(current_key, 0)
+    previous = _local_counts.get((policy.name, client, window_index - 1), 0)
+    if previous * weight + current >= policy.limit:
+        return False, current, previous
+    _local_counts[current_key] = current + 1
+    return True, current + 1, previous
+
+
+async def _check_redis(policy: RateLimitPolicy, client: str, window_index: int, weight: float) -> Tuple[bool, int, int]:
+    """Sliding-window check shared through Redis"""
+    global _script, _script_client
+    redis_client = get_redis()
+    if _script is None or _script_client is not redis_client:
+        # Runs with EVALSHA, loading the script on first use
+        _script = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+        _script_client = redis_client
+    
+    # The hash tag keeps both windows in one cluster slot
+    prefix = f"ratelimit:{{{policy.name}:{client}}}"
+    allowed, current, previous = await _script(
+        keys=[f"{prefix}:{window_index}", f"{prefix}:{window_index - 1}"],
+        args=[policy.limit, weight, policy.window * 2000]
+    )
+    return bool(allowed), int(current), int(previous)
+
+
+async def check_rate_limit(policy: RateLimitPolicy, client: str):
+    """Count a request against a policy, raising 429 when the client is over the limit"""
+    now = time.time()
+    window_index = int(now // policy.window)
+    elapsed = now - window_index * policy.window
+    weight = 1 - elapsed / policy.window
+    
+    result = None
+    if is_redis_available():
+        try:
+            result = await _check_redis(policy, client, window_index, weight)
+        except Exception as e:
+            logger.warning(f"Rate limit check failed in Redis, limiting locally: {e}")
+    if result is None:
+        _prune_local(now)
+        result = _check_local(policy, client, window_index, weight)
+    
+    allowed, current, previous = result
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please try again later",
+            headers={
+                "Retry-After": str(_retry_after(policy, current, previous, elapsed)),
+                "X-RateLimit-Limit": str(policy.limit),
+            }
+        )
+
+
+@lru_cache()
+def _trusted_networks(trusted_proxies: str) -> Tuple:
+    """Parsed TRUSTED_PROXIES"""
+    return tuple(
+        ipaddress.ip_network(entry.strip(), strict=False)
+        for entry in trusted_proxies.split(",") if entry.strip()
+    )
+
+
+def _is_trusted_proxy(address: Optional[str]) -> bool:
+    """Whether an address belongs to a configured reverse proxy"""
+    try:
+        ip = ipaddress.ip_address((address or "").strip())
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_networks(settings.TRUSTED_PROXIES))
+
+
+def get_client_ip(request: Request) -> str:
+    """Client address of the request, looking through trusted reverse proxies"""
+    peer = request.client.host if request.client else None
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if not peer or not forwarded_for or not _is_trusted_proxy(peer):
+        return peer or "unknown"
+    
+    # Each proxy appends the address it received the request from: the
+    # client is the rightmost hop that isn't one of our proxies
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+
+def rate_limit(policy_name: str) -> Callable:
+    """Route dependency enforcing a policy, e.g. dependencies=[Depends(rate_limit("login"))]"""
+    policy = POLICIES[policy_name]
+    
+    if policy.per_user:
+        async def limit_user(current_user: Principal = Depends(get_current_principal)):
+            if settings.RATE_LIMIT_ENABLED:
+                await check_rate_limit(policy, f"user:{current_user.id}")
+        return limit_user
+    
+    async def limit_ip(request: Request):
+        if settings.RATE_LIMIT_ENABLED:
+            await check_rate_limit(policy, f"ip:{get_client_ip(request)}")
+    return limit_ip
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.database.postgres import Base
+
+
+class AuthorStats(Base):
+    __tablename__ = "author_stats"
+    
+    # Counters over the author's public posts, maintained as posts and engagement change
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    post_count = Column(Integer, nullable=False, default=0)
+    posts_by_type = Column(JSONB, nullable=False, default=dict)  # content_type -> count
+    total_likes = Column(Integer, nullable=False, default=0)
+    total_claps = Column(Integer, nullable=False, default=0)
+    total_comments = Column(Integer, nullable=False, default=0)
+    current_streak = Column(Integer, nullable=False, default=0)  # Consecutive UTC days ending at last_post_date
+    longest_streak = Column(Integer, nullable=False, default=0)
+    last_post_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
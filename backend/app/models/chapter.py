@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database.postgres import Base
@@ -10,11 +10,16 @@ class Chapter(Base):
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
     title = Column(String, nullable=False)
-    order = Column(Integer, nullable=False)  # Chapter order in the book
+    order = Column(Integer, nullable=False)  # Sort key within the book, spaced apart so inserts touch one row
     mongo_id = Column(String, nullable=False)  # Reference to MongoDB document for chapter content
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationship
     post = relationship("Post", backref="chapters")
+    
+    __table_args__ = (
+        # Deferred so a reorder can permute keys within one statement or transaction
+        UniqueConstraint("post_id", "order", name="uq_chapters_post_order", deferrable=True, initially="DEFERRED"),
+    )
 
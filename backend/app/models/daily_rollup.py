@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Date, BigInteger, DateTime
+from sqlalchemy.sql import func
+from app.database.postgres import Base
+
+
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+    
+    # One row per day, metric and dimension (e.g. posts per content type); "" when undivided
+    day = Column(Date, primary_key=True)
+    metric = Column(String, primary_key=True)
+    dimension = Column(String, primary_key=True, default="")
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database.postgres import Base
+
+
+class DigestDelivery(Base):
+    __tablename__ = "digest_deliveries"
+    
+    # Checkpoint of a digest run: one row per recipient, written before their batch is sent
+    digest_key = Column(String, primary_key=True)  # ISO week the digest covers, e.g. "2026-W42"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String, nullable=False, default="sending")  # sending, sent, failed
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from app.database.postgres import Base
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    
+    # Written by requests, delivered by the background sender in app/services/email_outbox.py
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # e.g. "welcome", "password_reset"
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_content = Column(Text, nullable=False)  # Cleared once settled: it may hold a live reset token
+    status = Column(String, nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # Lease expiry while sending
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # The sender's claim query: due rows that are pending or whose sending lease expired
+    __table_args__ = (Index("ix_email_outbox_due", "status", "next_attempt_at"),)
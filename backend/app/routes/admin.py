@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from app.database.postgres import get_db
 from app.schemas.user_schema import UserResponse
@@ -8,14 +8,25 @@ from app.models.user import User
 from app.models.post import Post
 from app.models.comment import Comment
 from app.utils.dependencies import get_current_admin
+from app.services.principal_cache import Principal, invalidate_principal
 from app.services.post_service import delete_post
+from app.services.analytics_cache import invalidate_user_analytics
+from app.services.rollup_service import (
+    METRICS, MAX_RANGE_DAYS, get_timeseries, get_metric_totals, utc_today,
+    METRIC_NEW_USERS, METRIC_POSTS, METRIC_COMMENTS
+)
+from app.services.author_stats_service import increment_author_stats
+from app.services.leaderboard_service import get_top_authors, get_top_posts
+from app.services.export_service import start_export_job, get_export_job
+from typing import Optional
+from datetime import date, timedelta
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
 @router.get("/users", response_model=list[UserResponse])
 async def get_all_users(
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Get all users (admin only)"""
@@ -26,7 +37,7 @@ async def get_all_users(
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Delete user (admin only)"""
@@ -45,12 +56,13 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    await invalidate_principal(user_id)
     return None
 
 
 @router.get("/posts", response_model=list[PostResponse])
 async def get_all_posts(
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Get all posts (admin only)"""
@@ -61,7 +73,7 @@ async def get_all_posts(
 @router.delete("/posts/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def admin_delete_post(
     post_id: int,
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Delete any post (admin only)"""
@@ -73,13 +85,15 @@ async def admin_delete_post(
             detail="Post not found"
         )
     
+    author_id = post.author_id
     await delete_post(db, post)
+    await invalidate_user_analytics(author_id)
     return None
 
 
 @router.get("/comments", response_model=list[CommentResponse])
 async def get_all_comments(
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Get all comments (admin only)"""
@@ -92,7 +106,7 @@ async def get_all_comments(
 @router.delete("/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def admin_delete_comment(
     comment_id: int,
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Delete any comment (admin only)"""
@@ -103,19 +117,24 @@ async def admin_delete_comment(
             detail="Comment not found"
         )
     
+    comment_author_id = comment.author_id
+    post_author_id = comment.post.author_id if comment.post else None
+    post_is_public = comment.post is not None and comment.post.visibility == "public"
     db.delete(comment)
     db.commit()
+    await invalidate_user_analytics(comment_author_id, post_author_id)
+    if post_is_public:
+        increment_author_stats(db, post_author_id, comments=-1)
     return None
 
 
 @router.get("/stats")
 async def get_admin_stats(
-    current_admin: User = Depends(get_current_admin),
+    current_admin: Principal = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
     """Get admin statistics with analytics"""
     from sqlalchemy import func
-    from datetime import datetime, timedelta
     
     total_users = db.query(User).count()
     total_posts = db.query(Post).count()
@@ -126,23 +145,20 @@ async def get_admin_stats(
     total_likes = db.query(func.sum(Post.likes_count)).scalar() or 0
     total_claps = db.query(func.sum(Post.claps_count)).scalar() or 0
     
-    # Recent activity (last 7 days)
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    recent_users = db.query(User).filter(User.created_at >= seven_days_ago).count()
-    recent_posts = db.query(Post).filter(Post.created_at >= seven_days_ago).count()
-    recent_comments = db.query(Comment).filter(Comment.created_at >= seven_days_ago).count()
+    # Recent activity (last 7 days, from the daily rollups)
+    today = utc_today()
+    recent = get_metric_totals(db, today - timedelta(days=6), today)
+    recent_users = recent[METRIC_NEW_USERS]
+    recent_posts = recent[METRIC_POSTS]
+    recent_comments = recent[METRIC_COMMENTS]
     
     # Content type breakdown
     poetry_count = db.query(Post).filter(Post.content_type == "poetry").count()
     book_count = db.query(Post).filter(Post.content_type == "book").count()
     article_count = db.query(Post).filter(Post.content_type == "article").count()
     
-    # Top authors (by post count)
-    from sqlalchemy import desc
-    top_authors = db.query(
-        User.username,
-        func.count(Post.id).label('post_count')
-    ).join(Post).group_by(User.id, User.username).order_by(desc('post_count')).limit(5).all()
+    # Top authors (by public post count, from the leaderboard)
+    top_authors = await get_top_authors(db, by="posts", limit=5)
     
     return {
         "total_users": total_users,
@@ -163,8 +179,66 @@ async def get_admin_stats(
             "article": article_count
         },
         "top_authors": [
-            {"username": username, "post_count": count}
-            for username, count in top_authors
-        ]
+            {"username": author["username"], "post_count": author["score"]}
+            for author in top_authors
+        ],
+        "top_posts_this_week": await get_top_posts(db, period="week", limit=5)
     }
 
+
+@router.get("/timeseries")
+async def get_admin_timeseries(
+    start: Optional[date] = Query(None, description="First day (UTC), defaults to 29 days before end"),
+    end: Optional[date] = Query(None, description="Last day (UTC), defaults to today"),
+    metrics: Optional[str] = Query(None, description="Comma-separated metrics, defaults to all"),
+    current_admin: Principal = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Get daily platform activity for a date range from the rollups (admin only)"""
+    end = end or utc_today()
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must be ascending and at most {MAX_RANGE_DAYS} days"
+        )
+    
+    metric_list = [metric.strip() for metric in metrics.split(",") if metric.strip()] if metrics else METRICS
+    unknown = set(metric_list) - set(METRICS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown metrics: {', '.join(sorted(unknown))}"
+        )
+    
+    return get_timeseries(db, start, end, metric_list)
+
+
+@router.post("/exports", status_code=status.HTTP_202_ACCEPTED)
+async def start_export(
+    full: bool = Query(False, description="Re-export everything instead of rows changed since the last export"),
+    current_admin: Principal = Depends(get_current_admin)
+):
+    """Export posts, comments, likes/claps and reading progress to Parquet (admin only)"""
+    job = await start_export_job(incremental=not full)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="An export is already running"
+        )
+    return job
+
+
+@router.get("/exports/{job_id}")
+async def get_export_status(
+    job_id: str,
+    current_admin: Principal = Depends(get_current_admin)
+):
+    """Get the status of an export started from this server (admin only)"""
+    job = get_export_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export not found"
+        )
+    return job
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException, status
+from app.services.analytics_jobs import get_job
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.get("/jobs/{job_id}")
+async def get_analytics_job_route(job_id: str):
+    """Get the status and progress of an analytics job"""
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
@@ -3,11 +3,15 @@ from sqlalchemy.orm import Session
 from app.database.postgres import get_db
 from app.schemas.user_schema import UserCreate, UserLogin, UserResponse, Token, PasswordReset, PasswordResetConfirm
 from app.services.auth_service import create_user, authenticate_user, get_user_by_email, update_user_password
-from app.utils.jwt_handler import create_access_token, create_refresh_token, verify_token
-from app.utils.dependencies import get_current_user
+from app.utils.jwt_handler import create_access_token, create_refresh_token, verify_token, revoke_token
+from app.utils.dependencies import get_current_user, get_current_principal, get_access_token
+from app.middleware.rate_limiter import rate_limit
+from app.services.principal_cache import Principal
 from app.models.user import User
-from app.utils.email_utils import send_password_reset_email, send_welcome_email
+from app.utils.email_utils import render_password_reset_email, render_welcome_email
+from app.services.email_outbox import enqueue_email
 from app.database.redis import get_redis
+from app.services.rollup_service import record_event, METRIC_NEW_USERS
 from datetime import timedelta
 from app.config import get_settings
 import secrets
@@ -16,7 +20,12 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 settings = get_settings()
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("register"))]
+)
 async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
     # Check if email already exists
@@ -35,11 +44,12 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     user = create_user(db, user_data)
-    await send_welcome_email(user.email, user.username)
+    record_event(db, METRIC_NEW_USERS)
+    enqueue_email(db, "welcome", user.email, *render_welcome_email(user.username))
     return user
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(rate_limit("login"))])
 async def login(
     user_data: UserLogin,
     response: Response,
@@ -63,7 +73,7 @@ async def login(
     if is_redis_available():
         redis_client = get_redis()
         try:
-            redis_client.setex(
+            await redis_client.setex(
                 f"refresh_token:{user.id}",
                 settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
                 refresh_token
@@ -101,7 +111,8 @@ async def login(
 @router.post("/logout")
 async def logout(
     response: Response,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Logout user"""
@@ -110,10 +121,16 @@ async def logout(
     if is_redis_available():
         redis_client = get_redis()
         try:
-            redis_client.delete(f"refresh_token:{current_user.id}")
+            await redis_client.delete(f"refresh_token:{current_user.id}")
         except Exception as e:
             print(f"[WARNING] Failed to delete refresh token from Redis: {e}")
     
+    # Reject the tokens for the rest of their lifetime, even where they are cached as verified
+    await revoke_token(get_access_token(request))
+    refresh_token = request.cookies.get("refresh_token")
+    if refresh_token:
+        await revoke_token(refresh_token)
+    
     # Clear cookies with explicit path
     response.delete_cookie("access_token", path="/")
     response.delete_cookie("refresh_token", path="/")
@@ -121,7 +138,7 @@ async def logout(
     return {"message": "Logged out successfully"}
 
 
-@router.post("/refresh", response_model=Token)
+@router.post("/refresh", response_model=Token, dependencies=[Depends(rate_limit("token_refresh"))])
 async def refresh_token(
     request: Request,
     response: Response,
@@ -135,7 +152,7 @@ async def refresh_token(
             detail="Refresh token required"
         )
     
-    payload = verify_token(refresh_token, token_type="refresh")
+    payload = await verify_token(refresh_token, token_type="refresh")
     if not payload:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -150,7 +167,7 @@ async def refresh_token(
     if is_redis_available():
         redis_client = get_redis()
         try:
-            stored_token = redis_client.get(f"refresh_token:{user_id}")
+            stored_token = await redis_client.get(f"refresh_token:{user_id}")
             # Only reject if Redis has a stored token AND it doesn't match
             # If no stored token exists (None), accept it (might be first time or Redis was cleared)
             if stored_token is not None and stored_token != refresh_token:
@@ -158,6 +175,8 @@ async def refresh_token(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid refresh token"
                 )
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"[WARNING] Redis error during token verification: {e}")
             # Continue without Redis verification in dev mode
@@ -186,7 +205,7 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-@router.post("/password-reset")
+@router.post("/password-reset", dependencies=[Depends(rate_limit("password_reset"))])
 async def request_password_reset(
     password_reset: PasswordReset,
     db: Session = Depends(get_db)
@@ -205,17 +224,17 @@ async def request_password_reset(
     if is_redis_available():
         redis_client = get_redis()
         try:
-            redis_client.setex(f"password_reset:{reset_token}", 3600, str(user.id))  # 1 hour
+            await redis_client.setex(f"password_reset:{reset_token}", 3600, str(user.id))  # 1 hour
         except Exception as e:
             print(f"[WARNING] Failed to store password reset token in Redis: {e}")
             # In dev mode without Redis, we'll just print the token
             print(f"[DEV] Password reset token for {user.email}: {reset_token}")
     
-    await send_password_reset_email(user.email, reset_token)
+    enqueue_email(db, "password_reset", user.email, *render_password_reset_email(reset_token))
     return {"message": "If email exists, reset link has been sent"}
 
 
-@router.post("/password-reset/confirm")
+@router.post("/password-reset/confirm", dependencies=[Depends(rate_limit("password_reset"))])
 async def confirm_password_reset(
     reset_data: PasswordResetConfirm,
     db: Session = Depends(get_db)
@@ -227,7 +246,7 @@ async def confirm_password_reset(
     if is_redis_available():
         redis_client = get_redis()
         try:
-            user_id = redis_client.get(f"password_reset:{reset_data.token}")
+            user_id = await redis_client.get(f"password_reset:{reset_data.token}")
         except Exception as e:
             print(f"[WARNING] Redis error during password reset: {e}")
     
@@ -250,7 +269,7 @@ async def confirm_password_reset(
     if is_redis_available():
         redis_client = get_redis()
         try:
-            redis_client.delete(f"password_reset:{reset_data.token}")
+            await redis_client.delete(f"password_reset:{reset_data.token}")
         except Exception as e:
             print(f"[WARNING] Failed to delete reset token from Redis: {e}")
     
@@ -6,8 +6,8 @@ from app.services.bookmark_service import (
     create_bookmark, get_bookmark, get_user_bookmarks, get_bookmark_for_post,
     update_bookmark, delete_bookmark
 )
-from app.utils.dependencies import get_current_user
-from app.models.user import User
+from app.utils.dependencies import get_current_principal
+from app.services.principal_cache import Principal
 
 router = APIRouter(prefix="/bookmarks", tags=["bookmarks"])
 
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/bookmarks", tags=["bookmarks"])
 @router.post("", response_model=BookmarkResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_bookmark(
     bookmark_data: BookmarkCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Create or update a bookmark"""
@@ -25,7 +25,7 @@ async def create_new_bookmark(
 
 @router.get("/me", response_model=list[BookmarkResponse])
 async def get_my_bookmarks(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get current user's bookmarks"""
@@ -36,7 +36,7 @@ async def get_my_bookmarks(
 @router.get("/post/{post_id}", response_model=BookmarkResponse)
 async def get_bookmark_for_post_route(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get bookmark for a specific post"""
@@ -53,7 +53,7 @@ async def get_bookmark_for_post_route(
 async def update_bookmark_by_id(
     bookmark_id: int,
     bookmark_data: BookmarkUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update bookmark"""
@@ -77,7 +77,7 @@ async def update_bookmark_by_id(
 @router.delete("/{bookmark_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_bookmark_by_id(
     bookmark_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Delete bookmark"""
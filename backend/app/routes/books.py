@@ -0,0 +1,148 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from app.database.postgres import get_db
+from app.schemas.book_schema import BookResponse, ChapterOrderUpdate
+from app.schemas.chapter_schema import ChapterResponse, ChapterWithContent
+from app.schemas.post_schema import PostWithContent
+from app.services.chapter_service import get_chapters_by_post, get_chapter_content, reorder_chapters
+from app.services.post_service import get_post, get_post_content
+from app.services.book_export_service import (
+    BookExport, EXPORT_FORMATS, book_version, cached_export, export_filename, stream_book_export
+)
+from app.services.principal_cache import Principal
+from app.utils.dependencies import get_current_principal
+from app.routes.chapters import next_chapter_link
+from app.models.user import User
+import asyncio
+
+router = APIRouter(prefix="/books", tags=["books"])
+
+
+@router.get("/{post_id}", response_model=BookResponse)
+async def get_book(
+    post_id: int,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """Get a book with its table of contents and first chapter in one call"""
+    post = get_post(db, post_id)
+    if not post or post.content_type != "book" or post.visibility == "draft":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found"
+        )
+    
+    chapters = get_chapters_by_post(db, post_id)
+    first = chapters[0] if chapters else None
+    
+    # Book and first chapter content concurrently
+    lookups = [get_post_content(post.mongo_id)]
+    if first:
+        lookups.append(get_chapter_content(first.mongo_id))
+    post_content, *first_content = await asyncio.gather(*lookups)
+    if not post_content:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Post content not found"
+        )
+    
+    if len(chapters) > 1:
+        response.headers["Link"] = next_chapter_link(chapters[1].id)
+    
+    author = db.query(User.username).filter(User.id == post.author_id).first()
+    post_dict = post.__dict__.copy()
+    post_dict['author_username'] = author.username if author else None
+    
+    first_chapter = None
+    if first and first_content and first_content[0]:
+        first_chapter = ChapterWithContent(**first.__dict__, content=first_content[0])
+    
+    return BookResponse(
+        post=PostWithContent(**post_dict, content=post_content),
+        chapters=chapters,
+        first_chapter=first_chapter
+    )
+
+
+@router.put("/{post_id}/chapter-order", response_model=list[ChapterResponse])
+async def update_book_chapter_order(
+    post_id: int,
+    order: ChapterOrderUpdate,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Reorder all chapters of a book in one request"""
+    post = get_post(db, post_id)
+    if not post or post.content_type != "book":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found"
+        )
+    
+    if post.author_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to reorder this book"
+        )
+    
+    chapters = get_chapters_by_post(db, post_id)
+    if sorted(order.chapter_ids) != sorted(chapter.id for chapter in chapters):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="chapter_ids must list every chapter of the book exactly once"
+        )
+    
+    reorder_chapters(db, post_id, order.chapter_ids)
+    return get_chapters_by_post(db, post_id)
+
+
+@router.get("/{post_id}/export")
+async def export_book(
+    post_id: int,
+    format: str = Query("epub", regex="^(epub|html)$"),
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Download your own book as EPUB or a single HTML file, streamed as it is built"""
+    post = get_post(db, post_id)
+    if not post or post.content_type != "book":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found"
+        )
+    
+    # Exports are for authors downloading their own books
+    if post.author_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to export this book"
+        )
+    
+    chapters = get_chapters_by_post(db, post_id)
+    if not chapters:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Book has no chapters to export"
+        )
+    
+    content = await get_post_content(post.mongo_id)
+    author = db.query(User.username).filter(User.id == post.author_id).first()
+    book = BookExport(
+        post_id=post.id,
+        title=post.title,
+        author=author.username if author else "Unknown",
+        description=content.description if content else None,
+        version=book_version(post, chapters),
+        chapters=[(chapter.title, chapter.mongo_id) for chapter in chapters]
+    )
+    filename = export_filename(book, format)
+    
+    cached = cached_export(book, format)
+    if cached:
+        return FileResponse(cached, media_type=EXPORT_FORMATS[format], filename=filename)
+    return StreamingResponse(
+        stream_book_export(book, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
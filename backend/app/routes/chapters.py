@@ -1,23 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Response
+from typing import Optional
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from app.config import get_settings
 from app.database.postgres import get_db
-from app.schemas.chapter_schema import ChapterCreate, ChapterResponse, ChapterUpdate, ChapterWithContent
+from app.schemas.chapter_schema import ChapterCreate, ChapterResponse, ChapterUpdate, ChapterWithContent, ChapterReadResponse, ChapterPage
 from app.services.chapter_service import (
-    create_chapter, get_chapter, get_chapters_by_post, get_chapter_content,
+    create_chapter, get_chapter, get_chapters_by_post,
+    get_chapter_contents, get_chapter_page, get_next_chapter, order_key_taken,
     update_chapter, delete_chapter
 )
 from app.services.post_service import get_post
-from app.utils.dependencies import get_current_user
-from app.models.user import User
+from app.utils.dependencies import get_current_principal
+from app.services.principal_cache import Principal
 
 router = APIRouter(prefix="/chapters", tags=["chapters"])
 
+settings = get_settings()
+
+
+def next_chapter_link(chapter_id: int, preload: bool = True) -> str:
+    """Link header value letting the client warm the next chapter before the reader turns the page"""
+    url = f"{settings.API_V1_PREFIX}/chapters/{chapter_id}"
+    link = f'<{url}>; rel="next"'
+    if preload:
+        link += f', <{url}>; rel="preload"; as="fetch"; crossorigin="anonymous"'
+    return link
+
 
 @router.post("", response_model=ChapterResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_chapter(
     chapter_data: ChapterCreate,
     post_id: int = Query(..., description="Post ID"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Create a new chapter for a book"""
@@ -41,7 +56,26 @@ async def create_new_chapter(
             detail="Chapters can only be added to book-type posts"
         )
     
-    chapter = await create_chapter(db, chapter_data, post_id)
+    if chapter_data.after_chapter_id is not None:
+        after = get_chapter(db, chapter_data.after_chapter_id)
+        if not after or after.post_id != post_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="after_chapter_id must be a chapter of this book"
+            )
+    elif chapter_data.order is not None and order_key_taken(db, post_id, chapter_data.order):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another chapter already has this order"
+        )
+    
+    try:
+        chapter = await create_chapter(db, chapter_data, post_id)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The book's chapters changed at the same time, please retry"
+        )
     return chapter
 
 
@@ -62,12 +96,14 @@ async def get_chapters_for_post(
     return chapters
 
 
-@router.get("/{chapter_id}", response_model=ChapterWithContent)
+@router.get("/{chapter_id}", response_model=ChapterReadResponse)
 async def get_chapter_by_id(
     chapter_id: int,
+    response: Response,
+    prefetch: Optional[str] = Query(None, regex="^next$", description="Also return the next chapter's content"),
     db: Session = Depends(get_db)
 ):
-    """Get chapter by ID with content"""
+    """Get chapter by ID with content, optionally with the next chapter's content"""
     chapter = get_chapter(db, chapter_id)
     if not chapter:
         raise HTTPException(
@@ -75,24 +111,71 @@ async def get_chapter_by_id(
             detail="Chapter not found"
         )
     
-    content = await get_chapter_content(chapter.mongo_id)
+    next_chapter = get_next_chapter(db, chapter)
+    if next_chapter:
+        # No need to preload a chapter that is already in the response
+        response.headers["Link"] = next_chapter_link(next_chapter.id, preload=prefetch != "next")
+    
+    # Both bodies in one MongoDB query
+    mongo_ids = [chapter.mongo_id]
+    if prefetch == "next" and next_chapter:
+        mongo_ids.append(next_chapter.mongo_id)
+    contents = await get_chapter_contents(mongo_ids)
+    content = contents.get(chapter.mongo_id)
     if not content:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Chapter content not found"
         )
     
-    return ChapterWithContent(
+    next_with_content = None
+    if next_chapter and next_chapter.mongo_id in contents:
+        next_with_content = ChapterWithContent(
+            **next_chapter.__dict__,
+            content=contents[next_chapter.mongo_id]
+        )
+    
+    return ChapterReadResponse(
         **chapter.__dict__,
-        content=content
+        content=content,
+        next_chapter_id=next_chapter.id if next_chapter else None,
+        next_chapter=next_with_content
     )
 
 
+@router.get("/{chapter_id}/pages/{page}", response_model=ChapterPage)
+async def get_chapter_page_by_number(
+    chapter_id: int,
+    page: int = Path(..., ge=1),
+    db: Session = Depends(get_db)
+):
+    """Get one page of a chapter (pages are numbered from 1)"""
+    chapter = get_chapter(db, chapter_id)
+    if not chapter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chapter not found"
+        )
+    
+    chapter_page = await get_chapter_page(chapter.mongo_id, page)
+    if not chapter_page:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Chapter content not found"
+        )
+    if chapter_page.body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Page not found; this chapter has {chapter_page.total_pages} pages"
+        )
+    return chapter_page
+
+
 @router.put("/{chapter_id}", response_model=ChapterResponse)
 async def update_chapter_by_id(
     chapter_id: int,
     chapter_data: ChapterUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update chapter"""
@@ -112,14 +195,26 @@ async def update_chapter_by_id(
         )
     
     update_data = chapter_data.dict(exclude_unset=True)
-    updated_chapter = await update_chapter(db, chapter, update_data)
+    if update_data.get("order") is not None and order_key_taken(db, chapter.post_id, update_data["order"], chapter.id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another chapter already has this order; use PUT /books/{post_id}/chapter-order to reorder"
+        )
+    
+    try:
+        updated_chapter = await update_chapter(db, chapter, update_data)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The book's chapters changed at the same time, please retry"
+        )
     return updated_chapter
 
 
 @router.delete("/{chapter_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_chapter_by_id(
     chapter_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Delete chapter"""
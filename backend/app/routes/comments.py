@@ -4,15 +4,26 @@ from app.database.postgres import get_db
 from app.schemas.comment_schema import CommentCreate, CommentResponse, CommentUpdate
 from app.models.comment import Comment
 from app.models.post import Post
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import get_current_principal
+from app.services.principal_cache import Principal
+from app.middleware.rate_limiter import rate_limit
 from app.models.user import User
+from app.services.analytics_cache import invalidate_user_analytics
+from app.services.rollup_service import record_event, METRIC_COMMENTS
+from app.services.author_stats_service import increment_author_stats
+
 router = APIRouter(prefix="/comments", tags=["comments"])
 
 
-@router.post("", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "",
+    response_model=CommentResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("comment"))]
+)
 async def create_comment(
     comment_data: CommentCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Create a new comment"""
@@ -42,6 +53,11 @@ async def create_comment(
     db.add(comment)
     db.commit()
     db.refresh(comment)
+    # Reading analytics of the commenter and engagement of the post author changed
+    await invalidate_user_analytics(current_user.id, post.author_id)
+    record_event(db, METRIC_COMMENTS)
+    if post.visibility == "public":
+        increment_author_stats(db, post.author_id, comments=1)
     
     # Add author username
     comment.author_username = current_user.username
@@ -87,7 +103,7 @@ async def get_comment(
 async def update_comment(
     comment_id: int,
     comment_data: CommentUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update comment"""
@@ -115,7 +131,7 @@ async def update_comment(
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_comment(
     comment_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Delete comment"""
@@ -132,15 +148,21 @@ async def delete_comment(
             detail="Not authorized to delete this comment"
         )
     
+    comment_author_id = comment.author_id
+    post_author_id = comment.post.author_id if comment.post else None
+    post_is_public = comment.post is not None and comment.post.visibility == "public"
     db.delete(comment)
     db.commit()
+    await invalidate_user_analytics(comment_author_id, post_author_id)
+    if post_is_public:
+        increment_author_stats(db, post_author_id, comments=-1)
     return None
 
 
-@router.post("/{comment_id}/like", response_model=CommentResponse)
+@router.post("/{comment_id}/like", response_model=CommentResponse, dependencies=[Depends(rate_limit("engagement"))])
 async def like_comment(
     comment_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Like a comment"""
@@ -3,7 +3,8 @@ from sqlalchemy.orm import Session
 from app.database.postgres import get_db
 from app.schemas.post_schema import PostResponse
 from app.services.feed_service import get_personalized_feed
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import get_current_principal
+from app.services.principal_cache import Principal
 from app.models.user import User
 from typing import List, Dict
 
@@ -12,7 +13,7 @@ router = APIRouter(prefix="/feed", tags=["feed"])
 
 @router.get("/personalized")
 async def get_personalized_feed_route(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get personalized feed for current user"""
@@ -26,7 +27,8 @@ async def get_personalized_feed_route(
         "latest_posts": [],
         "most_appreciated": [],
         "genre_posts": [],
-        "current_reading": []
+        "current_reading": [],
+        "for_you": []
     }
     
     # Latest posts
@@ -74,6 +76,21 @@ async def get_personalized_feed_route(
                 content=content
             ))
     
+    # Ranked "for you" posts
+    for post in feed_data.get("for_you", []):
+        content = await get_post_content(post.mongo_id)
+        if content:
+            # Add author username
+            from app.models.user import User
+            author = db.query(User).filter(User.id == post.author_id).first()
+            post_dict = post.__dict__.copy()
+            post_dict['author_username'] = author.username if author else None
+            post_dict['cover_image_url'] = content.cover_image_url
+            result["for_you"].append(PostWithContent(
+                **post_dict,
+                content=content
+            ))
+    
     # Current reading
     for item in feed_data.get("current_reading", []):
         post = item["post"]
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.database.postgres import get_db
+from app.services.leaderboard_service import get_top_authors, get_top_posts, MAX_LIMIT
+
+router = APIRouter(prefix="/leaderboards", tags=["leaderboards"])
+
+
+@router.get("/authors")
+async def get_author_leaderboard(
+    by: str = Query("engagement", regex="^(posts|engagement)$"),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db)
+):
+    """Get top authors by public posts or by likes and claps received"""
+    return {"by": by, "authors": await get_top_authors(db, by, limit)}
+
+
+@router.get("/posts")
+async def get_post_leaderboard(
+    period: str = Query("week", regex="^(day|week|all)$"),
+    limit: int = Query(10, ge=1, le=MAX_LIMIT),
+    db: Session = Depends(get_db)
+):
+    """Get top posts by likes and claps for today, this week or all time"""
+    return {"period": period, "posts": await get_top_posts(db, period, limit)}
@@ -5,9 +5,16 @@ from app.database.postgres import get_db
 from app.schemas.post_schema import PostCreate, PostResponse, PostUpdate, PostWithContent, PostListResponse
 from app.services.post_service import (
     create_post, get_post, get_post_by_slug, get_post_content,
-    update_post, delete_post, get_public_posts, get_user_posts
+    update_post, delete_post, get_public_posts, get_user_posts,
+    toggle_post_like, add_post_clap, get_user_engagement
 )
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import get_current_principal
+from app.services.principal_cache import Principal
+from app.middleware.rate_limiter import rate_limit
+from app.services.analytics_cache import invalidate_user_analytics
+from app.services.rollup_service import record_event, METRIC_POSTS, METRIC_LIKES, METRIC_CLAPS
+from app.services.author_stats_service import increment_author_stats
+from app.services.leaderboard_service import record_post_engagement
 from app.models.user import User
 
 router = APIRouter(prefix="/posts", tags=["posts"])
@@ -15,7 +22,7 @@ router = APIRouter(prefix="/posts", tags=["posts"])
 @router.post("", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_post(
     post_data: PostCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Create a new post"""
@@ -28,6 +35,8 @@ async def create_new_post(
         )
     
     post = await create_post(db, post_data, current_user.id)  # Add await here
+    await invalidate_user_analytics(current_user.id)
+    record_event(db, METRIC_POSTS, dimension=post.content_type)
     return post 
 
 @router.get("", response_model=PostListResponse)
@@ -73,7 +82,7 @@ async def get_posts(
 @router.get("/me", response_model=list[PostResponse])
 async def get_my_posts(
     include_drafts: bool = Query(False),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get current user's posts"""
@@ -84,7 +93,7 @@ async def get_my_posts(
 @router.get("/{post_id}", response_model=PostWithContent)
 async def get_post_by_id(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get post by ID with content"""
@@ -164,7 +173,7 @@ async def get_post_by_slug_route(
 async def update_post_by_id(
     post_id: int,
     post_data: PostUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update post"""
@@ -183,13 +192,14 @@ async def update_post_by_id(
     
     update_data = post_data.dict(exclude_unset=True)
     updated_post = await update_post(db, post, update_data)
+    await invalidate_user_analytics(updated_post.author_id)
     return updated_post
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post_by_id(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Delete post"""
@@ -206,14 +216,16 @@ async def delete_post_by_id(
             detail="Not authorized to delete this post"
         )
     
+    author_id = post.author_id
     await delete_post(db, post)
+    await invalidate_user_analytics(author_id)
     return None
 
 
-@router.post("/{post_id}/like", response_model=PostResponse)
+@router.post("/{post_id}/like", response_model=PostResponse, dependencies=[Depends(rate_limit("engagement"))])
 async def like_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Like a post (toggle)"""
@@ -230,25 +242,19 @@ async def like_post(
             detail="Post not found"
         )
     
-    # Check if user already liked
-    if current_user in post.liked_by:
-        # Unlike
-        post.liked_by.remove(current_user)
-        post.likes_count = max(0, post.likes_count - 1)
-    else:
-        # Like
-        post.liked_by.append(current_user)
-        post.likes_count += 1
-    
-    db.commit()
-    db.refresh(post)
+    like_delta = toggle_post_like(db, post, current_user.id)
+    await invalidate_user_analytics(post.author_id)
+    record_event(db, METRIC_LIKES, like_delta)
+    if post.visibility == "public":
+        increment_author_stats(db, post.author_id, likes=like_delta)
+    await record_post_engagement(post, like_delta)
     return post
 
 
-@router.post("/{post_id}/clap", response_model=PostResponse)
+@router.post("/{post_id}/clap", response_model=PostResponse, dependencies=[Depends(rate_limit("engagement"))])
 async def clap_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Clap for a post (adds to count, can clap multiple times)"""
@@ -266,19 +272,19 @@ async def clap_post(
         )
     
     # Add clap (users can clap multiple times)
-    post.claps_count += 1
-    if current_user not in post.clapped_by:
-        post.clapped_by.append(current_user)
-    
-    db.commit()
-    db.refresh(post)
+    add_post_clap(db, post, current_user.id)
+    await invalidate_user_analytics(post.author_id)
+    record_event(db, METRIC_CLAPS)
+    if post.visibility == "public":
+        increment_author_stats(db, post.author_id, claps=1)
+    await record_post_engagement(post, 1)
     return post
 
 
 @router.get("/{post_id}/engagement")
 async def get_post_engagement(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get user's engagement status for a post"""
@@ -289,8 +295,7 @@ async def get_post_engagement(
             detail="Post not found"
         )
     
-    is_liked = current_user in post.liked_by if current_user else False
-    has_clapped = current_user in post.clapped_by if current_user else False
+    is_liked, has_clapped = get_user_engagement(db, post.id, current_user.id)
     
     return {
         "is_liked": is_liked,
@@ -6,8 +6,10 @@ from app.services.reading_progress_service import (
     get_or_create_reading_progress, update_reading_progress,
     get_reading_progress, get_user_reading_stats
 )
-from app.utils.dependencies import get_current_user
-from app.models.user import User
+from app.services.analytics_cache import invalidate_user_analytics
+from app.services.rollup_service import record_event, METRIC_READING_MINUTES
+from app.utils.dependencies import get_current_principal
+from app.services.principal_cache import Principal
 
 router = APIRouter(prefix="/reading-progress", tags=["reading-progress"])
 
@@ -15,7 +17,7 @@ router = APIRouter(prefix="/reading-progress", tags=["reading-progress"])
 @router.get("/post/{post_id}", response_model=ReadingProgressResponse)
 async def get_reading_progress_for_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get reading progress for a specific post"""
@@ -30,7 +32,7 @@ async def get_reading_progress_for_post(
 async def update_reading_progress_for_post(
     post_id: int,
     progress_data: ReadingProgressUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Update reading progress for a post"""
@@ -41,12 +43,15 @@ async def update_reading_progress_for_post(
     progress = update_reading_progress(
         db, current_user.id, post_id, current_page, total_pages, reading_time
     )
+    # The reader's reading analytics changed
+    await invalidate_user_analytics(current_user.id)
+    record_event(db, METRIC_READING_MINUTES, reading_time)
     return progress
 
 
 @router.get("/stats", response_model=dict)
 async def get_my_reading_stats(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get reading statistics for current user"""
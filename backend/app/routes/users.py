@@ -1,12 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from app.database.postgres import get_db
 from app.schemas.user_schema import UserResponse, UserUpdate
 from app.services.user_service import update_user_profile
+from app.services.principal_cache import invalidate_principal
 from app.services.post_service import get_user_posts
 from app.schemas.post_schema import PostResponse
 from app.utils.dependencies import get_current_user
 from app.models.user import User
+from app.config import get_settings
+
+settings = get_settings()
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -25,6 +30,7 @@ async def update_my_profile(
 ):
     """Update current user profile"""
     updated_user = update_user_profile(db, current_user, user_data)
+    await invalidate_principal(updated_user.id)
     return updated_user
 
 
@@ -84,9 +90,14 @@ async def get_user_analytics_route(
     username: str,
     db: Session = Depends(get_db)
 ):
-    """Get comprehensive analytics for a user"""
+    """Get comprehensive analytics for a user.
+    
+    Returns the cached analytics when there are any (refreshing stale ones in
+    the background), otherwise 202 with a job to poll at /analytics/jobs/{id}.
+    """
     from app.services.auth_service import get_user_by_username
-    from app.services.analytics_service import get_user_analytics
+    from app.services.analytics_cache import read_cached_analytics, is_entry_current
+    from app.services.analytics_jobs import enqueue_analytics_job
     
     user = get_user_by_username(db, username)
     if not user:
@@ -95,6 +106,16 @@ async def get_user_analytics_route(
             detail="User not found"
         )
     
-    analytics = await get_user_analytics(db, user.id)
-    return analytics
+    entry = await read_cached_analytics(user.id)
+    if entry is not None:
+        if not await is_entry_current(user.id, entry):
+            await enqueue_analytics_job(user.id)
+        return entry["data"]
+    
+    job = await enqueue_analytics_job(user.id)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"job_id": job["id"], "status": job["status"], "progress": job["progress"]},
+        headers={"Location": f"{settings.API_V1_PREFIX}/analytics/jobs/{job['id']}"}
+    )
 
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from app.schemas.post_schema import PostWithContent
+from app.schemas.chapter_schema import ChapterResponse, ChapterWithContent
+
+
+class BookResponse(BaseModel):
+    """A book with its table of contents and first chapter"""
+    post: PostWithContent
+    chapters: List[ChapterResponse]
+    first_chapter: Optional[ChapterWithContent] = None
+
+
+class ChapterOrderUpdate(BaseModel):
+    """Every chapter of the book, in the new reading order"""
+    chapter_ids: List[int]
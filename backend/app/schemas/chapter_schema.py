@@ -8,13 +8,24 @@ class ChapterContent(BaseModel):
     body: str
 
 
+class ChapterPage(BaseModel):
+    """One page of a chapter's content"""
+    page: int
+    total_pages: int
+    body: Optional[str] = None
+
+
 class ChapterBase(BaseModel):
     title: str
     order: int
 
 
-class ChapterCreate(ChapterBase):
+class ChapterCreate(BaseModel):
+    """Appended to the book unless placed after a chapter or given an explicit order key"""
+    title: str
     content: ChapterContent
+    order: Optional[int] = None
+    after_chapter_id: Optional[int] = None
 
 
 class ChapterUpdate(BaseModel):
@@ -38,3 +49,9 @@ class ChapterWithContent(ChapterResponse):
     """Chapter with full content from MongoDB"""
     content: ChapterContent
 
+
+
+class ChapterReadResponse(ChapterWithContent):
+    """Chapter with content, plus the next chapter's content when requested"""
+    next_chapter_id: Optional[int] = None
+    next_chapter: Optional[ChapterWithContent] = None
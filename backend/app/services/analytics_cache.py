@@ -0,0 +1,97 @@
+"""
+Cache for author analytics with event-driven invalidation.
+
+Every author has a version counter that is bumped whenever their posts,
+comments or engagement change. Cached results are tagged with the version
+they were computed at: a matching version is served directly, an older one
+is served stale while an analytics job (see analytics_jobs) recomputes it.
+"""
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database.redis import get_redis, is_redis_available
+from typing import Awaitable, Callable, Dict, Optional
+from loguru import logger
+import json
+import time
+
+settings = get_settings()
+
+VERSION_KEY = "analytics:version:{user_id}"
+RESULT_KEY = "analytics:result:{user_id}"
+
+# In-process fallback when Redis is unavailable
+_local_versions: Dict[int, int] = {}
+_local_results: Dict[int, Dict] = {}
+
+
+async def invalidate_user_analytics(*user_ids: Optional[int]):
+    """Bump the analytics version of the given users after their data changed"""
+    user_ids = {uid for uid in user_ids if uid is not None}
+    for user_id in user_ids:
+        _local_versions[user_id] = _local_versions.get(user_id, 0) + 1
+    if user_ids and is_redis_available():
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.incr(VERSION_KEY.format(user_id=user_id))
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to bump analytics version for users {sorted(user_ids)}: {e}")
+
+
+async def _get_version(user_id: int) -> int:
+    """Current analytics version for a user"""
+    if is_redis_available():
+        try:
+            version = await get_redis().get(VERSION_KEY.format(user_id=user_id))
+            return int(version) if version else 0
+        except Exception as e:
+            logger.warning(f"Failed to read analytics version for user {user_id}: {e}")
+    return _local_versions.get(user_id, 0)
+
+
+async def read_cached_analytics(user_id: int) -> Optional[Dict]:
+    """Read the cached analytics entry for a user"""
+    if is_redis_available():
+        try:
+            raw = await get_redis().get(RESULT_KEY.format(user_id=user_id))
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.warning(f"Failed to read cached analytics for user {user_id}: {e}")
+    return _local_results.get(user_id)
+
+
+async def _write_entry(user_id: int, version: int, data: Dict):
+    """Store computed analytics tagged with the version they were computed at"""
+    entry = {"version": version, "computed_at": time.time(), "data": data}
+    if is_redis_available():
+        try:
+            await get_redis().setex(
+                RESULT_KEY.format(user_id=user_id),
+                settings.ANALYTICS_CACHE_TTL_SECONDS,
+                json.dumps(entry, default=str)
+            )
+            return
+        except Exception as e:
+            logger.warning(f"Failed to cache analytics for user {user_id}: {e}")
+    _local_results[user_id] = entry
+
+
+async def is_entry_current(user_id: int, entry: Dict) -> bool:
+    """Whether a cached entry was computed at the user's current version"""
+    return entry.get("version") == await _get_version(user_id)
+
+
+async def compute_user_analytics(
+    db: Session,
+    user_id: int,
+    on_progress: Optional[Callable[[str, int], Awaitable[None]]] = None
+) -> Dict:
+    """Compute analytics and cache them under the version read beforehand"""
+    from app.services.analytics_service import get_user_analytics
+    
+    # Read the version first: changes made while computing leave the result stale
+    version = await _get_version(user_id)
+    data = await get_user_analytics(db, user_id, on_progress)
+    await _write_entry(user_id, version, data)
+    return data
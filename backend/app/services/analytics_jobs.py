@@ -0,0 +1,250 @@
+"""
+Background jobs for computing author analytics.
+
+Requests never compute analytics themselves: they enqueue a job and return
+its id, and consumers running in every app process pick jobs up from a
+Redis list (or an in-process queue when Redis is unavailable). Only one job
+per user is queued or running at a time; concurrent requests get the
+existing job back.
+"""
+from app.config import get_settings
+from app.database.postgres import SessionLocal
+from app.database.redis import get_redis, is_redis_available
+from app.services.analytics_cache import compute_user_analytics
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from loguru import logger
+import asyncio
+import json
+import uuid
+
+settings = get_settings()
+
+QUEUE_KEY = "analytics:jobs:queue"
+JOB_KEY = "analytics:job:{job_id}"
+USER_JOB_KEY = "analytics:job:user:{user_id}"
+
+# Seconds a consumer blocks waiting for a job before checking the other queue
+POLL_SECONDS = 1
+
+# KEYS: user job key. ARGV: job id. Deletes the key only if it still holds this job.
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_script = None
+_release_script_client = None
+
+# In-process fallback when Redis is unavailable; finished jobs are pruned
+# after ANALYTICS_JOB_TTL_SECONDS, like their Redis keys expire
+_local_jobs: Dict[str, Dict] = {}
+_local_user_jobs: Dict[int, str] = {}
+_local_queue: Optional[asyncio.Queue] = None
+
+_worker_tasks: List[asyncio.Task] = []
+_stopping = False
+
+
+def _get_local_queue() -> asyncio.Queue:
+    """Get the in-process queue, created lazily inside the running event loop"""
+    global _local_queue
+    if _local_queue is None:
+        _local_queue = asyncio.Queue()
+    return _local_queue
+
+
+def _prune_local_jobs(now: datetime):
+    """Drop finished fallback jobs whose status has outlived the job TTL"""
+    cutoff = (now - timedelta(seconds=settings.ANALYTICS_JOB_TTL_SECONDS)).isoformat()
+    for job_id in [
+        job_id for job_id, job in _local_jobs.items()
+        if job["status"] in ("done", "failed") and job["updated_at"] < cutoff
+    ]:
+        del _local_jobs[job_id]
+
+
+async def _save_job(job: Dict):
+    """Store a job's status"""
+    now = datetime.now(timezone.utc)
+    job["updated_at"] = now.isoformat()
+    _prune_local_jobs(now)
+    if is_redis_available():
+        try:
+            await get_redis().setex(
+                JOB_KEY.format(job_id=job["id"]),
+                settings.ANALYTICS_JOB_TTL_SECONDS,
+                json.dumps(job)
+            )
+            return
+        except Exception as e:
+            logger.warning(f"Failed to save analytics job {job['id']}: {e}")
+    _local_jobs[job["id"]] = job
+
+
+async def get_job(job_id: str) -> Optional[Dict]:
+    """Get a job's status"""
+    if is_redis_available():
+        try:
+            raw = await get_redis().get(JOB_KEY.format(job_id=job_id))
+            if raw:
+                return json.loads(raw)
+        except Exception as e:
+            logger.warning(f"Failed to read analytics job {job_id}: {e}")
+    return _local_jobs.get(job_id)
+
+
+async def _claim_user_job(user_id: int, job_id: str) -> Optional[str]:
+    """Register job_id as the user's active job, or return the id of the one already active"""
+    if is_redis_available():
+        try:
+            key = USER_JOB_KEY.format(user_id=user_id)
+            # Expires on its own if a consumer dies mid-job so the user isn't stuck
+            if await get_redis().set(key, job_id, nx=True, ex=settings.ANALYTICS_JOB_TIMEOUT_SECONDS):
+                return None
+            return await get_redis().get(key)
+        except Exception as e:
+            logger.warning(f"Failed to claim analytics job for user {user_id}: {e}")
+    
+    active_id = _local_user_jobs.get(user_id)
+    active = _local_jobs.get(active_id) if active_id else None
+    if active and active["status"] in ("queued", "running"):
+        return active_id
+    _local_user_jobs[user_id] = job_id
+    return None
+
+
+async def _release_user_job(user_id: int, job_id: str):
+    """Clear the user's active job if it is still this one"""
+    global _release_script, _release_script_client
+    if _local_user_jobs.get(user_id) == job_id:
+        del _local_user_jobs[user_id]
+    if is_redis_available():
+        try:
+            redis_client = get_redis()
+            if _release_script is None or _release_script_client is not redis_client:
+                _release_script = redis_client.register_script(RELEASE_SCRIPT)
+                _release_script_client = redis_client
+            # Compare and delete in one step, so a job never releases a newer job's slot
+            await _release_script(keys=[USER_JOB_KEY.format(user_id=user_id)], args=[job_id])
+        except Exception as e:
+            logger.warning(f"Failed to release analytics job for user {user_id}: {e}")
+
+
+async def enqueue_analytics_job(user_id: int) -> Dict:
+    """Queue an analytics computation for a user, reusing the job already queued or running"""
+    job_id = uuid.uuid4().hex
+    active_id = await _claim_user_job(user_id, job_id)
+    if active_id:
+        active = await get_job(active_id)
+        if active:
+            return active
+        # The status expired or was lost: take the user's slot over
+        await _release_user_job(user_id, active_id)
+        return await enqueue_analytics_job(user_id)
+    
+    job = {
+        "id": job_id,
+        "user_id": user_id,
+        "status": "queued",
+        "stage": None,
+        "progress": 0,
+        "error": None,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await _save_job(job)
+    
+    if is_redis_available():
+        try:
+            await get_redis().rpush(QUEUE_KEY, job_id)
+            return job
+        except Exception as e:
+            logger.warning(f"Failed to queue analytics job {job_id} in Redis: {e}")
+    _get_local_queue().put_nowait(job_id)
+    return job
+
+
+async def _run_job(job_id: str):
+    """Compute the analytics for a job and record its outcome"""
+    job = await get_job(job_id)
+    if not job:
+        logger.warning(f"Analytics job {job_id} expired before it ran")
+        return
+    
+    async def on_progress(stage: str, percent: int):
+        job["stage"] = stage
+        job["progress"] = percent
+        await _save_job(job)
+    
+    job["status"] = "running"
+    await _save_job(job)
+    db = SessionLocal()
+    try:
+        await asyncio.wait_for(
+            compute_user_analytics(db, job["user_id"], on_progress),
+            timeout=settings.ANALYTICS_JOB_TIMEOUT_SECONDS
+        )
+        job["status"] = "done"
+        job["progress"] = 100
+    except Exception as e:
+        logger.error(f"Analytics job {job_id} for user {job['user_id']} failed: {e!r}")
+        job["status"] = "failed"
+        job["error"] = "Analytics computation failed"
+    finally:
+        db.close()
+        await _save_job(job)
+        await _release_user_job(job["user_id"], job_id)
+
+
+async def _next_job_id() -> Optional[str]:
+    """Wait briefly for the next job from the in-process queue or Redis"""
+    queue = _get_local_queue()
+    if not queue.empty():
+        return queue.get_nowait()
+    
+    if is_redis_available():
+        try:
+            item = await get_redis().blpop(QUEUE_KEY, timeout=POLL_SECONDS)
+            return item[1] if item else None
+        except Exception as e:
+            logger.warning(f"Failed to read the analytics job queue: {e}")
+    
+    try:
+        return await asyncio.wait_for(queue.get(), timeout=POLL_SECONDS)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def _worker_loop():
+    """Consume analytics jobs until the workers are stopped"""
+    # Checked as well as cancellation, which wait_for can swallow when a job arrives at the same time
+    while not _stopping:
+        try:
+            job_id = await _next_job_id()
+            if job_id:
+                await _run_job(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Analytics job consumer error: {e}")
+            await asyncio.sleep(POLL_SECONDS)
+
+
+def start_analytics_workers():
+    """Start the job consumers for this process"""
+    global _stopping
+    _stopping = False
+    for _ in range(settings.ANALYTICS_JOB_WORKERS):
+        _worker_tasks.append(asyncio.create_task(_worker_loop()))
+
+
+async def stop_analytics_workers():
+    """Cancel the job consumers for this process"""
+    global _stopping
+    _stopping = True
+    for task in _worker_tasks:
+        task.cancel()
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
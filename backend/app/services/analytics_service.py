@@ -5,17 +5,263 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from app.models.user import User
 from app.models.post import Post
-from app.models.comment import Comment
+from app.models.reading_progress import ReadingProgress
+from app.models.author_stats import AuthorStats
+from app.services.author_stats_service import get_author_stats, effective_streak
 from app.database.mongo import get_mongo_db
 from bson import ObjectId
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from collections import Counter
-import re
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from app.utils.text_stats import (
+    STATS_VERSION, WRITING_STOP_WORDS, EMOTION_KEYWORDS, MERGED_TOP_TERMS_LIMIT, SKETCH_SIZE,
+    compute_text_stats_batch, estimate_unique_terms, summarize_post_stats
+)
+from app.utils.process_pool import run_cpu_bound
+from app.utils.content_codec import BODY_FIELDS, decode_body
+from loguru import logger
+import asyncio
 
+# Max number of ids per $in query when fetching post bodies
+CONTENT_FETCH_BATCH_SIZE = 500
 
-async def get_user_analytics(db: Session, user_id: int) -> Dict:
-    """Get comprehensive analytics for a user"""
+# Number of bodies tokenized per process-pool task when backfilling stats
+STATS_BACKFILL_CHUNK_SIZE = 50
+
+# Reads within this many days count as recent in reading analytics
+RECENT_READING_DAYS = 30
+
+
+def _mongo_ids(user_posts: List[Post]) -> Dict[ObjectId, Post]:
+    """Map the MongoDB ids of the given posts to the posts, skipping invalid ids"""
+    posts_by_mongo_id = {}
+    for post in user_posts:
+        try:
+            posts_by_mongo_id[ObjectId(post.mongo_id)] = post
+        except (InvalidId, TypeError):
+            continue
+    return posts_by_mongo_id
+
+
+async def fetch_post_bodies(user_posts: List[Post]) -> Dict[int, str]:
+    """Fetch the raw bodies of the given posts.
+    
+    Bodies are read with batched $in queries and streamed from the cursor, so
+    an author with thousands of posts costs a handful of round-trips rather
+    than one per post. Returns a mapping of post id to body.
+    """
+    posts_by_mongo_id = _mongo_ids(user_posts)
+    mongo_db = get_mongo_db()
+    mongo_ids = list(posts_by_mongo_id.keys())
+    post_bodies = {}
+    
+    for start in range(0, len(mongo_ids), CONTENT_FETCH_BATCH_SIZE):
+        batch = mongo_ids[start:start + CONTENT_FETCH_BATCH_SIZE]
+        cursor = mongo_db.posts.find({"_id": {"$in": batch}}, BODY_FIELDS)
+        async for doc in cursor:
+            post_bodies[posts_by_mongo_id[doc["_id"]].id] = decode_body(doc)
+    
+    return post_bodies
+
+
+async def ensure_post_stats(user_posts: List[Post]):
+    """Backfill stats for posts written before stats existed or with an outdated version.
+    
+    Only the ids of posts lacking current stats are read; their bodies are
+    then fetched once, tokenized in the process pool and the stats persisted.
+    """
+    posts_by_mongo_id = _mongo_ids(user_posts)
+    mongo_db = get_mongo_db()
+    mongo_ids = list(posts_by_mongo_id.keys())
+    missing = []
+    
+    for start in range(0, len(mongo_ids), CONTENT_FETCH_BATCH_SIZE):
+        batch = mongo_ids[start:start + CONTENT_FETCH_BATCH_SIZE]
+        cursor = mongo_db.posts.find(
+            {"_id": {"$in": batch}, "stats.version": {"$ne": STATS_VERSION}},
+            {"_id": 1}
+        )
+        async for doc in cursor:
+            missing.append(posts_by_mongo_id[doc["_id"]])
+    
+    if not missing:
+        return
+    
+    post_bodies = await fetch_post_bodies(missing)
+    found = [post for post in missing if post.id in post_bodies]
+    chunks = [found[i:i + STATS_BACKFILL_CHUNK_SIZE] for i in range(0, len(found), STATS_BACKFILL_CHUNK_SIZE)]
+    results = await asyncio.gather(*[
+        run_cpu_bound(compute_text_stats_batch, [post_bodies[post.id] for post in chunk])
+        for chunk in chunks
+    ])
+    updates = [
+        UpdateOne({"_id": ObjectId(post.mongo_id)}, {"$set": {"stats": stats}})
+        for chunk, chunk_stats in zip(chunks, results)
+        for post, stats in zip(chunk, chunk_stats)
+    ]
+    if updates:
+        await mongo_db.posts.bulk_write(updates, ordered=False)
+
+
+async def fetch_post_stats(user_posts: List[Post]) -> Dict[int, Dict]:
+    """Fetch the per-post stats documents written by create_post/update_post"""
+    posts_by_mongo_id = _mongo_ids(user_posts)
+    mongo_db = get_mongo_db()
+    mongo_ids = list(posts_by_mongo_id.keys())
+    post_stats = {}
+    
+    for start in range(0, len(mongo_ids), CONTENT_FETCH_BATCH_SIZE):
+        batch = mongo_ids[start:start + CONTENT_FETCH_BATCH_SIZE]
+        cursor = mongo_db.posts.find({"_id": {"$in": batch}, "stats": {"$exists": True}}, {"stats": 1})
+        async for doc in cursor:
+            post_stats[posts_by_mongo_id[doc["_id"]].id] = doc["stats"]
+    
+    return post_stats
+
+
+def _text_summary_pipeline(mongo_ids: List[ObjectId]) -> List[Dict]:
+    """Aggregation pipeline merging per-post stats into an author-level summary.
+    
+    Only small result sets leave the server: totals, the merged top terms,
+    the merged unique-term sketch, per-post word counts and monthly totals.
+    Posts without stats get an approximate word count from $split.
+    """
+    # Compressed bodies can't be split server-side; they always have stats
+    body = {"$cond": [{"$eq": [{"$type": "$body"}, "string"]}, "$body", ""]}
+    split_word_count = {"$size": {"$filter": {
+        "input": {"$split": [body, " "]},
+        "cond": {"$ne": ["$$this", ""]}
+    }}}
+    totals_group = {
+        "_id": None,
+        "post_count": {"$sum": 1},
+        "word_count": {"$sum": "$word_count"},
+        "term_count": {"$sum": "$term_count"},
+        "sentence_count": {"$sum": "$sentence_count"},
+        "sentence_words": {"$sum": "$sentence_words"},
+    }
+    for emotion in EMOTION_KEYWORDS:
+        totals_group[f"emotion_{emotion}"] = {"$sum": {"$ifNull": [f"$emotion_counts.{emotion}", 0]}}
+    
+    return [
+        {"$match": {"_id": {"$in": mongo_ids}}},
+        {"$project": {
+            "month": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+            "word_count": {"$ifNull": ["$stats.word_count", split_word_count]},
+            "term_count": {"$ifNull": ["$stats.term_count", 0]},
+            "sentence_count": {"$ifNull": ["$stats.sentence_count", 0]},
+            "sentence_words": {"$ifNull": ["$stats.sentence_words", 0]},
+            "emotion_counts": {"$ifNull": ["$stats.emotion_counts", {}]},
+            "top_terms": {"$objectToArray": {"$ifNull": ["$stats.top_terms", {}]}},
+            "sketch": {"$ifNull": ["$stats.unique_terms_sketch", []]},
+        }},
+        {"$facet": {
+            "posts": [{"$project": {"word_count": 1}}],
+            "totals": [{"$group": totals_group}],
+            "top_terms": [
+                {"$unwind": "$top_terms"},
+                {"$group": {"_id": "$top_terms.k", "count": {"$sum": "$top_terms.v"}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": MERGED_TOP_TERMS_LIMIT},
+            ],
+            "sketch": [
+                {"$unwind": "$sketch"},
+                {"$group": {"_id": "$sketch"}},
+                {"$sort": {"_id": 1}},
+                {"$limit": SKETCH_SIZE},
+            ],
+            "monthly": [
+                {"$match": {"month": {"$ne": None}}},
+                {"$group": {
+                    "_id": "$month",
+                    "post_count": {"$sum": 1},
+                    "word_count": {"$sum": "$word_count"},
+                    "term_count": {"$sum": "$term_count"},
+                }},
+            ],
+            "monthly_sketch": [
+                {"$match": {"month": {"$ne": None}}},
+                {"$unwind": "$sketch"},
+                {"$group": {"_id": {"month": "$month", "hash": "$sketch"}}},
+                {"$sort": {"_id.hash": 1}},
+                {"$group": {"_id": "$_id.month", "sketch": {"$push": "$_id.hash"}}},
+                {"$project": {"sketch": {"$slice": ["$sketch", SKETCH_SIZE]}}},
+            ],
+        }},
+    ]
+
+
+async def aggregate_text_summary(user_posts: List[Post]) -> Dict:
+    """Compute the author-level text summary inside MongoDB"""
+    posts_by_mongo_id = _mongo_ids(user_posts)
+    mongo_db = get_mongo_db()
+    cursor = mongo_db.posts.aggregate(_text_summary_pipeline(list(posts_by_mongo_id.keys())), allowDiskUse=True)
+    results = await cursor.to_list(length=1)
+    result = results[0] if results else {}
+    
+    totals = result.get("totals") or [{}]
+    totals = totals[0]
+    monthly_sketches = {row["_id"]: row["sketch"] for row in result.get("monthly_sketch", [])}
+    return {
+        "post_count": totals.get("post_count", 0),
+        "word_count": totals.get("word_count", 0),
+        "term_count": totals.get("term_count", 0),
+        "sentence_count": totals.get("sentence_count", 0),
+        "sentence_words": totals.get("sentence_words", 0),
+        "top_terms": Counter({row["_id"]: row["count"] for row in result.get("top_terms", [])}),
+        "emotion_counts": {emotion: totals.get(f"emotion_{emotion}", 0) for emotion in EMOTION_KEYWORDS},
+        "unique_terms": estimate_unique_terms([row["_id"] for row in result.get("sketch", [])]),
+        "post_word_counts": {
+            posts_by_mongo_id[row["_id"]].id: row["word_count"] for row in result.get("posts", [])
+        },
+        "monthly": {
+            row["_id"]: {
+                "post_count": row["post_count"],
+                "word_count": row["word_count"],
+                "term_count": row["term_count"],
+                "unique_terms": estimate_unique_terms(monthly_sketches.get(row["_id"], []))
+            }
+            for row in result.get("monthly", [])
+        }
+    }
+
+
+async def get_text_summary(user_posts: List[Post]) -> Dict:
+    """Get the author-level text summary shared by the writing and language analyzers.
+    
+    The merge runs as a MongoDB aggregation so only a few KB are transferred;
+    if the server can't run it, the per-post stats are merged in Python.
+    """
+    await ensure_post_stats(user_posts)
+    try:
+        return await aggregate_text_summary(user_posts)
+    except PyMongoError as e:
+        logger.warning(f"Text summary aggregation failed, merging in Python: {e}")
+    
+    post_stats = await fetch_post_stats(user_posts)
+    entries = [
+        (post.id, post.created_at.strftime("%Y-%m") if post.created_at else None, post_stats[post.id])
+        for post in user_posts if post.id in post_stats
+    ]
+    return await run_cpu_bound(summarize_post_stats, entries)
+
+
+async def get_user_analytics(
+    db: Session,
+    user_id: int,
+    on_progress: Optional[Callable[[str, int], Awaitable[None]]] = None
+) -> Dict:
+    """Get comprehensive analytics for a user.
+    
+    on_progress, when given, is awaited with a stage name and a percentage
+    as each section finishes.
+    """
+    async def report(stage: str, percent: int):
+        if on_progress:
+            await on_progress(stage, percent)
     
     # Get user's posts
     user_posts = db.query(Post).filter(
@@ -23,20 +269,27 @@ async def get_user_analytics(db: Session, user_id: int) -> Dict:
         Post.visibility == "public"
     ).all()
     
-    # Get user's comments (for reading analytics)
-    user_comments = db.query(Comment).filter(Comment.author_id == user_id).all()
+    await report("loading", 10)
+    
+    # Summarize the per-post text stats once and share them between analyzers
+    text_summary = await get_text_summary(user_posts)
+    await report("text_summary", 60)
     
     # Writing Analytics
-    writing_analytics = await get_writing_analytics(db, user_id, user_posts)
+    writing_analytics = await get_writing_analytics(db, user_id, user_posts, text_summary)
+    await report("writing_analytics", 70)
     
     # Reading Analytics
-    reading_analytics = await get_reading_analytics(db, user_id, user_comments)
+    reading_analytics = await get_reading_analytics(db, user_id)
+    await report("reading_analytics", 80)
     
     # Language & Style Insights
-    language_insights = await get_language_insights(db, user_id, user_posts)
+    language_insights = await get_language_insights(db, user_id, user_posts, text_summary)
+    await report("language_insights", 90)
     
     # User Stats
-    user_stats = get_user_stats(db, user_id, user_posts)
+    user_stats = get_user_stats(db, user_id)
+    await report("user_stats", 100)
     
     return {
         "user_stats": user_stats,
@@ -46,44 +299,39 @@ async def get_user_analytics(db: Session, user_id: int) -> Dict:
     }
 
 
-def get_user_stats(db: Session, user_id: int, user_posts: List[Post]) -> Dict:
-    """Get basic user statistics"""
+def get_user_stats(db: Session, user_id: int) -> Dict:
+    """Get basic user statistics from the author's maintained counters"""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         return {}
     
-    # Calculate total reads (approximate - using likes + claps as proxy)
-    total_reads = sum(post.likes_count + post.claps_count for post in user_posts)
-    
-    # Calculate total likes received
-    total_likes = sum(post.likes_count for post in user_posts)
-    
-    # Calculate total claps received
-    total_claps = sum(post.claps_count for post in user_posts)
+    stats = get_author_stats(db, user_id)
     
     # Calculate followers (users who liked/clapped user's posts)
     # This is a simplified version - in production, you'd have a followers table
     followers_count = 0  # Placeholder
     
-    # Writing streak (consecutive days with posts)
-    streak = calculate_writing_streak(user_posts)
-    
-    # Engagement score (weighted combination of metrics)
-    engagement_score = calculate_engagement_score(user_posts, db)
-    
     return {
         "join_date": user.created_at.isoformat() if user.created_at else None,
-        "total_reads": total_reads,
-        "total_likes": total_likes,
-        "total_claps": total_claps,
+        "total_reads": stats.total_likes + stats.total_claps,  # Approximate - likes + claps as proxy
+        "total_likes": stats.total_likes,
+        "total_claps": stats.total_claps,
         "total_followers": followers_count,
-        "writing_streak": streak,
-        "engagement_score": engagement_score,
-        "total_posts": len(user_posts)
+        "writing_streak": effective_streak(stats),
+        "longest_streak": stats.longest_streak,
+        "last_post_date": stats.last_post_date.isoformat() if stats.last_post_date else None,
+        "engagement_score": calculate_engagement_score(stats),
+        "total_posts": stats.post_count,
+        "posts_by_type": stats.posts_by_type
     }
 
 
-async def get_writing_analytics(db: Session, user_id: int, user_posts: List[Post]) -> Dict:
+async def get_writing_analytics(
+    db: Session,
+    user_id: int,
+    user_posts: List[Post],
+    text_summary: Optional[Dict] = None
+) -> Dict:
     """Get writing analytics"""
     if not user_posts:
         return {
@@ -93,7 +341,8 @@ async def get_writing_analytics(db: Session, user_id: int, user_posts: List[Post
             "average_article_length": 0,
             "productivity": {},
             "top_performing": [],
-            "evolution_timeline": []
+            "evolution_timeline": [],
+            "monthly_words": []
         }
     
     # Genre distribution
@@ -102,28 +351,15 @@ async def get_writing_analytics(db: Session, user_id: int, user_posts: List[Post
         genre = post.content_type or "article"
         genre_distribution[genre] = genre_distribution.get(genre, 0) + 1
     
-    # Get post content from MongoDB for analysis
-    mongo_db = get_mongo_db()
-    all_content = []
-    word_counts = []
-    
-    for post in user_posts:
-        try:
-            doc = await mongo_db.posts.find_one({"_id": ObjectId(post.mongo_id)})
-            if doc:
-                body = doc.get("body", "")
-                all_content.append(body)
-                # Count words (approximate)
-                word_count = len(re.findall(r'\b\w+\b', body))
-                word_counts.append(word_count)
-        except:
-            continue
+    # Author-level text summary
+    if text_summary is None:
+        text_summary = await get_text_summary(user_posts)
     
     # Word frequency (simplified - extract common words)
-    word_frequency = extract_word_frequency(all_content)
+    word_frequency = extract_word_frequency(text_summary["top_terms"])
     
     # Average article length
-    avg_length = sum(word_counts) / len(word_counts) if word_counts else 0
+    avg_length = text_summary["word_count"] / text_summary["post_count"] if text_summary["post_count"] else 0
     
     # Productivity (posts per month)
     productivity = calculate_productivity(user_posts)
@@ -139,7 +375,7 @@ async def get_writing_analytics(db: Session, user_id: int, user_posts: List[Post
     sentiment_trend = calculate_sentiment_trend(user_posts)
     
     # Evolution timeline
-    evolution_timeline = calculate_evolution_timeline(user_posts)
+    evolution_timeline = calculate_evolution_timeline(user_posts, text_summary["post_word_counts"])
     
     return {
         "genre_distribution": [
@@ -162,13 +398,37 @@ async def get_writing_analytics(db: Session, user_id: int, user_posts: List[Post
             }
             for p in top_performing
         ],
-        "evolution_timeline": evolution_timeline
+        "evolution_timeline": evolution_timeline,
+        "monthly_words": [
+            {"month": month, "post_count": totals["post_count"], "word_count": totals["word_count"]}
+            for month, totals in sorted(text_summary["monthly"].items())
+        ]
     }
 
 
-async def get_reading_analytics(db: Session, user_id: int, user_comments: List[Comment]) -> Dict:
-    """Get reading analytics based on comments"""
-    if not user_comments:
+async def get_reading_analytics(db: Session, user_id: int) -> Dict:
+    """Get reading analytics from the user's reading progress.
+    
+    Everything is aggregated in PostgreSQL: one query per genre, one for the
+    top authors and one for the monthly trend, however long the history is.
+    """
+    recent_cutoff = datetime.now(timezone.utc) - timedelta(days=RECENT_READING_DAYS)
+    
+    # Genres read, with depth, recency and revisits per genre
+    genre = func.coalesce(Post.content_type, "article")
+    genre_rows = db.query(
+        genre.label("genre"),
+        func.count(ReadingProgress.id).label("count"),
+        func.avg(ReadingProgress.progress_percentage).label("depth"),
+        func.count(ReadingProgress.id).filter(ReadingProgress.last_read_at >= recent_cutoff).label("recent"),
+        func.count(ReadingProgress.id).filter(
+            ReadingProgress.last_read_at > ReadingProgress.created_at + timedelta(days=1)
+        ).label("revisited")
+    ).join(Post, Post.id == ReadingProgress.post_id).filter(
+        ReadingProgress.user_id == user_id
+    ).group_by("genre").order_by(desc("count")).all()
+    
+    if not genre_rows:
         return {
             "genres_read_most": [],
             "reading_time_trend": [],
@@ -178,49 +438,53 @@ async def get_reading_analytics(db: Session, user_id: int, user_comments: List[C
             "recency_vs_repetition": {}
         }
     
-    # Get posts that user commented on
-    post_ids = [c.post_id for c in user_comments]
-    commented_posts = db.query(Post).filter(Post.id.in_(post_ids)).all()
-    
-    # Genres read most
-    genre_counts = {}
-    for post in commented_posts:
-        genre = post.content_type or "article"
-        genre_counts[genre] = genre_counts.get(genre, 0) + 1
-    
     # Most read authors
-    author_counts = {}
-    for post in commented_posts:
-        author_id = post.author_id
-        author_counts[author_id] = author_counts.get(author_id, 0) + 1
-    
-    # Get author usernames
-    most_read_authors = []
-    for author_id, count in sorted(author_counts.items(), key=lambda x: x[1], reverse=True)[:5]:
-        author = db.query(User).filter(User.id == author_id).first()
-        if author:
-            most_read_authors.append({
-                "username": author.username,
-                "count": count
-            })
-    
-    # Reading time trend (simplified - based on comment dates)
-    reading_time_trend = calculate_reading_trend(user_comments)
+    author_rows = db.query(
+        User.username,
+        func.count(ReadingProgress.id).label("count")
+    ).join(Post, Post.id == ReadingProgress.post_id).join(User, User.id == Post.author_id).filter(
+        ReadingProgress.user_id == user_id
+    ).group_by(User.id, User.username).order_by(desc("count"), User.username).limit(5).all()
+    
+    # Reading trend by month of last read
+    month = func.to_char(ReadingProgress.last_read_at, "YYYY-MM")
+    trend_rows = db.query(
+        month.label("month"),
+        func.count(ReadingProgress.id).label("count"),
+        func.coalesce(func.sum(ReadingProgress.reading_time_minutes), 0).label("minutes")
+    ).filter(
+        ReadingProgress.user_id == user_id,
+        ReadingProgress.last_read_at.isnot(None)
+    ).group_by("month").order_by("month").all()
+    
+    total_reads = sum(row.count for row in genre_rows)
+    average_depth = sum((row.depth or 0) * row.count for row in genre_rows) / total_reads
+    recent_reads = sum(row.recent for row in genre_rows)
     
     return {
-        "genres_read_most": [
-            {"genre": k, "count": v}
-            for k, v in sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)
+        "genres_read_most": [{"genre": row.genre, "count": row.count} for row in genre_rows],
+        "reading_time_trend": [
+            {"month": row.month, "count": row.count, "minutes": int(row.minutes)}
+            for row in trend_rows
         ],
-        "reading_time_trend": reading_time_trend,
-        "most_read_authors": most_read_authors,
-        "average_reading_depth": 75,  # Placeholder - would need tracking
-        "favorite_tone": {},  # Placeholder
-        "recency_vs_repetition": {}  # Placeholder
+        "most_read_authors": [{"username": row.username, "count": row.count} for row in author_rows],
+        "average_reading_depth": round(average_depth, 1),
+        # Average completion per genre: how far the user tends to read each kind of work
+        "favorite_tone": {row.genre: round(row.depth or 0, 1) for row in genre_rows},
+        "recency_vs_repetition": {
+            "recent": recent_reads,
+            "older": total_reads - recent_reads,
+            "revisited": sum(row.revisited for row in genre_rows)
+        }
     }
 
 
-async def get_language_insights(db: Session, user_id: int, user_posts: List[Post]) -> Dict:
+async def get_language_insights(
+    db: Session,
+    user_id: int,
+    user_posts: List[Post],
+    text_summary: Optional[Dict] = None
+) -> Dict:
     """Get language and style insights"""
     if not user_posts:
         return {
@@ -231,22 +495,11 @@ async def get_language_insights(db: Session, user_id: int, user_posts: List[Post
             "lexical_diversity": []
         }
     
-    # Get all content
-    mongo_db = get_mongo_db()
-    all_text = []
-    
-    for post in user_posts:
-        try:
-            doc = await mongo_db.posts.find_one({"_id": ObjectId(post.mongo_id)})
-            if doc:
-                body = doc.get("body", "")
-                # Strip HTML tags
-                text = re.sub(r'<[^>]+>', '', body)
-                all_text.append(text)
-        except:
-            continue
+    # Author-level text summary
+    if text_summary is None:
+        text_summary = await get_text_summary(user_posts)
     
-    if not all_text:
+    if not text_summary["post_count"]:
         return {
             "most_frequent_words": [],
             "sentence_complexity": {},
@@ -255,109 +508,47 @@ async def get_language_insights(db: Session, user_id: int, user_posts: List[Post
             "lexical_diversity": []
         }
     
-    full_text = " ".join(all_text)
-    
-    # Most frequent words
-    words = re.findall(r'\b[a-z]{3,}\b', full_text.lower())
-    word_freq = Counter(words)
-    # Remove common stop words
-    stop_words = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'its', 'let', 'put', 'say', 'she', 'too', 'use'}
-    filtered_words = {k: v for k, v in word_freq.items() if k not in stop_words}
-    most_frequent = sorted(filtered_words.items(), key=lambda x: x[1], reverse=True)[:15]
+    # Most frequent words (stop words are dropped when the stats are computed)
+    most_frequent = text_summary["top_terms"].most_common(15)
     
     # Sentence complexity
-    sentences = re.split(r'[.!?]+', full_text)
-    sentence_lengths = [len(s.split()) for s in sentences if s.strip()]
-    avg_sentence_length = sum(sentence_lengths) / len(sentence_lengths) if sentence_lengths else 0
+    sentence_count = text_summary["sentence_count"]
+    total_words = text_summary["term_count"]
+    avg_sentence_length = text_summary["sentence_words"] / sentence_count if sentence_count else 0
     
     # Unique vocabulary ratio
-    unique_words = len(set(words))
-    total_words = len(words)
-    unique_ratio = (unique_words / total_words * 100) if total_words > 0 else 0
-    
-    # Emotion analysis (simplified - keyword-based)
-    emotion_keywords = {
-        "joy": ["happy", "joy", "smile", "laugh", "celebrate", "delight", "cheer"],
-        "sadness": ["sad", "cry", "tear", "grief", "sorrow", "mourn", "pain"],
-        "anger": ["angry", "rage", "fury", "hate", "frustrate", "mad"],
-        "fear": ["fear", "afraid", "scared", "anxious", "worry", "panic"],
-        "trust": ["trust", "believe", "faith", "confident", "sure", "rely"],
-        "surprise": ["surprise", "shock", "amaze", "wonder", "astonish"]
-    }
-    
-    emotion_scores = {}
-    text_lower = full_text.lower()
-    for emotion, keywords in emotion_keywords.items():
-        count = sum(text_lower.count(keyword) for keyword in keywords)
-        emotion_scores[emotion] = count
+    unique_ratio = (text_summary["unique_terms"] / total_words * 100) if total_words > 0 else 0
     
-    # Lexical diversity over time (simplified)
-    lexical_diversity = calculate_lexical_diversity(user_posts)
+    # Lexical diversity over time
+    lexical_diversity = calculate_lexical_diversity(text_summary["monthly"])
     
     return {
         "most_frequent_words": [{"word": k, "count": v} for k, v in most_frequent],
         "sentence_complexity": {
             "average_sentence_length": round(avg_sentence_length, 1),
-            "readability_index": round(206.835 - (1.015 * avg_sentence_length) - (84.6 * (total_words / len(sentences) if sentences else 0)), 1) if sentences else 0
+            "readability_index": round(206.835 - (1.015 * avg_sentence_length) - (84.6 * (total_words / sentence_count)), 1) if sentence_count else 0
         },
-        "unique_vocabulary_ratio": round(unique_ratio, 1),
-        "emotion_analysis": emotion_scores,
+        "unique_vocabulary_ratio": round(min(unique_ratio, 100.0), 1),
+        "emotion_analysis": text_summary["emotion_counts"],
         "lexical_diversity": lexical_diversity
     }
 
 
 # Helper functions
 
-def calculate_writing_streak(posts: List[Post]) -> int:
-    """Calculate consecutive days with posts"""
-    if not posts:
-        return 0
-    
-    # Sort posts by date
-    sorted_posts = sorted(posts, key=lambda p: p.created_at if p.created_at else datetime.min, reverse=True)
-    
-    streak = 0
-    current_date = datetime.now().date()
-    
-    for post in sorted_posts:
-        if post.created_at:
-            post_date = post.created_at.date()
-            if post_date == current_date or post_date == current_date - timedelta(days=streak):
-                streak += 1
-                current_date = post_date
-            else:
-                break
-    
-    return streak
-
-
-def calculate_engagement_score(posts: List[Post], db: Session) -> float:
+def calculate_engagement_score(stats: AuthorStats) -> float:
     """Calculate engagement score"""
-    if not posts:
-        return 0.0
-    
-    total_engagement = sum(p.likes_count + p.claps_count for p in posts)
-    
-    # Count comments for these posts
-    post_ids = [p.id for p in posts]
-    total_comments = db.query(Comment).filter(Comment.post_id.in_(post_ids)).count() if post_ids else 0
-    
     # Weighted score
-    score = (total_engagement * 1.0) + (total_comments * 2.0)
+    score = ((stats.total_likes + stats.total_claps) * 1.0) + (stats.total_comments * 2.0)
     return round(score, 1)
 
 
-def extract_word_frequency(content_list: List[str]) -> List[Dict]:
-    """Extract word frequency from content"""
-    all_text = " ".join(content_list)
-    # Strip HTML
-    text = re.sub(r'<[^>]+>', '', all_text)
-    words = re.findall(r'\b[a-z]{4,}\b', text.lower())
-    
-    stop_words = {'that', 'this', 'with', 'from', 'have', 'been', 'were', 'said', 'each', 'which', 'their', 'time', 'will', 'about', 'would', 'there', 'could', 'other', 'after', 'first', 'never', 'these', 'think', 'where', 'being', 'every', 'great', 'might', 'shall', 'those', 'under', 'while', 'years'}
-    filtered = [w for w in words if w not in stop_words]
-    
-    word_freq = Counter(filtered)
+def extract_word_frequency(term_counts: Counter) -> List[Dict]:
+    """Extract word frequency from merged term counts"""
+    word_freq = Counter({
+        word: count for word, count in term_counts.items()
+        if len(word) >= 4 and word not in WRITING_STOP_WORDS
+    })
     return [{"word": k, "count": v} for k, v in word_freq.most_common(20)]
 
 
@@ -401,7 +592,7 @@ def calculate_sentiment_trend(posts: List[Post]) -> List[Dict]:
     return trend
 
 
-def calculate_evolution_timeline(posts: List[Post]) -> List[Dict]:
+def calculate_evolution_timeline(posts: List[Post], post_word_counts: Dict[int, int]) -> List[Dict]:
     """Calculate writing evolution timeline"""
     if not posts:
         return []
@@ -416,50 +607,20 @@ def calculate_evolution_timeline(posts: List[Post]) -> List[Dict]:
                 "date": post.created_at.isoformat(),
                 "title": post.title,
                 "engagement": post.likes_count + post.claps_count,
-                "word_count": 0  # Would need to fetch from MongoDB
+                "word_count": post_word_counts.get(post.id, 0)
             })
     
     return timeline
 
 
-def calculate_reading_trend(comments: List[Comment]) -> List[Dict]:
-    """Calculate reading trend over time"""
-    if not comments:
-        return []
-    
-    monthly_comments = {}
-    for comment in comments:
-        if comment.created_at:
-            month_key = comment.created_at.strftime("%Y-%m")
-            monthly_comments[month_key] = monthly_comments.get(month_key, 0) + 1
-    
-    return [
-        {"month": k, "count": v}
-        for k, v in sorted(monthly_comments.items())
-    ]
-
-
-def calculate_lexical_diversity(posts: List[Post]) -> List[Dict]:
-    """Calculate lexical diversity over time"""
-    if not posts:
-        return []
-    
-    # Simplified - return diversity score by month
-    monthly_diversity = {}
-    for post in posts:
-        if post.created_at:
-            month_key = post.created_at.strftime("%Y-%m")
-            if month_key not in monthly_diversity:
-                monthly_diversity[month_key] = []
-            monthly_diversity[month_key].append(post)
-    
+def calculate_lexical_diversity(monthly: Dict[str, Dict]) -> List[Dict]:
+    """Calculate lexical diversity (unique terms per 100 terms) by month"""
     diversity_scores = []
-    for month, month_posts in sorted(monthly_diversity.items()):
-        # Simplified diversity calculation
+    for month, totals in sorted(monthly.items()):
+        diversity = totals["unique_terms"] / totals["term_count"] * 100 if totals["term_count"] else 0
         diversity_scores.append({
             "month": month,
-            "diversity_score": round(len(month_posts) * 10, 1)  # Placeholder
+            "diversity_score": round(min(diversity, 100.0), 1)
         })
     
     return diversity_scores
-
@@ -0,0 +1,137 @@
+"""
+Per-author counters for profile stats.
+
+Each author has one author_stats row covering their public posts. Likes,
+claps and comments are applied as atomic increments, publishing a post
+extends the streak in place, and edits or deletions that can change
+history rebuild the row from the posts table. Reading profile stats is a
+single primary-key lookup.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.models.author_stats import AuthorStats
+from app.models.post import Post
+from app.models.comment import Comment
+from app.services.rollup_service import utc_today
+from typing import List, Optional, Tuple
+from datetime import date, timedelta
+from loguru import logger
+
+
+def compute_streaks(days: List[date]) -> Tuple[int, int]:
+    """Current (ending at the latest day) and longest runs of consecutive days in a sorted list"""
+    current = longest = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous is not None and day == previous + timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+
+def effective_streak(stats: AuthorStats) -> int:
+    """Current streak as of today: it lapses once a full UTC day passes without a post"""
+    if not stats.last_post_date or stats.last_post_date < utc_today() - timedelta(days=1):
+        return 0
+    return stats.current_streak
+
+
+def rebuild_author_stats(db: Session, user_id: int) -> AuthorStats:
+    """Recompute an author's row from their posts"""
+    public = (Post.author_id == user_id, Post.visibility == "public")
+    
+    type_rows = db.query(
+        func.coalesce(Post.content_type, "article").label("post_type"),
+        func.count(Post.id),
+        func.coalesce(func.sum(Post.likes_count), 0),
+        func.coalesce(func.sum(Post.claps_count), 0)
+    ).filter(*public).group_by("post_type").all()
+    
+    total_comments = db.query(func.count(Comment.id)).join(Post, Post.id == Comment.post_id).filter(*public).scalar()
+    
+    post_day = func.date(func.timezone("UTC", Post.created_at)).label("post_day")
+    day_rows = db.query(post_day).filter(*public, Post.created_at.isnot(None)).distinct().order_by("post_day").all()
+    days = [row.post_day for row in day_rows]
+    current_streak, longest_streak = compute_streaks(days)
+    
+    stats = db.query(AuthorStats).filter(AuthorStats.user_id == user_id).with_for_update().first()
+    if stats is None:
+        stats = AuthorStats(user_id=user_id)
+        db.add(stats)
+    stats.posts_by_type = {content_type: count for content_type, count, _, _ in type_rows}
+    stats.post_count = sum(stats.posts_by_type.values())
+    stats.total_likes = int(sum(likes for _, _, likes, _ in type_rows))
+    stats.total_claps = int(sum(claps for _, _, _, claps in type_rows))
+    stats.total_comments = total_comments or 0
+    stats.current_streak = current_streak
+    stats.longest_streak = longest_streak
+    stats.last_post_date = days[-1] if days else None
+    db.commit()
+    db.refresh(stats)
+    return stats
+
+
+def get_author_stats(db: Session, user_id: int) -> AuthorStats:
+    """Get an author's row, building it on first use"""
+    stats = db.query(AuthorStats).filter(AuthorStats.user_id == user_id).first()
+    if stats is None:
+        stats = rebuild_author_stats(db, user_id)
+    return stats
+
+
+def record_post_published(db: Session, post: Post):
+    """Count a newly created public post and extend the author's streak"""
+    if post.visibility != "public":
+        return
+    stats = db.query(AuthorStats).filter(AuthorStats.user_id == post.author_id).with_for_update().first()
+    if stats is None:
+        # Building the row from the posts table already includes this post
+        rebuild_author_stats(db, post.author_id)
+        return
+    
+    content_type = post.content_type or "article"
+    posts_by_type = dict(stats.posts_by_type or {})
+    posts_by_type[content_type] = posts_by_type.get(content_type, 0) + 1
+    stats.posts_by_type = posts_by_type
+    stats.post_count += 1
+    
+    today = utc_today()
+    if stats.last_post_date != today:
+        if stats.last_post_date == today - timedelta(days=1):
+            stats.current_streak += 1
+        else:
+            stats.current_streak = 1
+        stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+        stats.last_post_date = today
+    db.commit()
+
+
+def increment_author_stats(
+    db: Session,
+    user_id: Optional[int],
+    likes: int = 0,
+    claps: int = 0,
+    comments: int = 0
+):
+    """Atomically add engagement deltas to an author's row.
+    
+    Runs after the caller's own commit; failures are logged and repaired by
+    the next rebuild.
+    """
+    if user_id is None or not (likes or claps or comments):
+        return
+    try:
+        updated = db.query(AuthorStats).filter(AuthorStats.user_id == user_id).update({
+            AuthorStats.total_likes: func.greatest(AuthorStats.total_likes + likes, 0),
+            AuthorStats.total_claps: AuthorStats.total_claps + claps,
+            AuthorStats.total_comments: func.greatest(AuthorStats.total_comments + comments, 0)
+        }, synchronize_session=False)
+        if not updated:
+            # No row yet: building it from the posts table already reflects this change
+            db.rollback()
+            rebuild_author_stats(db, user_id)
+            return
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to update author stats for user {user_id}: {e}")
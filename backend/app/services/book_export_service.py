@@ -0,0 +1,270 @@
+"""
+Downloadable EPUB and HTML exports of books.
+
+Chapters are read in reading order through batched $in queries, so only a
+batch of chapter bodies is in memory at a time. Each chapter is written
+and streamed to the client as soon as it is read: EPUBs as zip entries
+written into a non-seekable buffer that is drained after every entry,
+HTML as one chunk per chapter. The same bytes go to a cache file that is
+moved into place only once the export is complete, and later downloads of
+an unchanged book are served from it. A book's exports are keyed by its
+latest post or chapter update and its chapter count, so any edit, reorder
+or deletion produces a new file.
+"""
+from app.config import get_settings
+from app.database.mongo import get_mongo_db
+from app.models.chapter import Chapter
+from app.models.post import Post
+from app.utils.content_codec import BODY_FIELDS, decode_body
+from bson import ObjectId
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from html import escape
+from html.entities import name2codepoint
+from pathlib import Path
+from loguru import logger
+import io
+import re
+import uuid
+import zipfile
+
+settings = get_settings()
+
+EXPORT_FORMATS = {
+    "epub": "application/epub+zip",
+    "html": "text/html; charset=utf-8",
+}
+
+# Chapter bodies fetched per MongoDB query
+CHAPTER_FETCH_BATCH_SIZE = 20
+
+# EPUB's XHTML needs void elements self-closed and only XML's named entities
+_VOID_TAG = re.compile(r"<(area|br|col|embed|hr|img|input|source|track|wbr)\b([^>]*?)\s*/?>", re.IGNORECASE)
+_NAMED_ENTITY = re.compile(r"&([A-Za-z][A-Za-z0-9]*);")
+_XML_ENTITIES = {"amp", "lt", "gt", "quot", "apos"}
+
+
+@dataclass
+class BookExport:
+    """What an export needs from Postgres, read before the response starts streaming"""
+    post_id: int
+    title: str
+    author: str
+    description: Optional[str]
+    version: datetime
+    chapters: List[Tuple[str, str]]  # (title, mongo_id) in reading order
+    
+    @property
+    def cache_key(self) -> str:
+        """Changes whenever the book or its chapters change"""
+        return f"book-{self.post_id}-{int(self.version.timestamp() * 1_000_000)}-{len(self.chapters)}"
+
+
+def book_version(post: Post, chapters: List[Chapter]) -> datetime:
+    """Latest change to the book or any of its chapters"""
+    return max(row.updated_at or row.created_at for row in [post, *chapters])
+
+
+def _cache_dir() -> Path:
+    return Path(settings.EXPORT_DIR) / "books"
+
+
+def cached_export(book: BookExport, export_format: str) -> Optional[Path]:
+    """The finished export of this version of the book, if one was made"""
+    path = _cache_dir() / f"{book.cache_key}.{export_format}"
+    return path if path.exists() else None
+
+
+def export_filename(book: BookExport, export_format: str) -> str:
+    """Download name for the export"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", book.title).strip("-").lower() or f"book-{book.post_id}"
+    return f"{slug}.{export_format}"
+
+
+async def _chapter_bodies(book: BookExport) -> AsyncIterator[Tuple[int, str, str]]:
+    """(number, title, body) of each chapter in reading order, fetched in batches"""
+    mongo_db = get_mongo_db()
+    for start in range(0, len(book.chapters), CHAPTER_FETCH_BATCH_SIZE):
+        batch = book.chapters[start:start + CHAPTER_FETCH_BATCH_SIZE]
+        bodies: Dict[str, str] = {}
+        cursor = mongo_db.chapters.find({"_id": {"$in": [ObjectId(mongo_id) for _, mongo_id in batch]}}, BODY_FIELDS)
+        async for doc in cursor:
+            bodies[str(doc["_id"])] = decode_body(doc)
+        for offset, (title, mongo_id) in enumerate(batch):
+            yield start + offset + 1, title, bodies.get(mongo_id, "")
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only file object for ZipFile, drained after every entry.
+    
+    Seeking back is allowed within the bytes not drained yet, which is all
+    ZipFile needs to fill in an entry's CRC and sizes in its local header.
+    Otherwise it would write them after the data in a data descriptor, which
+    EPUB forbids for the leading mimetype entry.
+    """
+    
+    def __init__(self):
+        self._data = bytearray()
+        self._base = 0  # Stream offset of the first undrained byte
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        offset = self._position - self._base
+        self._data[offset:offset + len(data)] = data
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._base + len(self._data)
+        if offset < self._base:
+            raise io.UnsupportedOperation("Cannot seek into data already drained")
+        self._position = offset
+        return offset
+    
+    def drain(self) -> bytes:
+        data = bytes(self._data)
+        self._base += len(self._data)
+        self._data.clear()
+        return data
+
+
+def _xhtml(title: str, body: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">\n'
+        f"<head><title>{escape(title)}</title></head>\n<body>\n{body}\n</body>\n</html>\n"
+    )
+
+
+def _numeric_entity(match: re.Match) -> str:
+    name = match.group(1)
+    if name in _XML_ENTITIES or name not in name2codepoint:
+        return match.group(0)
+    return f"&#{name2codepoint[name]};"
+
+
+def _chapter_xhtml(title: str, body: str) -> str:
+    body = _NAMED_ENTITY.sub(_numeric_entity, _VOID_TAG.sub(r"<\1\2/>", body))
+    return _xhtml(title, f"<h1>{escape(title)}</h1>\n{body}")
+
+
+def _epub_package(book: BookExport) -> Dict[str, str]:
+    """Container, package document and navigation of the EPUB"""
+    identifier = uuid.uuid5(uuid.NAMESPACE_URL, f"inknechoes:book:{book.post_id}")
+    modified = book.version.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    numbers = range(1, len(book.chapters) + 1)
+    manifest = "\n".join(
+        f'    <item id="chapter-{n}" href="chapter-{n}.xhtml" media-type="application/xhtml+xml"/>' for n in numbers
+    )
+    spine = "\n".join(f'    <itemref idref="chapter-{n}"/>' for n in numbers)
+    toc = "\n".join(
+        f'      <li><a href="chapter-{n}.xhtml">{escape(title)}</a></li>'
+        for n, (title, _) in zip(numbers, book.chapters)
+    )
+    description = f"\n    <dc:description>{escape(book.description)}</dc:description>" if book.description else ""
+    return {
+        "META-INF/container.xml": (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">\n'
+            '  <rootfiles>\n'
+            '    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>\n'
+            '  </rootfiles>\n'
+            '</container>\n'
+        ),
+        "OEBPS/content.opf": (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">\n'
+            '  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'    <dc:identifier id="book-id">urn:uuid:{identifier}</dc:identifier>\n'
+            f'    <dc:title>{escape(book.title)}</dc:title>\n'
+            f'    <dc:creator>{escape(book.author)}</dc:creator>\n'
+            f'    <dc:language>en</dc:language>{description}\n'
+            f'    <meta property="dcterms:modified">{modified}</meta>\n'
+            '  </metadata>\n'
+            '  <manifest>\n'
+            '    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+            f'{manifest}\n'
+            '  </manifest>\n'
+            '  <spine>\n'
+            f'{spine}\n'
+            '  </spine>\n'
+            '</package>\n'
+        ),
+        "OEBPS/nav.xhtml": _xhtml(
+            book.title,
+            f'<nav epub:type="toc" id="toc">\n    <h1>{escape(book.title)}</h1>\n    <ol>\n{toc}\n    </ol>\n</nav>'
+        ),
+    }
+
+
+async def _epub_chunks(book: BookExport) -> AsyncIterator[bytes]:
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        # The mimetype entry must come first, uncompressed
+        archive.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        for name, content in _epub_package(book).items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+        
+        async for number, title, body in _chapter_bodies(book):
+            archive.writestr(f"OEBPS/chapter-{number}.xhtml", _chapter_xhtml(title, body))
+            yield buffer.drain()
+    # The central directory is written on close
+    yield buffer.drain()
+
+
+async def _html_chunks(book: BookExport) -> AsyncIterator[bytes]:
+    toc = "\n".join(
+        f'<li><a href="#chapter-{n}">{escape(title)}</a></li>' for n, (title, _) in enumerate(book.chapters, 1)
+    )
+    description = f"<p>{escape(book.description)}</p>\n" if book.description else ""
+    yield (
+        f'<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n<title>{escape(book.title)}</title>\n</head>\n'
+        f"<body>\n<h1>{escape(book.title)}</h1>\n<p>by {escape(book.author)}</p>\n{description}"
+        f"<nav><ol>\n{toc}\n</ol></nav>\n"
+    ).encode("utf-8")
+    async for number, title, body in _chapter_bodies(book):
+        yield f'<section id="chapter-{number}">\n<h2>{escape(title)}</h2>\n{body}\n</section>\n'.encode("utf-8")
+    yield b"</body>\n</html>\n"
+
+
+async def stream_book_export(book: BookExport, export_format: str) -> AsyncIterator[bytes]:
+    """Stream a new export to the client while writing it to the cache"""
+    cache_dir = _cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{book.cache_key}.{export_format}"
+    part = cache_dir / f"{book.cache_key}.{export_format}.{uuid.uuid4().hex}.part"
+    chunks = _epub_chunks(book) if export_format == "epub" else _html_chunks(book)
+    
+    completed = False
+    try:
+        with open(part, "wb") as cache_file:
+            async for chunk in chunks:
+                if chunk:
+                    cache_file.write(chunk)
+                    yield chunk
+        part.replace(path)
+        completed = True
+    finally:
+        if not completed:
+            # Client went away or the export failed: don't cache a partial file
+            part.unlink(missing_ok=True)
+    
+    # Older versions of this book's export can go
+    for old in cache_dir.glob(f"book-{book.post_id}-*.{export_format}"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    logger.info(f"Exported book {book.post_id} as {export_format} ({path.stat().st_size} bytes)")
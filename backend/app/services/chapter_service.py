@@ -2,13 +2,128 @@
 Service for managing book chapters
 """
 from sqlalchemy.orm import Session
+from sqlalchemy import Integer, column, func, tuple_, update, values
 from app.models.chapter import Chapter
 from app.models.post import Post
-from app.schemas.chapter_schema import ChapterCreate, ChapterContent
+from app.schemas.chapter_schema import ChapterCreate, ChapterContent, ChapterPage
+from app.config import get_settings
 from app.database.mongo import get_mongo_db
+from app.utils.content_codec import BODY_FIELDS, BODY_FORMAT_PLAIN, BODY_FORMAT_ZLIB_PAGES, encode_body, decode_body, decode_page
 from bson import ObjectId
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
+import re
+
+settings = get_settings()
+
+# Spacing between consecutive order keys, so a chapter can be inserted
+# between two others without renumbering the rest of the book
+ORDER_GAP = 1024
+
+# Where a page may end, best first: after a block element, a blank line, a line break
+_PAGE_BREAKS = [
+    re.compile(r"</(?:p|h[1-6]|blockquote|pre|li|ul|ol|div)>\s*", re.IGNORECASE),
+    re.compile(r"\n[ \t]*\n\s*"),
+    re.compile(r"<br\s*/?>\s*|\n\s*", re.IGNORECASE),
+    re.compile(r"\s+"),
+]
+
+
+def _inside_tag(body: str, start: int, position: int) -> bool:
+    """Whether `position` falls inside an HTML tag"""
+    return body.rfind("<", start, position) > body.rfind(">", start, position)
+
+
+def paginate_body(body: str, page_chars: Optional[int] = None) -> List[int]:
+    """Offsets (in code points, as used by $substrCP) where each page of a chapter body starts.
+    
+    Pages are close to `page_chars` long and end at the best break in their
+    second half, so the same body always splits the same way.
+    """
+    page_chars = page_chars or settings.CHAPTER_PAGE_CHARS
+    offsets = [0]
+    start = 0
+    while len(body) - start > page_chars:
+        limit = start + page_chars
+        cut = None
+        for pattern in _PAGE_BREAKS:
+            ends = [
+                match.end() for match in pattern.finditer(body, start + page_chars // 2, limit)
+                if not _inside_tag(body, start, match.start())
+            ]
+            if ends:
+                cut = ends[-1]
+                break
+        if cut is None:
+            # No break at all: cut hard, but never through a tag
+            cut = limit
+            tag_start = body.rfind("<", start, cut)
+            if _inside_tag(body, start, cut) and tag_start > start:
+                cut = tag_start
+        offsets.append(cut)
+        start = cut
+    return offsets
+
+
+def chapter_content_fields(body: str) -> Dict:
+    """Stored fields of a chapter body: the body, split into pages if compressed, and its page index"""
+    offsets = paginate_body(body)
+    return {**encode_body(body, offsets), "page_offsets": offsets}
+
+
+def order_key_taken(db: Session, post_id: int, order: int, exclude_id: Optional[int] = None) -> bool:
+    """Whether another chapter of the book already uses this order key"""
+    query = db.query(Chapter.id).filter(Chapter.post_id == post_id, Chapter.order == order)
+    if exclude_id is not None:
+        query = query.filter(Chapter.id != exclude_id)
+    return query.first() is not None
+
+
+def _assign_order_keys(db: Session, post_id: int, chapter_ids: List[int]):
+    """Give the chapters evenly spaced order keys in the given sequence with one UPDATE ... FROM (VALUES ...)"""
+    if not chapter_ids:
+        # An empty VALUES list is a syntax error
+        return
+    new_orders = values(column("id", Integer), column("new_order", Integer), name="new_orders").data(
+        [(chapter_id, (position + 1) * ORDER_GAP) for position, chapter_id in enumerate(chapter_ids)]
+    )
+    db.execute(
+        update(Chapter).where(Chapter.id == new_orders.c.id, Chapter.post_id == post_id)
+        .values(order=new_orders.c.new_order)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _order_key_after(db: Session, after: Chapter) -> int:
+    """An order key between `after` and the chapter that follows it"""
+    following = get_next_chapter(db, after)
+    if following is None:
+        return after.order + ORDER_GAP
+    if following.order - after.order > 1:
+        return (after.order + following.order) // 2
+    
+    # No room left between them: respace the whole book, then split the new gap
+    chapter_ids = [chapter_id for chapter_id, in db.query(Chapter.id).filter(
+        Chapter.post_id == after.post_id
+    ).order_by(Chapter.order, Chapter.id)]
+    _assign_order_keys(db, after.post_id, chapter_ids)
+    return (chapter_ids.index(after.id) + 1) * ORDER_GAP + ORDER_GAP // 2
+
+
+def _new_order_key(db: Session, chapter_data: ChapterCreate, post_id: int) -> int:
+    """Order key for a new chapter: after the given chapter, the explicit key, or at the end"""
+    if chapter_data.after_chapter_id is not None:
+        return _order_key_after(db, get_chapter(db, chapter_data.after_chapter_id))
+    if chapter_data.order is not None:
+        return chapter_data.order
+    last = db.query(func.max(Chapter.order)).filter(Chapter.post_id == post_id).scalar()
+    return (last or 0) + ORDER_GAP
+
+
+def reorder_chapters(db: Session, post_id: int, chapter_ids: List[int]):
+    """Apply a whole new reading order to a book in one statement"""
+    _assign_order_keys(db, post_id, chapter_ids)
+    db.commit()
 
 
 async def create_chapter(db: Session, chapter_data: ChapterCreate, post_id: int) -> Chapter:
@@ -16,7 +131,7 @@ async def create_chapter(db: Session, chapter_data: ChapterCreate, post_id: int)
     # Store chapter content in MongoDB
     mongo_db = get_mongo_db()
     content_doc = {
-        "body": chapter_data.content.body,
+        **chapter_content_fields(chapter_data.content.body),
         "created_at": datetime.now(timezone.utc),
         "updated_at": datetime.now(timezone.utc)
     }
@@ -24,14 +139,20 @@ async def create_chapter(db: Session, chapter_data: ChapterCreate, post_id: int)
     mongo_id = str(mongo_result.inserted_id)
     
     # Store metadata in PostgreSQL
-    db_chapter = Chapter(
-        title=chapter_data.title,
-        order=chapter_data.order,
-        mongo_id=mongo_id,
-        post_id=post_id
-    )
-    db.add(db_chapter)
-    db.commit()
+    try:
+        db_chapter = Chapter(
+            title=chapter_data.title,
+            order=_new_order_key(db, chapter_data, post_id),
+            mongo_id=mongo_id,
+            post_id=post_id
+        )
+        db.add(db_chapter)
+        db.commit()
+    except Exception:
+        # e.g. a concurrent insert took the same order key
+        db.rollback()
+        await mongo_db.chapters.delete_one({"_id": mongo_result.inserted_id})
+        raise
     db.refresh(db_chapter)
     return db_chapter
 
@@ -43,38 +164,119 @@ def get_chapter(db: Session, chapter_id: int) -> Optional[Chapter]:
 
 def get_chapters_by_post(db: Session, post_id: int) -> List[Chapter]:
     """Get all chapters for a post, ordered by order field"""
-    return db.query(Chapter).filter(Chapter.post_id == post_id).order_by(Chapter.order).all()
+    return db.query(Chapter).filter(Chapter.post_id == post_id).order_by(Chapter.order, Chapter.id).all()
+
+
+def get_next_chapter(db: Session, chapter: Chapter) -> Optional[Chapter]:
+    """Get the chapter that follows `chapter` in its book"""
+    return db.query(Chapter).filter(
+        Chapter.post_id == chapter.post_id,
+        tuple_(Chapter.order, Chapter.id) > (chapter.order, chapter.id)
+    ).order_by(Chapter.order, Chapter.id).first()
 
 
 async def get_chapter_content(mongo_id: str) -> Optional[ChapterContent]:
     """Get chapter content from MongoDB"""
     mongo_db = get_mongo_db()
-    doc = await mongo_db.chapters.find_one({"_id": ObjectId(mongo_id)})
+    doc = await mongo_db.chapters.find_one({"_id": ObjectId(mongo_id)}, BODY_FIELDS)
+    if not doc:
+        return None
+    return ChapterContent(body=decode_body(doc))
+
+
+async def get_chapter_contents(mongo_ids: List[str]) -> Dict[str, ChapterContent]:
+    """Get the content of several chapters in one MongoDB query, keyed by mongo_id"""
+    mongo_db = get_mongo_db()
+    contents = {}
+    async for doc in mongo_db.chapters.find({"_id": {"$in": [ObjectId(mongo_id) for mongo_id in mongo_ids]}}, BODY_FIELDS):
+        contents[str(doc["_id"])] = ChapterContent(body=decode_body(doc))
+    return contents
+
+
+async def get_chapter_page(mongo_id: str, page: int) -> Optional[ChapterPage]:
+    """Get one page of a chapter, selecting it in MongoDB so only that page is transferred.
+    
+    Plain bodies are sliced with $substrCP and compressed bodies are stored
+    page by page, so either way one query returns one page. Returns None if the chapter content is missing; `body` is None if the page is out of range.
+    """
+    mongo_db = get_mongo_db()
+    index = page - 1
+    pipeline = [
+        {"$match": {
+            "_id": ObjectId(mongo_id),
+            "page_offsets": {"$exists": True},
+            "body_format": {"$in": [None, BODY_FORMAT_PLAIN, BODY_FORMAT_ZLIB_PAGES]}
+        }},
+        {"$project": {
+            "body_format": 1,
+            "total_pages": {"$size": "$page_offsets"},
+            "body": {"$cond": [
+                {"$and": [{"$gte": [index, 0]}, {"$lt": [index, {"$size": "$page_offsets"}]}]},
+                {"$cond": [
+                    {"$isArray": "$body"},
+                    {"$arrayElemAt": ["$body", index]},
+                    {"$let": {
+                        "vars": {
+                            "start": {"$arrayElemAt": ["$page_offsets", index]},
+                            "end": {"$ifNull": [{"$arrayElemAt": ["$page_offsets", index + 1]}, {"$strLenCP": "$body"}]}
+                        },
+                        "in": {"$substrCP": ["$body", "$$start", {"$subtract": ["$$end", "$$start"]}]}
+                    }}
+                ]},
+                None
+            ]}
+        }}
+    ]
+    docs = await mongo_db.chapters.aggregate(pipeline).to_list(length=1)
+    if docs:
+        page_body = docs[0]["body"]
+        if page_body is not None and docs[0].get("body_format") == BODY_FORMAT_ZLIB_PAGES:
+            page_body = decode_page(page_body)
+        return ChapterPage(page=page, total_pages=docs[0]["total_pages"], body=page_body)
+    
+    # Written before pages existed, or compressed whole: store it in pages now
+    doc = await mongo_db.chapters.find_one({"_id": ObjectId(mongo_id)}, BODY_FIELDS)
     if not doc:
         return None
-    return ChapterContent(body=doc.get("body", ""))
+    body = decode_body(doc)
+    fields = chapter_content_fields(body)
+    # Matching the old body skips the rewrite if the chapter was edited meanwhile
+    await mongo_db.chapters.update_one({"_id": doc["_id"], "body": doc.get("body")}, {"$set": fields})
+    offsets = fields["page_offsets"]
+    page_body = None
+    if 0 <= index < len(offsets):
+        page_body = body[offsets[index]:offsets[index + 1] if index + 1 < len(offsets) else len(body)]
+    return ChapterPage(page=page, total_pages=len(offsets), body=page_body)
 
 
 async def update_chapter(db: Session, chapter: Chapter, chapter_data: dict) -> Chapter:
     """Update chapter"""
+    # Update PostgreSQL metadata first: the order key's unique constraint is
+    # only checked at commit, and a clash must not leave new content behind
+    if "title" in chapter_data:
+        chapter.title = chapter_data["title"]
+    if "order" in chapter_data:
+        chapter.order = chapter_data["order"]
+    if "content" in chapter_data:
+        # onupdate only fires when a column changes; exports are keyed on updated_at
+        chapter.updated_at = func.now()
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
     # Update MongoDB content if provided
     if "content" in chapter_data:
         mongo_db = get_mongo_db()
         await mongo_db.chapters.update_one(
             {"_id": ObjectId(chapter.mongo_id)},
             {"$set": {
-                "body": chapter_data["content"].body,
+                **chapter_content_fields(chapter_data["content"].body),
                 "updated_at": datetime.now(timezone.utc)
             }}
         )
     
-    # Update PostgreSQL metadata
-    if "title" in chapter_data:
-        chapter.title = chapter_data["title"]
-    if "order" in chapter_data:
-        chapter.order = chapter_data["order"]
-    
-    db.commit()
     db.refresh(chapter)
     return chapter
 
@@ -0,0 +1,182 @@
+"""
+Weekly digest emails of new posts in each reader's genres.
+
+A run covers the previous ISO week. Top new posts are computed once per
+genre, readers are grouped by their exact set of genres, and each group's
+digest is rendered once and sent in chunks through the transport's batch
+call. Every chunk is checkpointed in digest_deliveries before it is sent
+and marked sent (or failed) afterwards, so a rerun after a crash skips
+readers who already got the digest, retries failed chunks, and never
+re-sends a chunk whose outcome is unknown.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import text, update, exists, and_, func
+from sqlalchemy.dialects.postgresql import insert
+from app.config import get_settings
+from app.database.postgres import engine
+from app.database.mongo import get_mongo_db
+from app.models.digest_delivery import DigestDelivery
+from app.models.post import Post
+from app.models.user import User
+from app.utils.email_utils import render_digest_email
+from bson import ObjectId
+from bson.errors import InvalidId
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime, timedelta, timezone
+from loguru import logger
+
+settings = get_settings()
+
+# Held for the whole run so two runs never send at the same time
+DIGEST_LOCK_ID = 45045
+
+# Normalized genre set -> [(user id, email)]
+Groups = Dict[Tuple[str, ...], List[Tuple[int, str]]]
+
+
+def digest_period(now: Optional[datetime] = None) -> Tuple[str, datetime, datetime]:
+    """Key, start and end of the last complete ISO week (Monday 00:00 UTC to Monday 00:00 UTC)"""
+    now = now or datetime.now(timezone.utc)
+    end = datetime(now.year, now.month, now.day, tzinfo=timezone.utc) - timedelta(days=now.weekday())
+    start = end - timedelta(days=7)
+    year, week, _ = start.isocalendar()
+    return f"{year}-W{week:02d}", start, end
+
+
+def parse_genres(genre_tags: Optional[str]) -> Tuple[str, ...]:
+    """A user's comma-separated genre tags as a sorted, de-duplicated tuple"""
+    return tuple(sorted({tag.strip().lower() for tag in (genre_tags or "").split(",") if tag.strip()}))
+
+
+def group_recipients(db: Session, digest_key: str) -> Groups:
+    """Active readers with genres who haven't been checkpointed as sent or sending, grouped by genre set"""
+    already = exists().where(and_(
+        DigestDelivery.digest_key == digest_key,
+        DigestDelivery.user_id == User.id,
+        DigestDelivery.status.in_(["sent", "sending"])
+    ))
+    rows = db.query(User.id, User.email, User.genre_tags).filter(
+        User.is_active.is_(True),
+        User.genre_tags.isnot(None),
+        User.genre_tags != "",
+        ~already
+    ).order_by(User.id).yield_per(5000)
+    
+    groups: Groups = {}
+    for user_id, email, genre_tags in rows:
+        genres = parse_genres(genre_tags)
+        if genres:
+            groups.setdefault(genres, []).append((user_id, email))
+    return groups
+
+
+async def top_posts_by_genre(db: Session, start: datetime, end: datetime, genres: Set[str]) -> Dict[str, List[Dict]]:
+    """The most liked and clapped public posts published in the period, for each genre.
+    
+    A post belongs to its content type and to each of its tags.
+    """
+    rows = db.query(
+        Post.id, Post.title, Post.slug, Post.mongo_id, Post.content_type,
+        (Post.likes_count + Post.claps_count).label("engagement"), User.username
+    ).join(User, User.id == Post.author_id).filter(
+        Post.visibility == "public",
+        Post.created_at >= start,
+        Post.created_at < end
+    ).all()
+    if not rows:
+        return {}
+    
+    # One query for the tags of every candidate post
+    mongo_ids = []
+    for row in rows:
+        try:
+            mongo_ids.append(ObjectId(row.mongo_id))
+        except (InvalidId, TypeError):
+            continue
+    tags_by_id = {}
+    async for doc in get_mongo_db().posts.find({"_id": {"$in": mongo_ids}}, {"tags": 1}):
+        tags_by_id[str(doc["_id"])] = {str(tag).strip().lower() for tag in doc.get("tags") or []}
+    
+    by_genre: Dict[str, List] = {}
+    for row in rows:
+        post_genres = {(row.content_type or "article").lower()} | tags_by_id.get(row.mongo_id, set())
+        for genre in post_genres & genres:
+            by_genre.setdefault(genre, []).append(row)
+    
+    return {
+        genre: [
+            {"title": row.title, "slug": row.slug, "author": row.username}
+            for row in sorted(posts, key=lambda row: (-(row.engagement or 0), -row.id))[:settings.DIGEST_POSTS_PER_GENRE]
+        ]
+        for genre, posts in by_genre.items()
+    }
+
+
+def _checkpoint(db: Session, digest_key: str, user_ids: List[int]):
+    """Record a chunk as being sent (failed rows from an earlier run are taken over)"""
+    stmt = insert(DigestDelivery).values([
+        {"digest_key": digest_key, "user_id": user_id, "status": "sending"} for user_id in user_ids
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DigestDelivery.digest_key, DigestDelivery.user_id],
+        set_={"status": "sending", "error": None, "updated_at": func.now()},
+        where=DigestDelivery.status == "failed"
+    )
+    db.execute(stmt)
+    db.commit()
+
+
+def _mark(db: Session, digest_key: str, user_ids: List[int], status: str, error: Optional[str] = None):
+    """Record the outcome of a chunk"""
+    db.execute(update(DigestDelivery).where(
+        DigestDelivery.digest_key == digest_key,
+        DigestDelivery.user_id.in_(user_ids)
+    ).values(status=status, error=error))
+    db.commit()
+
+
+async def run_weekly_digest(db: Session, transport, now: Optional[datetime] = None) -> Dict:
+    """Send (or resume sending) the digest of the last complete week"""
+    digest_key, start, end = digest_period(now)
+    stats = {"digest_key": digest_key, "groups": 0, "sent": 0, "failed": 0, "skipped_unknown": 0}
+    
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": DIGEST_LOCK_ID}).scalar():
+            logger.info(f"Digest {digest_key} is already being sent elsewhere")
+            return {**stats, "status": "already_running"}
+        try:
+            stats["skipped_unknown"] = db.query(DigestDelivery).filter(
+                DigestDelivery.digest_key == digest_key,
+                DigestDelivery.status == "sending"
+            ).count()
+            if stats["skipped_unknown"]:
+                logger.warning(f"Digest {digest_key}: not re-sending {stats['skipped_unknown']} recipients from an interrupted run")
+            
+            groups = group_recipients(db, digest_key)
+            top = await top_posts_by_genre(db, start, end, {genre for genres in groups for genre in genres})
+            
+            for genres, recipients in groups.items():
+                sections = [(genre, top[genre]) for genre in genres if top.get(genre)]
+                if not sections:
+                    continue
+                stats["groups"] += 1
+                subject, html_content = render_digest_email(sections)
+                
+                for offset in range(0, len(recipients), settings.DIGEST_BATCH_SIZE):
+                    chunk = recipients[offset:offset + settings.DIGEST_BATCH_SIZE]
+                    user_ids = [user_id for user_id, _ in chunk]
+                    _checkpoint(db, digest_key, user_ids)
+                    try:
+                        await transport.send_batch([email for _, email in chunk], subject, html_content)
+                    except Exception as e:
+                        logger.error(f"Digest {digest_key}: batch of {len(chunk)} failed: {e}")
+                        _mark(db, digest_key, user_ids, "failed", str(e))
+                        stats["failed"] += len(chunk)
+                        continue
+                    _mark(db, digest_key, user_ids, "sent")
+                    stats["sent"] += len(chunk)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": DIGEST_LOCK_ID})
+    
+    logger.info(f"Digest {digest_key}: {stats}")
+    return {**stats, "status": "done"}
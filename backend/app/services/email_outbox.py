@@ -0,0 +1,204 @@
+"""
+Transactional email outbox.
+
+Requests add messages to the email_outbox table and return immediately; a
+background sender in every app process claims due messages in batches
+(FOR UPDATE SKIP LOCKED, so processes never send the same message), sends
+them concurrently over one keep-alive HTTP client and records the outcome.
+Failed sends are retried with exponential backoff until EMAIL_MAX_ATTEMPTS
+(configuration errors such as a rejected API key are retried until fixed);
+a claimed message whose sender died becomes due again once its lease
+expires. A message's HTML, which may contain a password reset token, is
+cleared once it is sent or has failed, and settled rows are deleted after
+EMAIL_RETENTION_DAYS.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, delete, func
+from app.config import get_settings
+from app.database.postgres import SessionLocal
+from app.models.email_outbox import EmailOutbox
+from app.utils.email_utils import EmailDeliveryError, create_transport
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from loguru import logger
+import asyncio
+import httpx
+import random
+import time
+
+settings = get_settings()
+
+# (id, to, subject, html, attempts) of a claimed message
+ClaimedEmail = Tuple[int, str, str, str, int]
+
+_client: Optional[httpx.AsyncClient] = None
+_transport = None
+_wakeup: Optional[asyncio.Event] = None
+_sender_task: Optional[asyncio.Task] = None
+_stopping = False
+_purged_at = 0.0
+
+
+def enqueue_email(db: Session, kind: str, to: str, subject: str, html_content: str) -> EmailOutbox:
+    """Add a message to the outbox; it is sent in the background"""
+    message = EmailOutbox(kind=kind, to_email=to, subject=subject, html_content=html_content)
+    db.add(message)
+    db.commit()
+    db.refresh(message)
+    if _wakeup is not None:
+        # Send right away rather than at the next poll
+        _wakeup.set()
+    return message
+
+
+def _claim_batch(limit: int) -> List[ClaimedEmail]:
+    """Lease up to `limit` due messages to this sender"""
+    db = SessionLocal()
+    try:
+        due = select(EmailOutbox.id).where(
+            EmailOutbox.status.in_(["pending", "sending"]),
+            EmailOutbox.next_attempt_at <= func.now()
+        ).order_by(EmailOutbox.next_attempt_at).limit(limit).with_for_update(skip_locked=True)
+        rows = db.execute(
+            update(EmailOutbox).where(EmailOutbox.id.in_(due.scalar_subquery())).values(
+                status="sending",
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=settings.EMAIL_LEASE_SECONDS)
+            ).returning(
+                EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.subject,
+                EmailOutbox.html_content, EmailOutbox.attempts
+            )
+        ).all()
+        db.commit()
+        return [tuple(row) for row in rows]
+    finally:
+        db.close()
+
+
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter so failed messages don't retry in lockstep"""
+    delay = min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _record_results(results: List[Tuple[ClaimedEmail, Optional[EmailDeliveryError]]]):
+    """Mark sent messages and schedule retries for failed ones"""
+    now = datetime.now(timezone.utc)
+    config_errors = [error for _, error in results if error is not None and error.config]
+    if config_errors:
+        logger.critical(f"Email transport is misconfigured, {len(config_errors)} messages will be retried: {config_errors[0]}")
+    db = SessionLocal()
+    try:
+        for (message_id, to, _, _, attempts), error in results:
+            if error is None:
+                values = {"status": "sent", "sent_at": now, "last_error": None, "html_content": ""}
+            elif error.permanent or (attempts >= settings.EMAIL_MAX_ATTEMPTS and not error.config):
+                logger.error(f"Giving up on email {message_id} to {to} after {attempts} attempts: {error}")
+                values = {"status": "failed", "last_error": str(error), "html_content": ""}
+            else:
+                values = {
+                    "status": "pending",
+                    "last_error": str(error),
+                    "next_attempt_at": now + timedelta(seconds=_retry_delay(attempts))
+                }
+            db.execute(update(EmailOutbox).where(EmailOutbox.id == message_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _purge_settled():
+    """Delete sent and failed messages older than the retention period"""
+    db = SessionLocal()
+    try:
+        # Rows settled before their HTML was cleared on completion
+        db.execute(update(EmailOutbox).where(
+            EmailOutbox.status.in_(["sent", "failed"]),
+            EmailOutbox.html_content != ""
+        ).values(html_content=""))
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.EMAIL_RETENTION_DAYS)
+        db.execute(delete(EmailOutbox).where(
+            EmailOutbox.status.in_(["sent", "failed"]),
+            func.coalesce(EmailOutbox.sent_at, EmailOutbox.created_at) < cutoff
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _send(message: ClaimedEmail) -> Tuple[ClaimedEmail, Optional[EmailDeliveryError]]:
+    """Send one claimed message, returning the error if it failed"""
+    _, to, subject, html_content, _ = message
+    try:
+        await _transport.send(to, subject, html_content)
+        return message, None
+    except EmailDeliveryError as e:
+        return message, e
+    except Exception as e:
+        return message, EmailDeliveryError(repr(e))
+
+
+async def process_outbox_batch() -> int:
+    """Claim, send and record one batch of due messages; returns how many were claimed"""
+    messages = await asyncio.to_thread(_claim_batch, settings.EMAIL_BATCH_SIZE)
+    if not messages:
+        return 0
+    results = await asyncio.gather(*[_send(message) for message in messages])
+    await asyncio.to_thread(_record_results, results)
+    return len(messages)
+
+
+async def _sender_loop():
+    """Send due messages until stopped, waking on new messages or every EMAIL_POLL_SECONDS"""
+    global _purged_at
+    while not _stopping:
+        _wakeup.clear()
+        claimed = 0
+        try:
+            claimed = await process_outbox_batch()
+            if time.monotonic() - _purged_at > 60 * 60:
+                _purged_at = time.monotonic()
+                await asyncio.to_thread(_purge_settled)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Email sender error: {e}")
+        if claimed >= settings.EMAIL_BATCH_SIZE:
+            # A full batch: more messages are probably due
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=settings.EMAIL_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def get_transport():
+    """The transport the sender uses (a StubTransport's sent list is useful in tests)"""
+    return _transport
+
+
+def start_email_sender():
+    """Create the shared HTTP client and transport and start the sender for this process"""
+    global _client, _transport, _wakeup, _sender_task, _stopping
+    _stopping = False
+    _client = httpx.AsyncClient(
+        timeout=settings.EMAIL_SEND_TIMEOUT_SECONDS,
+        limits=httpx.Limits(max_connections=settings.EMAIL_BATCH_SIZE, max_keepalive_connections=settings.EMAIL_BATCH_SIZE)
+    )
+    _transport = create_transport(_client)
+    _wakeup = asyncio.Event()
+    _sender_task = asyncio.create_task(_sender_loop())
+    logger.info(f"Email sender started with the {_transport.name} transport")
+
+
+async def stop_email_sender():
+    """Stop the sender and close the HTTP client; unsent messages stay in the outbox"""
+    global _client, _sender_task, _stopping
+    _stopping = True
+    if _sender_task is not None:
+        _sender_task.cancel()
+        await asyncio.gather(_sender_task, return_exceptions=True)
+        _sender_task = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
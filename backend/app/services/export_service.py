@@ -0,0 +1,294 @@
+"""
+Columnar export of engagement and content metadata for offline analysis.
+
+Each table is read through a server-side cursor in fixed-size batches;
+every batch is turned into Arrow columns and appended to a Parquet file,
+so memory stays bounded whatever the table size. Tables with timestamps
+are exported incrementally: a manifest in the export directory records
+the highest updated_at (or created_at) exported so far and the next run
+only writes newer rows to a new part file. Timestamps are taken when a
+transaction starts, so a row can commit after a run with a timestamp
+below its watermark; each run therefore re-reads the last
+EXPORT_WATERMARK_OVERLAP_SECONDS too, and readers keep the latest version
+of each row by the key recorded in the manifest. Deletions are not
+captured; run a full export to reconcile them. A Postgres advisory lock
+allows one export at a time.
+"""
+from sqlalchemy import select, func, text
+from sqlalchemy.engine import Connection
+from app.config import get_settings
+from app.database.postgres import engine
+from app.models.post import Post, post_likes, post_claps
+from app.models.comment import Comment
+from app.models.reading_progress import ReadingProgress
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from loguru import logger
+import asyncio
+import json
+import uuid
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only needed to run exports
+    pa = None
+    pq = None
+
+settings = get_settings()
+
+EXPORT_BATCH_SIZE = 10000
+MANIFEST_NAME = "manifest.json"
+# Held for the whole run so two exports never write the same manifest
+EXPORT_LOCK_ID = 38038
+
+# Exports started from the admin API in this process, keyed by job id
+_export_jobs: Dict[str, Dict] = {}
+_export_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _watermark(model):
+    """Last-change timestamp of a row: updated_at is only set after the first update"""
+    return func.coalesce(model.updated_at, model.created_at)
+
+
+def _export_tables() -> Dict[str, Dict]:
+    """Exported tables: the columns to select, their Arrow types, the watermark column and the row key"""
+    return {
+        "posts": {
+            "columns": [
+                (Post.id, pa.int64()), (Post.author_id, pa.int64()), (Post.title, pa.string()),
+                (Post.slug, pa.string()), (Post.visibility, pa.string()), (Post.content_type, pa.string()),
+                (Post.likes_count, pa.int64()), (Post.claps_count, pa.int64()),
+                (Post.created_at, pa.timestamp("us", tz="UTC")), (Post.updated_at, pa.timestamp("us", tz="UTC")),
+            ],
+            "watermark": _watermark(Post),
+            "key": ["id"],
+        },
+        "comments": {
+            "columns": [
+                (Comment.id, pa.int64()), (Comment.post_id, pa.int64()), (Comment.author_id, pa.int64()),
+                (Comment.parent_id, pa.int64()), (Comment.likes_count, pa.int64()),
+                (func.char_length(Comment.content).label("content_length"), pa.int64()),
+                (Comment.created_at, pa.timestamp("us", tz="UTC")), (Comment.updated_at, pa.timestamp("us", tz="UTC")),
+            ],
+            "watermark": _watermark(Comment),
+            "key": ["id"],
+        },
+        # Association tables have no timestamps and are always exported in full
+        "post_likes": {
+            "columns": [(post_likes.c.post_id, pa.int64()), (post_likes.c.user_id, pa.int64())],
+            "watermark": None,
+            "key": ["post_id", "user_id"],
+        },
+        "post_claps": {
+            "columns": [(post_claps.c.post_id, pa.int64()), (post_claps.c.user_id, pa.int64())],
+            "watermark": None,
+            "key": ["post_id", "user_id"],
+        },
+        "reading_progress": {
+            "columns": [
+                (ReadingProgress.id, pa.int64()), (ReadingProgress.user_id, pa.int64()),
+                (ReadingProgress.post_id, pa.int64()), (ReadingProgress.current_page, pa.int64()),
+                (ReadingProgress.total_pages, pa.int64()), (ReadingProgress.progress_percentage, pa.float64()),
+                (ReadingProgress.reading_time_minutes, pa.int64()),
+                (ReadingProgress.last_read_at, pa.timestamp("us", tz="UTC")),
+                (ReadingProgress.created_at, pa.timestamp("us", tz="UTC")),
+                (ReadingProgress.updated_at, pa.timestamp("us", tz="UTC")),
+            ],
+            "watermark": _watermark(ReadingProgress),
+            "key": ["id"],
+        },
+    }
+
+
+def _load_manifest(out_dir: Path) -> Dict:
+    """Read the per-table watermarks of earlier exports"""
+    path = out_dir / MANIFEST_NAME
+    if not path.exists():
+        return {"tables": {}}
+    return json.loads(path.read_text())
+
+
+def _save_manifest(out_dir: Path, manifest: Dict):
+    """Write the manifest atomically so an interrupted export keeps the previous one"""
+    path = out_dir / MANIFEST_NAME
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    tmp_path.replace(path)
+
+
+def export_table(
+    name: str,
+    spec: Dict,
+    out_dir: Path,
+    run_id: str,
+    since: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Dict:
+    """Stream one table into a Parquet part file; returns the row count and new watermark.
+    
+    An incremental export re-reads rows from EXPORT_WATERMARK_OVERLAP_SECONDS
+    before `since`, so its part can repeat rows of the previous one.
+    """
+    columns = [column for column, _ in spec["columns"]]
+    schema = pa.schema([(column.name, arrow_type) for column, arrow_type in spec["columns"]])
+    watermark = spec["watermark"]
+    
+    query = select(*columns)
+    if watermark is not None:
+        query = query.add_columns(watermark.label("_watermark"))
+        if since is not None:
+            query = query.where(watermark > since - timedelta(seconds=settings.EXPORT_WATERMARK_OVERLAP_SECONDS))
+    
+    table_dir = out_dir / name
+    table_dir.mkdir(parents=True, exist_ok=True)
+    final_path = table_dir / f"{name}-{run_id}.parquet"
+    tmp_path = final_path.with_suffix(".parquet.tmp")
+    
+    rows = 0
+    max_watermark = since
+    writer = None
+    try:
+        # yield_per streams from a server-side cursor so rows arrive batch by batch
+        with engine.connect().execution_options(yield_per=batch_size) as conn:
+            result = conn.execute(query)
+            for batch in result.partitions(batch_size):
+                arrays = [
+                    pa.array([row[index] for row in batch], type=arrow_type)
+                    for index, (_, arrow_type) in enumerate(spec["columns"])
+                ]
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                rows += len(batch)
+                if watermark is not None:
+                    batch_max = max(row[-1] for row in batch)
+                    max_watermark = batch_max if max_watermark is None else max(max_watermark, batch_max)
+    finally:
+        if writer is not None:
+            writer.close()
+    
+    if rows:
+        tmp_path.replace(final_path)
+    if watermark is None or since is None:
+        # A full export supersedes every earlier part
+        for part in table_dir.glob("*.parquet"):
+            if part != final_path:
+                part.unlink()
+    return {
+        "rows": rows,
+        "file": str(final_path) if rows else None,
+        "watermark": max_watermark.isoformat() if max_watermark else None
+    }
+
+
+def _try_export_lock() -> Optional[Connection]:
+    """Take the export lock; returns the connection holding it, or None if another export has it"""
+    conn = engine.connect()
+    if conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": EXPORT_LOCK_ID}).scalar():
+        return conn
+    conn.close()
+    return None
+
+
+def _release_export_lock(conn: Connection):
+    """Release the export lock and return its connection to the pool"""
+    try:
+        conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": EXPORT_LOCK_ID})
+    finally:
+        conn.close()
+
+
+def run_export(
+    out_dir: str,
+    incremental: bool = True,
+    tables: Optional[Iterable[str]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Dict:
+    """Export the selected tables (all by default) and update the manifest"""
+    lock = _try_export_lock()
+    if lock is None:
+        raise RuntimeError("Another export is already running")
+    try:
+        return _export(out_dir, incremental, tables, batch_size)
+    finally:
+        _release_export_lock(lock)
+
+
+def _export(out_dir: str, incremental: bool, tables: Optional[Iterable[str]], batch_size: int) -> Dict:
+    """Export while holding the lock"""
+    if pa is None:
+        raise RuntimeError("pyarrow is required for exports: pip install pyarrow")
+    
+    specs = _export_tables()
+    selected: List[str] = list(tables or specs.keys())
+    unknown = set(selected) - set(specs)
+    if unknown:
+        raise ValueError(f"Unknown export tables: {', '.join(sorted(unknown))}")
+    
+    out_path = Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(out_path)
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    
+    results = {}
+    for name in selected:
+        previous = manifest["tables"].get(name, {}).get("watermark") if incremental else None
+        since = datetime.fromisoformat(previous) if previous else None
+        result = export_table(name, specs[name], out_path, run_id, since, batch_size)
+        results[name] = result
+        logger.info(f"Exported {result['rows']} {name} rows")
+        
+        # Record progress per table so a failure later on doesn't redo finished tables
+        manifest["tables"][name] = {
+            "watermark": result["watermark"],
+            "key": specs[name]["key"],
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "last_run": run_id
+        }
+        _save_manifest(out_path, manifest)
+    
+    return {"run_id": run_id, "incremental": incremental, "tables": results}
+
+
+async def _run_export_job(job: Dict, lock: Connection):
+    """Run an export in a worker thread and record its outcome"""
+    try:
+        job["result"] = await asyncio.to_thread(
+            _export, settings.EXPORT_DIR, job["incremental"], None, EXPORT_BATCH_SIZE
+        )
+        job["status"] = "done"
+    except Exception as e:
+        logger.error(f"Export {job['id']} failed: {e}")
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished_at"] = datetime.now(timezone.utc).isoformat()
+        await asyncio.to_thread(_release_export_lock, lock)
+        _export_tasks.pop(job["id"], None)
+
+
+async def start_export_job(incremental: bool = True) -> Optional[Dict]:
+    """Start an export in the background; None when one is already running in any process"""
+    lock = await asyncio.to_thread(_try_export_lock)
+    if lock is None:
+        return None
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": "running",
+        "incremental": incremental,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "result": None,
+        "error": None
+    }
+    _export_jobs[job["id"]] = job
+    _export_tasks[job["id"]] = asyncio.create_task(_run_export_job(job, lock))
+    return job
+
+
+def get_export_job(job_id: str) -> Optional[Dict]:
+    """Get an export started in this process"""
+    return _export_jobs.get(job_id)
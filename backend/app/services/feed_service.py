@@ -2,14 +2,25 @@
 Service for generating personalized feed content
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_
+from sqlalchemy import desc, or_, select
 from app.models.user import User
-from app.models.post import Post
+from app.models.post import Post, post_likes, post_claps
 from app.models.reading_progress import ReadingProgress
 from app.models.comment import Comment
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 import asyncio
+import numpy as np
+
+# Ranking configuration for the "for you" section
+CANDIDATES_PER_SOURCE = 200
+RECENCY_HALF_LIFE_HOURS = 72.0
+WEIGHT_RECENCY = 1.0
+WEIGHT_ENGAGEMENT = 0.8
+WEIGHT_GENRE = 0.6
+WEIGHT_HISTORY = 0.5
+WEIGHT_FOLLOWED = 0.7
+AUTHOR_DIVERSITY_DECAY = 0.5  # Each extra post by the same author keeps this fraction of its score
 
 
 def get_personalized_feed(db: Session, user_id: int) -> Dict:
@@ -92,11 +103,15 @@ def get_personalized_feed(db: Session, user_id: int) -> Dict:
                 "progress": progress
             })
     
+    # Ranked "for you" section scored over the whole candidate pool
+    for_you = rank_feed(db, user, user_genres)
+    
     return {
         "latest_posts": latest_posts,
         "most_appreciated": most_appreciated,
         "genre_posts": genre_posts,
-        "current_reading": current_reading
+        "current_reading": current_reading,
+        "for_you": for_you
     }
 
 
@@ -114,3 +129,133 @@ def get_posts_by_genre(db: Session, genres: List[str], limit: int = 10) -> List[
     
     return posts
 
+
+
+def get_candidate_pool(db: Session, user: User, user_genres: List[str]) -> Tuple[List[Post], set, Dict[str, float]]:
+    """Collect ranking candidates: recent, trending, genre-matched and followed authors.
+    
+    Returns the de-duplicated candidates, the ids of authors the user follows
+    (authors they read, liked or clapped) and the user's reading-history share per content type.
+    """
+    base_query = db.query(Post).filter(
+        Post.visibility == "public",
+        Post.author_id != user.id
+    )
+    
+    # Authors the user engages with stand in for a followers table
+    followed_authors = set()
+    history_counts: Dict[str, int] = {}
+    read_rows = db.query(Post.author_id, Post.content_type).join(
+        ReadingProgress, ReadingProgress.post_id == Post.id
+    ).filter(ReadingProgress.user_id == user.id).all()
+    for author_id, content_type in read_rows:
+        followed_authors.add(author_id)
+        genre = (content_type or "article").lower()
+        history_counts[genre] = history_counts.get(genre, 0) + 1
+    
+    for table in (post_likes, post_claps):
+        rows = db.execute(
+            select(Post.author_id).join(table, table.c.post_id == Post.id).where(table.c.user_id == user.id)
+        ).all()
+        followed_authors.update(author_id for (author_id,) in rows)
+    followed_authors.discard(user.id)
+    
+    total_history = sum(history_counts.values())
+    history_share = {
+        genre: count / total_history for genre, count in history_counts.items()
+    } if total_history else {}
+    
+    sources = [
+        base_query.order_by(Post.created_at.desc()),
+        base_query.order_by(desc(Post.likes_count + Post.claps_count), desc(Post.created_at)),
+    ]
+    if user_genres:
+        sources.append(base_query.filter(Post.content_type.in_(user_genres)).order_by(Post.created_at.desc()))
+    if followed_authors:
+        sources.append(base_query.filter(Post.author_id.in_(followed_authors)).order_by(Post.created_at.desc()))
+    
+    candidates: Dict[int, Post] = {}
+    for query in sources:
+        for post in query.limit(CANDIDATES_PER_SOURCE).all():
+            candidates.setdefault(post.id, post)
+    
+    return list(candidates.values()), followed_authors, history_share
+
+
+def score_candidates(
+    age_hours: np.ndarray,
+    engagement: np.ndarray,
+    genre_match: np.ndarray,
+    history_affinity: np.ndarray,
+    followed: np.ndarray,
+    author_ids: np.ndarray,
+    k: int
+) -> np.ndarray:
+    """Score candidates in batch and return the indices of the top-k, best first.
+    
+    All inputs are 1-D arrays of equal length, one entry per candidate.
+    """
+    n = age_hours.shape[0]
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    
+    recency = np.exp(-np.log(2.0) * np.maximum(age_hours, 0.0) / RECENCY_HALF_LIFE_HOURS)
+    log_engagement = np.log1p(np.maximum(engagement, 0.0))
+    max_engagement = log_engagement.max()
+    if max_engagement > 0:
+        log_engagement /= max_engagement
+    
+    scores = (
+        WEIGHT_RECENCY * recency
+        + WEIGHT_ENGAGEMENT * log_engagement
+        + WEIGHT_GENRE * genre_match
+        + WEIGHT_HISTORY * history_affinity
+        + WEIGHT_FOLLOWED * followed
+    )
+    
+    # Author diversity: rank each post within its author by score and decay
+    # the score geometrically, so the n-th post by an author keeps DECAY**n of it
+    order = np.lexsort((-scores, author_ids))
+    sorted_authors = author_ids[order]
+    group_start = np.ones(n, dtype=bool)
+    group_start[1:] = sorted_authors[1:] != sorted_authors[:-1]
+    start_positions = np.maximum.accumulate(np.where(group_start, np.arange(n), 0))
+    rank_in_author = np.empty(n, dtype=np.int64)
+    rank_in_author[order] = np.arange(n) - start_positions
+    scores = scores * np.power(AUTHOR_DIVERSITY_DECAY, rank_in_author)
+    
+    k = min(k, n)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def rank_feed(db: Session, user: User, user_genres: List[str], k: int = 20) -> List[Post]:
+    """Rank the candidate pool for a user and return the top-k posts"""
+    candidates, followed_authors, history_share = get_candidate_pool(db, user, user_genres)
+    if not candidates:
+        return []
+    
+    now = datetime.now(timezone.utc)
+    genre_set = set(user_genres)
+    n = len(candidates)
+    age_hours = np.empty(n, dtype=np.float64)
+    engagement = np.empty(n, dtype=np.float64)
+    genre_match = np.empty(n, dtype=np.float64)
+    history_affinity = np.empty(n, dtype=np.float64)
+    followed = np.empty(n, dtype=np.float64)
+    author_ids = np.empty(n, dtype=np.int64)
+    
+    for i, post in enumerate(candidates):
+        created_at = post.created_at or now
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        genre = (post.content_type or "article").lower()
+        age_hours[i] = (now - created_at).total_seconds() / 3600.0
+        engagement[i] = (post.likes_count or 0) + (post.claps_count or 0)
+        genre_match[i] = 1.0 if genre in genre_set else 0.0
+        history_affinity[i] = history_share.get(genre, 0.0)
+        followed[i] = 1.0 if post.author_id in followed_authors else 0.0
+        author_ids[i] = post.author_id
+    
+    top = score_candidates(age_hours, engagement, genre_match, history_affinity, followed, author_ids, k)
+    return [candidates[i] for i in top]
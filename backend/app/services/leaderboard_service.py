@@ -0,0 +1,269 @@
+"""
+Leaderboards for top authors and posts.
+
+Scores live in Redis sorted sets (or an in-process fallback) and are
+updated as posts are published or removed and as likes and claps come in,
+so updates are O(log n) and reading the top k is O(log n + k). The
+all-time boards are seeded from PostgreSQL the first time they are read
+and re-seeded daily; daily and weekly post boards only hold engagement
+recorded during their period and expire on their own. Updates made while
+Redis is unreachable go to the in-process boards; once it is back, the
+all-time boards are re-seeded and the missed period increments replayed.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from app.database.redis import get_redis, is_redis_available
+from app.models.post import Post
+from app.models.user import User
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from loguru import logger
+import heapq
+
+AUTHORS_BY_POSTS = "authors:posts"
+AUTHORS_BY_ENGAGEMENT = "authors:engagement"
+POSTS_ALL_TIME = "posts:all"
+POSTS_DAY = "posts:day"
+POSTS_WEEK = "posts:week"
+
+AUTHOR_BOARDS = {"posts": AUTHORS_BY_POSTS, "engagement": AUTHORS_BY_ENGAGEMENT}
+POST_BOARDS = {"day": POSTS_DAY, "week": POSTS_WEEK, "all": POSTS_ALL_TIME}
+
+KEY_PREFIX = "leaderboard:"
+SEEDED_KEY = "leaderboard:seeded"  # Set with the seeded boards; expiring forces a periodic re-seed
+SEED_LOCK_KEY = "leaderboard:seeding"
+SEEDED_TTL_SECONDS = 24 * 60 * 60
+SEED_LOCK_SECONDS = 60
+
+# Period boards outlive their period a little so the previous one can still be read
+PERIOD_TTL_SECONDS = {POSTS_DAY: 2 * 24 * 60 * 60, POSTS_WEEK: 8 * 24 * 60 * 60}
+
+MAX_LIMIT = 100
+SEED_BATCH_SIZE = 1000
+
+# In-process fallback when Redis is unavailable: key -> member -> score
+_local_boards: Dict[str, Dict[str, float]] = {}
+_local_seeded = False
+
+# Period board increments that only reached _local_boards, replayed into Redis
+# once it is back (removals aren't: reads skip posts that are no longer public)
+_pending_period: Dict[str, Dict[str, float]] = {}
+_redis_dirty = False
+
+
+def _board_key(board: str, now: Optional[datetime] = None) -> str:
+    """Storage key of a board, including the current period for daily/weekly boards"""
+    now = now or datetime.now(timezone.utc)
+    if board == POSTS_DAY:
+        return f"{KEY_PREFIX}{board}:{now.strftime('%Y-%m-%d')}"
+    if board == POSTS_WEEK:
+        year, week, _ = now.isocalendar()
+        return f"{KEY_PREFIX}{board}:{year}-W{week:02d}"
+    return f"{KEY_PREFIX}{board}"
+
+
+def _period_board(key: str) -> Optional[str]:
+    """The daily/weekly board a key belongs to, if any"""
+    for board in PERIOD_TTL_SECONDS:
+        if key.startswith(f"{KEY_PREFIX}{board}:"):
+            return board
+    return None
+
+
+def _local_increment(boards: Dict[str, Dict[str, float]], key: str, member: str, amount: float):
+    """Add to a member's score in an in-process board set"""
+    if key not in boards:
+        board = _period_board(key)
+        if board:
+            # A new period started: drop the boards of earlier periods
+            for stale in [k for k in boards if _period_board(k) == board]:
+                del boards[stale]
+        boards[key] = {}
+    board = boards[key]
+    board[member] = board.get(member, 0) + amount
+
+
+async def _apply(increments: List[Tuple[str, str, float]], removals: List[Tuple[str, str]] = ()):
+    """Apply score increments and member removals, as one pipeline when Redis is available"""
+    if is_redis_available():
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for key, member, amount in increments:
+                pipe.zincrby(key, amount, member)
+                board = _period_board(key)
+                if board:
+                    pipe.expire(key, PERIOD_TTL_SECONDS[board])
+            for key, member in removals:
+                pipe.zrem(key, member)
+            await pipe.execute()
+            return
+        except Exception as e:
+            logger.warning(f"Failed to update leaderboards: {e}")
+    for key, member, amount in increments:
+        _local_increment(_local_boards, key, member, amount)
+    for key, member in removals:
+        _local_boards.get(key, {}).pop(member, None)
+    _mark_dirty(increments)
+
+
+def _mark_dirty(increments: List[Tuple[str, str, float]]):
+    """Remember that Redis missed these updates, if Redis is configured at all"""
+    global _redis_dirty
+    if get_redis() is None:
+        return
+    _redis_dirty = True
+    for key, member, amount in increments:
+        if _period_board(key):
+            _local_increment(_pending_period, key, member, amount)
+
+
+async def _reconcile():
+    """Replay period increments Redis missed; the caller re-seeds the all-time boards"""
+    global _redis_dirty
+    pending = dict(_pending_period)
+    if pending:
+        pipe = get_redis().pipeline(transaction=False)
+        for key, scores in pending.items():
+            for member, amount in scores.items():
+                pipe.zincrby(key, amount, member)
+            pipe.expire(key, PERIOD_TTL_SECONDS[_period_board(key)])
+        await pipe.execute()
+    for key in pending:
+        _pending_period.pop(key, None)
+    await get_redis().delete(SEEDED_KEY)
+    _redis_dirty = False
+
+
+async def record_post_engagement(post: Post, delta: int):
+    """Count a like, unlike or clap on a post; only public posts are on the boards"""
+    if not delta or post.visibility != "public":
+        return
+    await _apply([
+        (_board_key(POSTS_ALL_TIME), str(post.id), delta),
+        (_board_key(POSTS_DAY), str(post.id), delta),
+        (_board_key(POSTS_WEEK), str(post.id), delta),
+        (_board_key(AUTHORS_BY_ENGAGEMENT), str(post.author_id), delta),
+    ])
+
+
+async def add_post(post: Post):
+    """Put a newly public post and its current engagement on the boards"""
+    engagement = (post.likes_count or 0) + (post.claps_count or 0)
+    await _apply([
+        (_board_key(AUTHORS_BY_POSTS), str(post.author_id), 1),
+        (_board_key(POSTS_ALL_TIME), str(post.id), engagement),
+        (_board_key(AUTHORS_BY_ENGAGEMENT), str(post.author_id), engagement),
+    ])
+
+
+async def remove_post(post_id: int, author_id: int, engagement: int):
+    """Take a deleted or unpublished post off the boards"""
+    await _apply(
+        [
+            (_board_key(AUTHORS_BY_POSTS), str(author_id), -1),
+            (_board_key(AUTHORS_BY_ENGAGEMENT), str(author_id), -engagement),
+        ],
+        [(_board_key(board), str(post_id)) for board in (POSTS_ALL_TIME, POSTS_DAY, POSTS_WEEK)]
+    )
+
+
+async def seed_leaderboards(db: Session) -> bool:
+    """Rebuild the all-time boards from PostgreSQL; returns whether Redis was seeded"""
+    engagement = func.sum(Post.likes_count + Post.claps_count)
+    author_rows = db.query(Post.author_id, func.count(Post.id), func.coalesce(engagement, 0)).filter(
+        Post.visibility == "public"
+    ).group_by(Post.author_id).all()
+    post_rows = db.query(Post.id, Post.likes_count + Post.claps_count).filter(
+        Post.visibility == "public"
+    ).yield_per(SEED_BATCH_SIZE)
+    
+    boards = {
+        _board_key(AUTHORS_BY_POSTS): {str(author_id): count for author_id, count, _ in author_rows},
+        _board_key(AUTHORS_BY_ENGAGEMENT): {str(author_id): int(total) for author_id, _, total in author_rows},
+        _board_key(POSTS_ALL_TIME): {str(post_id): score or 0 for post_id, score in post_rows},
+    }
+    
+    if is_redis_available():
+        try:
+            pipe = get_redis().pipeline(transaction=True)
+            for key, scores in boards.items():
+                pipe.delete(key)
+                items = list(scores.items())
+                for start in range(0, len(items), SEED_BATCH_SIZE):
+                    pipe.zadd(key, dict(items[start:start + SEED_BATCH_SIZE]))
+            # Marked seeded in the same transaction, so a failed seed is retried
+            pipe.set(SEEDED_KEY, "1", ex=SEEDED_TTL_SECONDS)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to seed leaderboards in Redis: {e}")
+    _local_boards.update(boards)
+    return False
+
+
+async def _ensure_seeded(db: Session):
+    """Seed the all-time boards if they aren't (or Redis missed updates while unreachable)"""
+    global _local_seeded
+    if is_redis_available():
+        redis_client = get_redis()
+        try:
+            if _redis_dirty:
+                await _reconcile()
+            if await redis_client.exists(SEEDED_KEY):
+                return
+            # One process seeds at a time; the lock expires if it dies midway
+            if await redis_client.set(SEED_LOCK_KEY, "1", nx=True, ex=SEED_LOCK_SECONDS):
+                try:
+                    await seed_leaderboards(db)
+                finally:
+                    await redis_client.delete(SEED_LOCK_KEY)
+            return
+        except Exception as e:
+            logger.warning(f"Failed to check leaderboard seeding: {e}")
+    if not _local_seeded:
+        _local_seeded = True
+        await seed_leaderboards(db)
+
+
+async def _top(board: str, limit: int) -> List[Tuple[int, float]]:
+    """Top (member id, score) pairs of a board, highest first"""
+    key = _board_key(board)
+    if is_redis_available():
+        try:
+            return [(int(member), score) for member, score in await get_redis().zrevrange(key, 0, limit - 1, withscores=True)]
+        except Exception as e:
+            logger.warning(f"Failed to read leaderboard {key}: {e}")
+    scores = _local_boards.get(key, {})
+    return [(int(member), score) for member, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1])]
+
+
+async def get_top_authors(db: Session, by: str = "posts", limit: int = 10) -> List[Dict]:
+    """Top authors by public post count or by engagement (likes + claps) received"""
+    await _ensure_seeded(db)
+    top = [(author_id, score) for author_id, score in await _top(AUTHOR_BOARDS[by], min(limit, MAX_LIMIT)) if score > 0]
+    users = {user.id: user for user in db.query(User).filter(User.id.in_([author_id for author_id, _ in top])).all()} if top else {}
+    return [
+        {"user_id": author_id, "username": users[author_id].username, "score": int(score)}
+        for author_id, score in top if author_id in users
+    ]
+
+
+async def get_top_posts(db: Session, period: str = "all", limit: int = 10) -> List[Dict]:
+    """Top public posts by engagement during the current day, week or all time"""
+    await _ensure_seeded(db)
+    top = [(post_id, score) for post_id, score in await _top(POST_BOARDS[period], min(limit, MAX_LIMIT)) if score > 0]
+    posts = {post.id: post for post in db.query(Post).filter(
+        Post.id.in_([post_id for post_id, _ in top]),
+        Post.visibility == "public"
+    ).all()} if top else {}
+    return [
+        {
+            "post_id": post_id,
+            "title": posts[post_id].title,
+            "slug": posts[post_id].slug,
+            "author_id": posts[post_id].author_id,
+            "content_type": posts[post_id].content_type,
+            "score": int(score)
+        }
+        for post_id, score in top if post_id in posts
+    ]
@@ -1,25 +1,50 @@
 from sqlalchemy.orm import Session
-from app.models.post import Post
+from sqlalchemy import select, exists, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from app.models.post import Post, post_likes, post_claps
 from app.models.user import User
 from app.schemas.post_schema import PostCreate, PostContent
 from app.database.mongo import get_mongo_db
+from app.utils.text_stats import compute_text_stats
+from app.utils.process_pool import run_cpu_bound
+from app.utils.content_codec import encode_body, decode_body
+from app.services.author_stats_service import record_post_published, rebuild_author_stats
+from app.services import leaderboard_service
 from bson import ObjectId
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
+from loguru import logger
+import asyncio
+
+
+async def _text_stats(body: str) -> Optional[Dict]:
+    """Stats of a post body, or None if the process pool is too busy to compute them in time.
+    
+    Posts without stats are filled in by the analytics backfill, so a busy
+    pool must not fail the write.
+    """
+    try:
+        return await run_cpu_bound(compute_text_stats, body)
+    except asyncio.TimeoutError:
+        logger.warning("Timed out computing post stats, saving the post without them")
+        return None
 
 
 async def create_post(db: Session, post_data: PostCreate, author_id: int) -> Post:
     """Create a new post"""
     # Store content in MongoDB
     mongo_db = get_mongo_db()
+    stats = await _text_stats(post_data.content.body)
     content_doc = {
-        "body": post_data.content.body,
+        **encode_body(post_data.content.body),
         "tags": post_data.content.tags,
         "cover_image_url": post_data.content.cover_image_url if hasattr(post_data.content, 'cover_image_url') else None,
         "description": post_data.content.description if hasattr(post_data.content, 'description') else None,
         "created_at": datetime.now(timezone.utc),
         "updated_at": datetime.now(timezone.utc)
     }
+    if stats is not None:
+        content_doc["stats"] = stats
     # Use await for async MongoDB operations
     mongo_result = await mongo_db.posts.insert_one(content_doc)
     mongo_id = str(mongo_result.inserted_id)
@@ -36,6 +61,9 @@ async def create_post(db: Session, post_data: PostCreate, author_id: int) -> Pos
     db.add(db_post)
     db.commit()
     db.refresh(db_post)
+    record_post_published(db, db_post)
+    if db_post.visibility == "public":
+        await leaderboard_service.add_post(db_post)
     return db_post
 
 
@@ -56,7 +84,7 @@ async def get_post_content(mongo_id: str) -> Optional[PostContent]:
     if not doc:
         return None
     return PostContent(
-        body=doc.get("body", ""),
+        body=decode_body(doc),
         tags=doc.get("tags", []),
         cover_image_url=doc.get("cover_image_url"),
         description=doc.get("description")
@@ -65,6 +93,8 @@ async def get_post_content(mongo_id: str) -> Optional[PostContent]:
 
 async def update_post(db: Session, post: Post, post_data: dict) -> Post:
     """Update post"""
+    was_public = post.visibility == "public"
+    
     # Update MongoDB content if provided
     if "content" in post_data:
         mongo_db = get_mongo_db()
@@ -74,18 +104,23 @@ async def update_post(db: Session, post: Post, post_data: dict) -> Post:
         if isinstance(content, dict):
             # Content is already a dictionary (from .dict())
             update_fields = {
-                "body": content.get("body"),
                 "tags": content.get("tags", []),
                 "updated_at": datetime.now(timezone.utc)
             }
+            if content.get("body") is not None:
+                update_fields.update(encode_body(content["body"]))
+            else:
+                update_fields["body"] = None
             if content.get("cover_image_url"):
                 update_fields["cover_image_url"] = content["cover_image_url"]
             if content.get("description"):
                 update_fields["description"] = content["description"]
+            if content.get("body") is not None:
+                update_fields["stats"] = await _text_stats(content["body"])
         else:
             # Content is a Pydantic model object
             update_fields = {
-                "body": content.body,
+                **encode_body(content.body),
                 "tags": content.tags,
                 "updated_at": datetime.now(timezone.utc)
             }
@@ -93,11 +128,14 @@ async def update_post(db: Session, post: Post, post_data: dict) -> Post:
                 update_fields["cover_image_url"] = content.cover_image_url
             if hasattr(content, 'description') and content.description is not None:
                 update_fields["description"] = content.description
+            update_fields["stats"] = await _text_stats(content.body)
         
-        await mongo_db.posts.update_one(
-            {"_id": ObjectId(post.mongo_id)},
-            {"$set": update_fields}
-        )
+        update = {"$set": update_fields}
+        if "stats" in update_fields and update_fields["stats"] is None:
+            # Drop the old body's stats so the backfill recomputes them
+            del update_fields["stats"]
+            update["$unset"] = {"stats": ""}
+        await mongo_db.posts.update_one({"_id": ObjectId(post.mongo_id)}, update)
     
     # Update PostgreSQL metadata
     if "title" in post_data:
@@ -108,9 +146,22 @@ async def update_post(db: Session, post: Post, post_data: dict) -> Post:
         post.visibility = post_data["visibility"]
     if "content_type" in post_data:
         post.content_type = post_data["content_type"]
+    if "content" in post_data:
+        # onupdate only fires when a column changes; book exports are keyed on updated_at
+        post.updated_at = func.now()
     
     db.commit()
     db.refresh(post)
+    
+    # Publishing, unpublishing or retyping changes the author's counters and streak history
+    if "visibility" in post_data or "content_type" in post_data:
+        rebuild_author_stats(db, post.author_id)
+    
+    is_public = post.visibility == "public"
+    if is_public and not was_public:
+        await leaderboard_service.add_post(post)
+    elif was_public and not is_public:
+        await leaderboard_service.remove_post(post.id, post.author_id, post.likes_count + post.claps_count)
     return post
 
 
@@ -121,8 +172,14 @@ async def delete_post(db: Session, post: Post):
     await mongo_db.posts.delete_one({"_id": ObjectId(post.mongo_id)})
     
     # Delete from PostgreSQL
+    post_id, author_id = post.id, post.author_id
+    was_public = post.visibility == "public"
+    engagement = post.likes_count + post.claps_count
     db.delete(post)
     db.commit()
+    rebuild_author_stats(db, author_id)
+    if was_public:
+        await leaderboard_service.remove_post(post_id, author_id, engagement)
 
 
 def get_public_posts(db: Session, skip: int = 0, limit: int = 20, sort_by: str = "latest", search: Optional[str] = None, content_type: Optional[str] = None) -> tuple[List[Post], int]:
@@ -159,4 +216,43 @@ def get_user_posts(db: Session, user_id: int, include_drafts: bool = False) -> L
     query = db.query(Post).filter(Post.author_id == user_id)
     if not include_drafts:
         query = query.filter(Post.visibility == "public")
-    return query.order_by(Post.created_at.desc()).all()
\ No newline at end of file
+    return query.order_by(Post.created_at.desc()).all()
+
+
+def toggle_post_like(db: Session, post: Post, user_id: int) -> int:
+    """Like or unlike a post for a user; returns the change in likes (+1 or -1).
+    
+    Works on the post_likes rows directly so the post's liked_by list is never loaded.
+    """
+    removed = db.execute(
+        delete(post_likes).where(post_likes.c.post_id == post.id, post_likes.c.user_id == user_id)
+    ).rowcount
+    if removed:
+        delta = -1
+    else:
+        added = db.execute(
+            insert(post_likes).values(post_id=post.id, user_id=user_id).on_conflict_do_nothing()
+        ).rowcount
+        delta = 1 if added else 0
+    if delta:
+        post.likes_count = func.greatest(Post.likes_count + delta, 0)
+    db.commit()
+    db.refresh(post)
+    return delta
+
+
+def add_post_clap(db: Session, post: Post, user_id: int):
+    """Add a clap to a post and remember that the user clapped"""
+    db.execute(insert(post_claps).values(post_id=post.id, user_id=user_id).on_conflict_do_nothing())
+    post.claps_count = Post.claps_count + 1
+    db.commit()
+    db.refresh(post)
+
+
+def get_user_engagement(db: Session, post_id: int, user_id: int) -> tuple[bool, bool]:
+    """Whether a user has liked and clapped a post"""
+    is_liked, has_clapped = db.execute(select(
+        exists().where(post_likes.c.post_id == post_id, post_likes.c.user_id == user_id),
+        exists().where(post_claps.c.post_id == post_id, post_claps.c.user_id == user_id)
+    )).one()
+    return is_liked, has_clapped
@@ -0,0 +1,118 @@
+"""
+Cache of the authenticated principal.
+
+Authorization only needs a user's id, username and admin/active flags, so
+authenticated requests resolve those from a short-lived in-process LRU,
+then Redis, and only query the users table (for those four columns) on a
+miss. Entries are dropped when a user is updated or deleted; other app
+processes see the change once their in-process entry expires.
+"""
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database.redis import get_redis, is_redis_available
+from app.models.user import User
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Optional, Tuple
+from loguru import logger
+import json
+import time
+
+settings = get_settings()
+
+PRINCIPAL_KEY = "principal:{user_id}"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The fields of a user needed to authorize a request"""
+    id: int
+    username: str
+    is_admin: bool
+    is_active: bool
+
+
+# user id -> (expiry timestamp, principal), least recently used first
+_local_principals: "OrderedDict[int, Tuple[float, Principal]]" = OrderedDict()
+
+
+def _local_get(user_id: int) -> Optional[Principal]:
+    """Read an unexpired principal from the in-process LRU"""
+    entry = _local_principals.get(user_id)
+    if entry is None:
+        return None
+    expires_at, principal = entry
+    if expires_at < time.monotonic():
+        del _local_principals[user_id]
+        return None
+    _local_principals.move_to_end(user_id)
+    return principal
+
+
+def _local_put(principal: Principal):
+    """Store a principal in the in-process LRU, evicting the least recently used"""
+    _local_principals[principal.id] = (time.monotonic() + settings.PRINCIPAL_LOCAL_TTL_SECONDS, principal)
+    _local_principals.move_to_end(principal.id)
+    while len(_local_principals) > settings.PRINCIPAL_CACHE_SIZE:
+        _local_principals.popitem(last=False)
+
+
+async def _redis_get(user_id: int) -> Optional[Principal]:
+    """Read a principal cached in Redis"""
+    if not is_redis_available():
+        return None
+    try:
+        raw = await get_redis().get(PRINCIPAL_KEY.format(user_id=user_id))
+        return Principal(**json.loads(raw)) if raw else None
+    except Exception as e:
+        logger.warning(f"Failed to read cached principal for user {user_id}: {e}")
+        return None
+
+
+async def _redis_put(principal: Principal):
+    """Cache a principal in Redis"""
+    if not is_redis_available():
+        return
+    try:
+        await get_redis().setex(
+            PRINCIPAL_KEY.format(user_id=principal.id),
+            settings.PRINCIPAL_REDIS_TTL_SECONDS,
+            json.dumps(asdict(principal))
+        )
+    except Exception as e:
+        logger.warning(f"Failed to cache principal for user {principal.id}: {e}")
+
+
+async def get_principal(db: Session, user_id: int) -> Optional[Principal]:
+    """Get the principal for a user id, or None if the user doesn't exist"""
+    principal = _local_get(user_id)
+    if principal is not None:
+        return principal
+    
+    principal = await _redis_get(user_id)
+    if principal is None:
+        row = db.query(User.id, User.username, User.is_admin, User.is_active).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        principal = Principal(
+            id=row.id,
+            username=row.username,
+            is_admin=bool(row.is_admin),
+            is_active=bool(row.is_active)
+        )
+        await _redis_put(principal)
+    
+    _local_put(principal)
+    return principal
+
+
+async def invalidate_principal(*user_ids: Optional[int]):
+    """Drop cached principals after a user was updated, deactivated or deleted"""
+    user_ids = {uid for uid in user_ids if uid is not None}
+    for user_id in user_ids:
+        _local_principals.pop(user_id, None)
+    if user_ids and is_redis_available():
+        try:
+            await get_redis().delete(*[PRINCIPAL_KEY.format(user_id=user_id) for user_id in user_ids])
+        except Exception as e:
+            logger.warning(f"Failed to invalidate principals for users {sorted(user_ids)}: {e}")
@@ -0,0 +1,193 @@
+"""
+Daily platform rollups.
+
+Activity is counted per UTC day in the small daily_rollups table so that
+time-series views read a handful of rows instead of scanning raw tables.
+Write paths add to the current day as events happen; the scheduled job
+recomputes the metrics that can be derived from raw tables (users, posts,
+comments) so missed or reverted events are corrected. Likes, claps and
+reading minutes have no per-event timestamps and are only counted as they
+happen.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from app.config import get_settings
+from app.database.postgres import SessionLocal
+from app.models.daily_rollup import DailyRollup
+from app.models.user import User
+from app.models.post import Post
+from app.models.comment import Comment
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, time, timedelta, timezone
+from loguru import logger
+import asyncio
+
+settings = get_settings()
+
+METRIC_NEW_USERS = "new_users"
+METRIC_POSTS = "posts"  # Dimension: content type
+METRIC_COMMENTS = "comments"
+METRIC_LIKES = "likes"  # Net of unlikes
+METRIC_CLAPS = "claps"
+METRIC_READING_MINUTES = "reading_minutes"
+
+METRICS = [
+    METRIC_NEW_USERS, METRIC_POSTS, METRIC_COMMENTS,
+    METRIC_LIKES, METRIC_CLAPS, METRIC_READING_MINUTES
+]
+
+# Longest range a single time-series request may cover
+MAX_RANGE_DAYS = 3 * 366
+
+
+def utc_today() -> date:
+    """Current UTC day"""
+    return datetime.now(timezone.utc).date()
+
+
+def record_event(db: Session, metric: str, amount: int = 1, dimension: str = ""):
+    """Add an event to today's rollup with a single upsert.
+    
+    Runs after the caller's own commit; failures are logged and never
+    break the request (the scheduled job corrects derivable metrics).
+    """
+    if not amount:
+        return
+    stmt = insert(DailyRollup).values(
+        day=utc_today(), metric=metric, dimension=dimension or "", value=amount
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyRollup.day, DailyRollup.metric, DailyRollup.dimension],
+        set_={"value": DailyRollup.value + stmt.excluded.value, "updated_at": func.now()}
+    )
+    try:
+        db.execute(stmt)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to record {metric} rollup event: {e}")
+
+
+def _day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """UTC start and end of a day"""
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def _count_by_day(db: Session, created_at, start: date, end: date, dimension=None) -> List[Tuple]:
+    """Count rows per UTC day (and dimension) created between start and end inclusive"""
+    day = func.date(func.timezone("UTC", created_at))
+    columns = [day.label("day")]
+    if dimension is not None:
+        columns.append(func.coalesce(dimension, "").label("dimension"))
+    columns.append(func.count().label("value"))
+    
+    range_start, _ = _day_bounds(start)
+    _, range_end = _day_bounds(end)
+    query = db.query(*columns).filter(created_at >= range_start, created_at < range_end)
+    return query.group_by(*[column.name for column in columns[:-1]]).all()
+
+
+def rollup_days(db: Session, start: date, end: date):
+    """Recompute the derivable metrics for every day from start to end inclusive"""
+    rows = []
+    for day, value in _count_by_day(db, User.created_at, start, end):
+        rows.append({"day": day, "metric": METRIC_NEW_USERS, "dimension": "", "value": value})
+    for day, content_type, value in _count_by_day(db, Post.created_at, start, end, Post.content_type):
+        rows.append({"day": day, "metric": METRIC_POSTS, "dimension": content_type, "value": value})
+    for day, value in _count_by_day(db, Comment.created_at, start, end):
+        rows.append({"day": day, "metric": METRIC_COMMENTS, "dimension": "", "value": value})
+    
+    # Days (or content types) with no rows left are reset rather than kept stale
+    db.query(DailyRollup).filter(
+        DailyRollup.day >= start,
+        DailyRollup.day <= end,
+        DailyRollup.metric.in_([METRIC_NEW_USERS, METRIC_POSTS, METRIC_COMMENTS])
+    ).delete(synchronize_session=False)
+    if rows:
+        stmt = insert(DailyRollup).values(rows)
+        # Another process may be running the same recompute
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyRollup.day, DailyRollup.metric, DailyRollup.dimension],
+            set_={"value": stmt.excluded.value, "updated_at": func.now()}
+        )
+        db.execute(stmt)
+    db.commit()
+
+
+def run_rollup(days: int = 2):
+    """Recompute the last `days` days (including today) with a dedicated session"""
+    end = utc_today()
+    db = SessionLocal()
+    try:
+        rollup_days(db, end - timedelta(days=days - 1), end)
+    finally:
+        db.close()
+
+
+async def rollup_scheduler():
+    """Recompute recent rollups periodically until cancelled.
+    
+    The recompute is idempotent, so several app processes running it is harmless.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(run_rollup, settings.ROLLUP_LOOKBACK_DAYS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Daily rollup failed: {e}")
+        await asyncio.sleep(settings.ROLLUP_INTERVAL_SECONDS)
+
+
+def get_timeseries(
+    db: Session,
+    start: date,
+    end: date,
+    metrics: Optional[Iterable[str]] = None
+) -> Dict:
+    """Daily values of the given metrics between start and end inclusive, zero-filled.
+    
+    Metrics with dimensions also get a per-dimension breakdown.
+    """
+    metrics = list(metrics or METRICS)
+    rows = db.query(DailyRollup.day, DailyRollup.metric, DailyRollup.dimension, DailyRollup.value).filter(
+        DailyRollup.day >= start,
+        DailyRollup.day <= end,
+        DailyRollup.metric.in_(metrics)
+    ).all()
+    
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    totals: Dict[str, Dict[date, int]] = {metric: {} for metric in metrics}
+    breakdowns: Dict[str, Dict[str, Dict[date, int]]] = {}
+    for day, metric, dimension, value in rows:
+        totals[metric][day] = totals[metric].get(day, 0) + value
+        if dimension:
+            by_day = breakdowns.setdefault(metric, {}).setdefault(dimension, {})
+            by_day[day] = by_day.get(day, 0) + value
+    
+    series = {}
+    for metric in metrics:
+        series[metric] = {
+            "total": sum(totals[metric].values()),
+            "points": [{"date": day.isoformat(), "value": totals[metric].get(day, 0)} for day in days]
+        }
+        if metric in breakdowns:
+            series[metric]["by_dimension"] = {
+                dimension: [{"date": day.isoformat(), "value": by_day.get(day, 0)} for day in days]
+                for dimension, by_day in sorted(breakdowns[metric].items())
+            }
+    
+    return {"start": start.isoformat(), "end": end.isoformat(), "series": series}
+
+
+def get_metric_totals(db: Session, start: date, end: date) -> Dict[str, int]:
+    """Sum of every metric between start and end inclusive"""
+    rows = db.query(DailyRollup.metric, func.sum(DailyRollup.value)).filter(
+        DailyRollup.day >= start,
+        DailyRollup.day <= end
+    ).group_by(DailyRollup.metric).all()
+    totals = {metric: 0 for metric in METRICS}
+    totals.update({metric: int(value or 0) for metric, value in rows})
+    return totals
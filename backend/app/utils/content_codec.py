@@ -0,0 +1,65 @@
+"""
+Storage format of post and chapter bodies in MongoDB.
+
+Bodies of at least CONTENT_COMPRESSION_MIN_BYTES (UTF-8) are stored as
+zlib-compressed BSON binary with body_format set to the codec version;
+smaller bodies stay plain strings. Bodies split into pages (chapters) are
+compressed page by page into an array, so one page can be read without the
+rest. Documents written before body_format existed have no such field and
+are plain. Writers store encode_body()'s fields and readers call
+decode_body(), so all formats can coexist and a new codec only needs a new
+format version.
+"""
+from bson import Binary
+from app.config import get_settings
+from typing import Dict, List, Optional
+import zlib
+
+settings = get_settings()
+
+BODY_FORMAT_PLAIN = "plain"
+BODY_FORMAT_ZLIB = "zlib-v1"
+BODY_FORMAT_ZLIB_PAGES = "zlib-pages-v1"  # One compressed chunk per page
+
+# Include in projections that read "body"
+BODY_FIELDS = {"body": 1, "body_format": 1}
+
+
+def _compress(text: str) -> Binary:
+    return Binary(zlib.compress(text.encode("utf-8"), settings.CONTENT_COMPRESSION_LEVEL))
+
+
+def encode_body(body: str, page_offsets: Optional[List[int]] = None) -> Dict:
+    """The body and body_format fields to store for a body, split at `page_offsets` if given"""
+    raw = body.encode("utf-8")
+    if settings.CONTENT_COMPRESSION_ENABLED and len(raw) >= settings.CONTENT_COMPRESSION_MIN_BYTES:
+        if page_offsets:
+            ends = [*page_offsets[1:], len(body)]
+            pages = [_compress(body[start:end]) for start, end in zip(page_offsets, ends)]
+            if sum(len(page) for page in pages) < len(raw):
+                return {"body": pages, "body_format": BODY_FORMAT_ZLIB_PAGES}
+        else:
+            compressed = _compress(body)
+            if len(compressed) < len(raw):
+                return {"body": compressed, "body_format": BODY_FORMAT_ZLIB}
+    return {"body": body, "body_format": BODY_FORMAT_PLAIN}
+
+
+def decode_page(page: bytes) -> str:
+    """One page of a body stored as BODY_FORMAT_ZLIB_PAGES"""
+    return zlib.decompress(page).decode("utf-8")
+
+
+def decode_body(doc: Dict) -> str:
+    """The body of a post or chapter document, whichever format it is stored in"""
+    body = doc.get("body")
+    if body is None:
+        return ""
+    body_format = doc.get("body_format", BODY_FORMAT_PLAIN)
+    if body_format == BODY_FORMAT_PLAIN:
+        return body
+    if body_format == BODY_FORMAT_ZLIB:
+        return zlib.decompress(body).decode("utf-8")
+    if body_format == BODY_FORMAT_ZLIB_PAGES:
+        return "".join(decode_page(page) for page in body)
+    raise ValueError(f"Unknown body format: {body_format}")
@@ -1,14 +1,16 @@
 from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
+from typing import Optional
+from loguru import logger
+import urllib.parse
 from app.database.postgres import get_db
 from app.models.user import User
+from app.services.principal_cache import Principal, get_principal
 from app.utils.jwt_handler import verify_token
 
-async def get_current_user(
-    request: Request,
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
+
+def get_access_token(request: Request) -> Optional[str]:
+    """Get the raw access token from the Authorization header or cookie"""
     # Try to get access token from Authorization header first
     authorization = request.headers.get("Authorization")
     access_token = None
@@ -20,24 +22,30 @@ async def get_current_user(
         access_token = request.cookies.get("access_token")
     
     if not access_token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
+        return None
     
     # URL decode the token if needed (cookies might be URL-encoded)
-    import urllib.parse
     try:
         # Try to decode in case it's URL-encoded
         access_token = urllib.parse.unquote(access_token)
     except:
         pass  # If decoding fails, use original token
+    return access_token
+
+
+async def get_token_user_id(request: Request) -> int:
+    """Get the user id from the request's access token"""
+    access_token = get_access_token(request)
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated"
+        )
     
     # Verify token
-    payload = verify_token(access_token, token_type="access")
+    payload = await verify_token(access_token, token_type="access")
     if payload is None:
         # Log for debugging
-        from loguru import logger
         logger.warning(f"Token verification failed - token length: {len(access_token)}, first 20 chars: {access_token[:20]}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,32 +61,53 @@ async def get_current_user(
     
     # Convert string user_id back to int
     try:
-        user_id: int = int(user_id_str)
+        return int(user_id_str)
     except (ValueError, TypeError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token"
         )
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+
+
+async def get_current_principal(
+    request: Request,
+    db: Session = Depends(get_db)
+) -> Principal:
+    """Get the current authenticated user's id, username and flags (cached)"""
+    user_id = await get_token_user_id(request)
+    principal = await get_principal(db, user_id)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
-    if not user.is_active:
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Inactive user"
         )
     
+    return principal
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get current authenticated user as a full row, for handlers that read or modify it"""
+    user = db.get(User, principal.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
     return user
 
 
 async def get_current_admin(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_principal)
+) -> Principal:
     """Get current admin user"""
     if not current_user.is_admin:
         raise HTTPException(
@@ -86,5 +115,3 @@ async def get_current_admin(
             detail="Not enough permissions"
         )
     return current_user
-
-    
\ No newline at end of file
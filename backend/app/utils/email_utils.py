@@ -1,5 +1,15 @@
+"""
+Email templates and delivery transports.
+
+Requests don't send email themselves: they render a message and add it to
+the outbox (app/services/email_outbox.py), whose background sender delivers
+it through one of the transports below.
+"""
 import httpx
 from app.config import get_settings
+from typing import Dict, List, Optional, Tuple
+from html import escape
+import asyncio
 
 settings = get_settings()
 
@@ -10,42 +20,137 @@ try:
 except ImportError:
     resend = None
 
+BREVO_URL = "https://api.brevo.com/v3/smtp/email"
+BREVO_MAX_BATCH = 1000  # Message versions per batch request
+
+
+class EmailDeliveryError(Exception):
+    """A message could not be delivered; permanent errors are not retried.
+    
+    Config errors (e.g. a rejected API key) are the sender's fault rather than
+    the message's, so they are retried until the configuration is fixed.
+    """
+    
+    def __init__(self, message: str, permanent: bool = False, config: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+        self.config = config
+
 
-async def send_email_via_brevo(to: str, subject: str, html_content: str):
-    """Send email using Brevo API (free tier: 300 emails/day)"""
-    if not settings.BREVO_API_KEY:
-        print(f"[EMAIL] Brevo API key not set. Would send to {to}: {subject}")
-        return False
+class BrevoTransport:
+    """Brevo API (free tier: 300 emails/day) over a shared keep-alive client"""
+    name = "brevo"
     
-    url = "https://api.brevo.com/v3/smtp/email"
-    headers = {
-        "accept": "application/json",
-        "api-key": settings.BREVO_API_KEY,
-        "content-type": "application/json"
-    }
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
     
-    payload = {
-        "sender": {
-            "name": "Ink&Echoes",
-            "email": settings.EMAIL_FROM
-        },
-        "to": [{"email": to}],
-        "subject": subject,
-        "htmlContent": html_content
-    }
+    async def send(self, to: str, subject: str, html_content: str):
+        await self._post({"to": [{"email": to}], "subject": subject, "htmlContent": html_content})
     
-    async with httpx.AsyncClient() as client:
+    async def send_batch(self, recipients: List[str], subject: str, html_content: str):
+        """Send one message to many recipients, each getting their own copy, in one request"""
+        if len(recipients) > BREVO_MAX_BATCH:
+            raise ValueError(f"Brevo accepts at most {BREVO_MAX_BATCH} recipients per batch")
+        await self._post({
+            "subject": subject,
+            "htmlContent": html_content,
+            "messageVersions": [{"to": [{"email": to}]} for to in recipients]
+        })
+    
+    async def _post(self, message: Dict):
+        headers = {
+            "accept": "application/json",
+            "api-key": settings.BREVO_API_KEY,
+            "content-type": "application/json"
+        }
+        payload = {
+            "sender": {
+                "name": "Ink&Echoes",
+                "email": settings.EMAIL_FROM
+            },
+            **message
+        }
         try:
-            response = await client.post(url, json=payload, headers=headers, timeout=10.0)
+            response = await self.client.post(BREVO_URL, json=payload, headers=headers)
             response.raise_for_status()
-            return True
+        except httpx.HTTPStatusError as e:
+            code = e.response.status_code
+            detail = f"Brevo returned {code}: {e.response.text[:200]}"
+            if code in (401, 403):
+                # Expired or misconfigured API key: not the message's fault
+                raise EmailDeliveryError(detail, config=True)
+            # Other rejected requests won't succeed on retry, except for rate limiting
+            raise EmailDeliveryError(detail, permanent=400 <= code < 500 and code != 429)
+        except httpx.HTTPError as e:
+            raise EmailDeliveryError(f"Brevo request failed: {e!r}")
+
+
+class ResendTransport:
+    """Resend (legacy); its client is synchronous, so sends run in a worker thread"""
+    name = "resend"
+    
+    async def send(self, to: str, subject: str, html_content: str):
+        try:
+            await asyncio.to_thread(resend.emails.send, {
+                "from": settings.EMAIL_FROM,
+                "to": [to],
+                "subject": subject,
+                "html": html_content
+            })
         except Exception as e:
-            print(f"[EMAIL ERROR] Failed to send email via Brevo: {e}")
-            return False
+            raise EmailDeliveryError(f"Resend request failed: {e!r}")
+    
+    async def send_batch(self, recipients: List[str], subject: str, html_content: str):
+        # The legacy client has no batch call
+        for to in recipients:
+            await self.send(to, subject, html_content)
+
+
+class ConsoleTransport:
+    """Dev mode: print messages instead of sending them"""
+    name = "console"
+    
+    async def send(self, to: str, subject: str, html_content: str):
+        print(f"[DEV] Email to {to}: {subject}\n{html_content}")
+    
+    async def send_batch(self, recipients: List[str], subject: str, html_content: str):
+        print(f"[DEV] Email to {len(recipients)} recipients ({', '.join(recipients[:3])}...): {subject}\n{html_content}")
+
+
+class StubTransport:
+    """Records messages in memory, for tests; set fail_with to make sends fail"""
+    name = "stub"
+    
+    def __init__(self):
+        self.sent: List[Dict] = []
+        self.batches: List[Dict] = []
+        self.fail_with: Optional[EmailDeliveryError] = None
+    
+    async def send(self, to: str, subject: str, html_content: str):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.sent.append({"to": to, "subject": subject, "html_content": html_content})
+    
+    async def send_batch(self, recipients: List[str], subject: str, html_content: str):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.batches.append({"recipients": list(recipients), "subject": subject, "html_content": html_content})
+
 
+def create_transport(client: httpx.AsyncClient):
+    """Transport selected by EMAIL_TRANSPORT; "auto" tries Brevo, then Resend, then dev mode"""
+    transport = settings.EMAIL_TRANSPORT
+    if transport == "brevo" or (transport == "auto" and settings.BREVO_API_KEY):
+        return BrevoTransport(client)
+    if transport == "resend" or (transport == "auto" and resend):
+        return ResendTransport()
+    if transport == "stub":
+        return StubTransport()
+    return ConsoleTransport()
 
-async def send_password_reset_email(email: str, reset_token: str):
-    """Send password reset email"""
+
+def render_password_reset_email(reset_token: str) -> Tuple[str, str]:
+    """Subject and HTML of the password reset email"""
     reset_url = f"https://inknechoes.com/reset-password?token={reset_token}"
     
     html_content = f"""
@@ -67,32 +172,11 @@ async def send_password_reset_email(email: str, reset_token: str):
         <p style="color: #999; font-size: 12px;">© 2025 Ink&Echoes. All rights reserved.</p>
     </div>
     """
-    
-    # Try Brevo first, fallback to Resend, then dev mode
-    if settings.BREVO_API_KEY:
-        success = await send_email_via_brevo(email, "Reset Your Ink&Echoes Password", html_content)
-        if success:
-            return
-    
-    # Fallback to Resend if available
-    if resend:
-        try:
-            resend.emails.send({
-                "from": settings.EMAIL_FROM,
-                "to": [email],
-                "subject": "Reset Your Ink&Echoes Password",
-                "html": html_content
-            })
-            return
-        except Exception as e:
-            print(f"[EMAIL ERROR] Failed to send via Resend: {e}")
-    
-    # Dev mode fallback
-    print(f"[DEV] Password reset token for {email}: {reset_token}")
+    return "Reset Your Ink&Echoes Password", html_content
 
 
-async def send_welcome_email(email: str, username: str):
-    """Send welcome email to new user"""
+def render_welcome_email(username: str) -> Tuple[str, str]:
+    """Subject and HTML of the welcome email"""
     html_content = f"""
     <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
         <h2 style="color: #B87844;">Welcome to Ink&Echoes, {username}!</h2>
@@ -108,26 +192,28 @@ async def send_welcome_email(email: str, username: str):
         <p style="color: #999; font-size: 12px;">© 2025 Ink&Echoes. All rights reserved.</p>
     </div>
     """
-    
-    # Try Brevo first, fallback to Resend, then dev mode
-    if settings.BREVO_API_KEY:
-        success = await send_email_via_brevo(email, "Welcome to Ink&Echoes!", html_content)
-        if success:
-            return
-    
-    # Fallback to Resend if available
-    if resend:
-        try:
-            resend.emails.send({
-                "from": settings.EMAIL_FROM,
-                "to": [email],
-                "subject": "Welcome to Ink&Echoes!",
-                "html": html_content
-            })
-            return
-        except Exception as e:
-            print(f"[EMAIL ERROR] Failed to send via Resend: {e}")
-    
-    # Dev mode fallback
-    print(f"[DEV] Welcome email for {email} ({username})")
+    return "Welcome to Ink&Echoes!", html_content
+
 
+def render_digest_email(sections: List[Tuple[str, List[Dict]]]) -> Tuple[str, str]:
+    """Subject and HTML of a weekly digest: (genre, posts) sections of title/slug/author dicts"""
+    items = []
+    for genre, posts in sections:
+        links = "".join(
+            f'''<li style="margin: 8px 0;"><a href="https://inknechoes.com/post/{escape(post['slug'])}" style="color: #B87844;">{escape(post['title'])}</a>'''
+            f''' <span style="color: #666;">by {escape(post['author'])}</span></li>'''
+            for post in posts
+        )
+        items.append(f'''<h3 style="color: #333; text-transform: capitalize;">{escape(genre)}</h3><ul style="padding-left: 20px;">{links}</ul>''')
+    
+    html_content = f"""
+    <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+        <h2 style="color: #B87844;">This week on Ink&Echoes</h2>
+        <p>New writing in the genres you follow:</p>
+        {"".join(items)}
+        <p>Find more at <a href="https://inknechoes.com/discover">inknechoes.com/discover</a></p>
+        <hr style="margin: 20px 0; border: none; border-top: 1px solid #eee;">
+        <p style="color: #999; font-size: 12px;">© 2025 Ink&Echoes. All rights reserved.</p>
+    </div>
+    """
+    return "Your weekly Ink&Echoes digest", html_content
@@ -1,10 +1,22 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from collections import OrderedDict
 from jose import JWTError, jwt
+from loguru import logger
 from app.config import get_settings
+from app.database.redis import get_redis, is_redis_available
+import hashlib
+import time
 
 settings = get_settings()
 
+REVOKED_TOKEN_KEY = "revoked_token:{token_hash}"
+
+# Recently verified tokens: token hash -> (exp, next revocation check, payload), least recently used first
+_verified_tokens: "OrderedDict[str, Tuple[float, float, dict]]" = OrderedDict()
+# Tokens revoked in this process: token hash -> exp
+_revoked_tokens: dict = {}
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
@@ -28,18 +40,99 @@ def create_refresh_token(data: dict):
     return encoded_jwt
 
 
-def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
+def _token_hash(token: str) -> str:
+    """Key tokens by digest so the cache and revocation list never hold raw tokens"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def _is_revoked(token_hash: str) -> bool:
+    """Check the local and shared revocation lists"""
+    if token_hash in _revoked_tokens:
+        return True
+    if is_redis_available():
+        try:
+            return bool(await get_redis().exists(REVOKED_TOKEN_KEY.format(token_hash=token_hash)))
+        except Exception as e:
+            logger.warning(f"Failed to check token revocation: {e}")
+    return False
+
+
+async def _cached_payload(token_hash: str) -> Optional[dict]:
+    """Payload of a recently verified, unexpired and unrevoked token"""
+    entry = _verified_tokens.get(token_hash)
+    if entry is None:
+        return None
+    expires_at, check_at, payload = entry
+    now = time.time()
+    if expires_at <= now:
+        del _verified_tokens[token_hash]
+        return None
+    if token_hash in _revoked_tokens:
+        del _verified_tokens[token_hash]
+        return None
+    if check_at <= now:
+        # Revocations from other processes are picked up within TOKEN_REVOCATION_CHECK_SECONDS
+        if await _is_revoked(token_hash):
+            del _verified_tokens[token_hash]
+            return None
+        _verified_tokens[token_hash] = (expires_at, now + settings.TOKEN_REVOCATION_CHECK_SECONDS, payload)
+    _verified_tokens.move_to_end(token_hash)
+    return payload
+
+
+def _cache_payload(token_hash: str, payload: dict):
+    """Remember a verified token until it expires, evicting the least recently used"""
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)):
+        return
+    _verified_tokens[token_hash] = (exp, time.time() + settings.TOKEN_REVOCATION_CHECK_SECONDS, payload)
+    _verified_tokens.move_to_end(token_hash)
+    while len(_verified_tokens) > settings.TOKEN_CACHE_SIZE:
+        _verified_tokens.popitem(last=False)
+
+
+async def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
     """Verify and decode JWT token"""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        # Check token type
-        if payload.get("type") != token_type:
-            from loguru import logger
-            logger.debug(f"Token type mismatch: expected {token_type}, got {payload.get('type')}")
+    token_hash = _token_hash(token)
+    payload = await _cached_payload(token_hash)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError as e:
+            logger.debug(f"JWT decode error: {e}")
             return None
-        return payload
-    except JWTError as e:
-        from loguru import logger
-        logger.debug(f"JWT decode error: {e}")
+        if await _is_revoked(token_hash):
+            logger.debug("Rejected revoked token")
+            return None
+        _cache_payload(token_hash, payload)
+    
+    # Check token type
+    if payload.get("type") != token_type:
+        logger.debug(f"Token type mismatch: expected {token_type}, got {payload.get('type')}")
         return None
+    return payload
+
 
+async def revoke_token(token: str):
+    """Reject a token from now until it expires, e.g. after logout"""
+    if not token:
+        return
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return
+    remaining = int(exp - time.time()) if isinstance(exp, (int, float)) else 0
+    if remaining <= 0:
+        return
+    
+    token_hash = _token_hash(token)
+    _verified_tokens.pop(token_hash, None)
+    now = time.time()
+    for revoked_hash in [h for h, expires_at in _revoked_tokens.items() if expires_at <= now]:
+        del _revoked_tokens[revoked_hash]
+    _revoked_tokens[token_hash] = exp
+    if is_redis_available():
+        try:
+            await get_redis().setex(REVOKED_TOKEN_KEY.format(token_hash=token_hash), remaining, "1")
+        except Exception as e:
+            logger.warning(f"Failed to store token revocation: {e}")
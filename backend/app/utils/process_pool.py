@@ -0,0 +1,99 @@
+"""
+Process pool for CPU-bound text analytics.
+
+Tokenizing, HTML stripping and Counter building are pure-Python work that
+would otherwise block the event loop. Tasks receive plain data (text or
+stats documents) and return compact, picklable results.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+from app.config import get_settings
+from loguru import logger
+import asyncio
+import functools
+import multiprocessing
+
+settings = get_settings()
+
+_executor: Optional[ProcessPoolExecutor] = None
+_timeouts = 0  # Tasks abandoned after ANALYTICS_TASK_TIMEOUT_SECONDS
+
+
+def get_analytics_executor() -> Optional[ProcessPoolExecutor]:
+    """Get the shared process pool, creating it on first use (None when disabled)"""
+    global _executor
+    if settings.ANALYTICS_WORKERS <= 0:
+        return None
+    if _executor is None:
+        # spawn avoids forking a process that already runs the event loop and driver threads
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.ANALYTICS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_analytics_executor():
+    """Stop the worker processes"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _recycle_executor(executor: ProcessPoolExecutor):
+    """Replace a pool whose workers may be stuck on tasks nobody is waiting for.
+    
+    Timing out only abandons the task; its worker keeps running it. Shutting
+    the pool down lets running tasks finish, so the workers are stopped too.
+    Tasks of other callers fail with BrokenProcessPool and are retried once.
+    """
+    global _executor, _timeouts
+    _timeouts += 1
+    if _executor is not executor:
+        # Another timed-out call already replaced it
+        return
+    logger.warning(f"Analytics task timed out, restarting the process pool ({_timeouts} timeouts so far)")
+    _executor = None
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+async def run_cpu_bound(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run a picklable function in the process pool with the configured timeout.
+    
+    Falls back to running inline when the pool is disabled. Raises
+    asyncio.TimeoutError when the task takes longer than ANALYTICS_TASK_TIMEOUT_SECONDS,
+    after replacing the pool so the abandoned task doesn't hold a worker.
+    """
+    call = functools.partial(func, *args, **kwargs)
+    executor = get_analytics_executor()
+    if executor is None:
+        return call()
+    
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(executor, call),
+            timeout=settings.ANALYTICS_TASK_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        _recycle_executor(executor)
+        raise
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory or by a recycle): replace the pool and retry once
+        if _executor is executor:
+            logger.warning("Analytics process pool broke, restarting it")
+            shutdown_analytics_executor()
+        retry_executor = get_analytics_executor()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(retry_executor, call),
+                timeout=settings.ANALYTICS_TASK_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            _recycle_executor(retry_executor)
+            raise
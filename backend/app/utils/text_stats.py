@@ -0,0 +1,280 @@
+"""
+Per-post text statistics computed at write time.
+
+Each post stores a compact stats document next to its body in MongoDB.
+Author-level analytics merge these small records instead of re-tokenizing
+the whole corpus on every request.
+
+A post is analyzed in a single streaming pass: a generator walks the text
+between HTML tags and yields words and sentence boundaries, and emotion
+keywords are matched per word with an Aho-Corasick automaton instead of one
+full scan per keyword.
+"""
+from collections import Counter
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import re
+
+# Bump when the stats layout or tokenization changes so old records are recomputed
+STATS_VERSION = 2
+
+TOP_TERMS_LIMIT = 100
+MERGED_TOP_TERMS_LIMIT = 500  # Terms kept after merging, enough for every word list we show
+SENTENCE_LENGTH_CAP = 100  # Longer sentences share the last histogram bucket
+SKETCH_SIZE = 256  # k for the k-minimum-values unique-term sketch
+SKETCH_HASH_SPACE = 2 ** 32
+
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+TOKEN_RE = re.compile(r'(\w+)|[.!?]+')
+WORD_CHAR_RE = re.compile(r'\w')
+
+# Token emitted by iter_token_batches for every sentence terminator
+SENTENCE_END = ''
+
+# Stop words removed from the language insights word list
+LANGUAGE_STOP_WORDS = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'way', 'who', 'boy', 'did', 'let', 'put', 'say', 'she', 'too', 'use'}
+
+# Stop words removed from the writing analytics word list (which only keeps 4+ letter words)
+WRITING_STOP_WORDS = {'that', 'this', 'with', 'from', 'have', 'been', 'were', 'said', 'each', 'which', 'their', 'time', 'will', 'about', 'would', 'there', 'could', 'other', 'after', 'first', 'never', 'these', 'think', 'where', 'being', 'every', 'great', 'might', 'shall', 'those', 'under', 'while', 'years'}
+
+# Emotion lexicon (simplified - keyword-based, matched as substrings)
+EMOTION_KEYWORDS = {
+    "joy": ["happy", "joy", "smile", "laugh", "celebrate", "delight", "cheer"],
+    "sadness": ["sad", "cry", "tear", "grief", "sorrow", "mourn", "pain"],
+    "anger": ["angry", "rage", "fury", "hate", "frustrate", "mad"],
+    "fear": ["fear", "afraid", "scared", "anxious", "worry", "panic"],
+    "trust": ["trust", "believe", "faith", "confident", "sure", "rely"],
+    "surprise": ["surprise", "shock", "amaze", "wonder", "astonish"]
+}
+
+
+def strip_html(body: str) -> str:
+    """Strip HTML tags from a post body"""
+    return HTML_TAG_RE.sub('', body or '')
+
+
+def iter_text_segments(body: str) -> Iterator[str]:
+    """Yield the pieces of text between HTML tags without building a stripped copy"""
+    position = 0
+    for match in HTML_TAG_RE.finditer(body):
+        if match.start() > position:
+            yield body[position:match.start()]
+        position = match.end()
+    if position < len(body):
+        yield body[position:]
+
+
+def iter_token_batches(body: str) -> Iterator[List[str]]:
+    """Yield the tokens of each text segment, with SENTENCE_END for every terminator.
+    
+    Each segment is tokenized by a single regex scan that finds words and
+    sentence terminators together. Words interrupted by a tag (e.g.
+    "<b>wo</b>rd") are joined, matching the result of stripping tags first.
+    """
+    pending = ''
+    for segment in iter_text_segments(body or ''):
+        tokens = TOKEN_RE.findall(segment)
+        if pending:
+            if tokens and WORD_CHAR_RE.match(segment):
+                tokens[0] = pending + tokens[0]
+            else:
+                yield [pending]
+            pending = ''
+        if tokens and WORD_CHAR_RE.match(segment[-1]):
+            # The last word may continue in the next segment
+            pending = tokens.pop()
+        if tokens:
+            yield tokens
+    if pending:
+        yield [pending]
+
+
+def build_automaton(keywords: List[Tuple[str, int]]) -> Tuple[List[Dict[str, int]], List[int], List[Tuple[int, ...]]]:
+    """Build an Aho-Corasick automaton for (keyword, label) pairs.
+    
+    Returns the goto transitions, failure links and the labels emitted in
+    each state.
+    """
+    goto: List[Dict[str, int]] = [{}]
+    output: List[List[int]] = [[]]
+    for keyword, label in keywords:
+        state = 0
+        for char in keyword:
+            if char not in goto[state]:
+                goto.append({})
+                output.append([])
+                goto[state][char] = len(goto) - 1
+            state = goto[state][char]
+        output[state].append(label)
+    
+    # Breadth-first pass to set failure links and inherit outputs
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    for state in queue:
+        for char, next_state in goto[state].items():
+            queue.append(next_state)
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(char, 0)
+            output[next_state].extend(output[fail[next_state]])
+    return goto, fail, [tuple(labels) for labels in output]
+
+
+EMOTION_NAMES = list(EMOTION_KEYWORDS.keys())
+_EMOTION_GOTO, _EMOTION_FAIL, _EMOTION_OUTPUT = build_automaton([
+    (keyword, index)
+    for index, emotion in enumerate(EMOTION_NAMES)
+    for keyword in EMOTION_KEYWORDS[emotion]
+])
+
+
+def match_emotions(word: str) -> Tuple[int, ...]:
+    """Indices into EMOTION_NAMES of every keyword occurrence inside a lowercase word"""
+    hits: List[int] = []
+    state = 0
+    for char in word:
+        while state and char not in _EMOTION_GOTO[state]:
+            state = _EMOTION_FAIL[state]
+        state = _EMOTION_GOTO[state].get(char, 0)
+        if _EMOTION_OUTPUT[state]:
+            hits.extend(_EMOTION_OUTPUT[state])
+    return tuple(hits)
+
+
+def term_hash(term: str) -> int:
+    """Stable 32-bit hash of a term, identical across processes"""
+    return int.from_bytes(blake2b(term.encode('utf-8'), digest_size=4).digest(), 'big')
+
+
+@lru_cache(maxsize=131072)
+def classify_token(token: str) -> Tuple[str, int, Tuple[int, ...]]:
+    """Lowercase term (or '' when the token is not a 3+ letter term), its hash and emotion hits"""
+    word = token.lower()
+    if len(word) >= 3 and word.isascii() and word.isalpha():
+        return word, term_hash(word), match_emotions(word)
+    return '', 0, match_emotions(word)
+
+
+def build_sketch(hashes: Iterable[int]) -> List[int]:
+    """Keep the SKETCH_SIZE smallest distinct hashes"""
+    return sorted(set(hashes))[:SKETCH_SIZE]
+
+
+def estimate_unique_terms(sketch: List[int]) -> float:
+    """Estimate the number of distinct terms from a k-minimum-values sketch"""
+    if len(sketch) < SKETCH_SIZE:
+        return float(len(sketch))
+    return (SKETCH_SIZE - 1) * SKETCH_HASH_SPACE / (sketch[-1] + 1)
+
+
+def compute_text_stats(body: str) -> Dict:
+    """Compute the stats document for a single post body in one pass"""
+    sentence_length = 0
+    sentence_words = 0
+    sentence_hist: Counter = Counter()
+    token_counts: Counter = Counter()
+    
+    # The streaming pass only counts tokens and sentence lengths; everything
+    # else is derived per distinct token, which is far cheaper on real text
+    for tokens in iter_token_batches(body):
+        token_counts.update(tokens)
+        start = 0
+        for end in [i for i, token in enumerate(tokens) if not token]:
+            sentence_length += end - start
+            start = end + 1
+            if sentence_length:
+                sentence_hist[min(sentence_length, SENTENCE_LENGTH_CAP)] += 1
+                sentence_words += sentence_length
+                sentence_length = 0
+        sentence_length += len(tokens) - start
+    
+    if sentence_length:
+        sentence_hist[min(sentence_length, SENTENCE_LENGTH_CAP)] += 1
+        sentence_words += sentence_length
+    token_counts.pop(SENTENCE_END, None)
+    
+    terms: Dict[str, int] = {}
+    term_hashes = set()
+    emotion_counts = [0] * len(EMOTION_NAMES)
+    for token, count in token_counts.items():
+        term, hashed, emotion_hits = classify_token(token)
+        for index in emotion_hits:
+            emotion_counts[index] += count
+        if term:
+            terms[term] = terms.get(term, 0) + count
+            term_hashes.add(hashed)
+    
+    term_counts = Counter({term: count for term, count in terms.items() if term not in LANGUAGE_STOP_WORDS})
+    return {
+        "version": STATS_VERSION,
+        "word_count": sum(token_counts.values()),
+        "term_count": sum(terms.values()),
+        "sentence_count": sum(sentence_hist.values()),
+        "sentence_words": sentence_words,
+        "sentence_length_hist": {str(length): count for length, count in sentence_hist.items()},
+        "top_terms": dict(term_counts.most_common(TOP_TERMS_LIMIT)),
+        "emotion_counts": dict(zip(EMOTION_NAMES, emotion_counts)),
+        "unique_terms_sketch": build_sketch(term_hashes)
+    }
+
+
+def compute_text_stats_batch(bodies: List[str]) -> List[Dict]:
+    """Compute stats documents for several bodies in one worker task"""
+    return [compute_text_stats(body) for body in bodies]
+
+
+def merge_text_stats(stats_list: List[Dict]) -> Dict:
+    """Merge per-post stats documents into author-level totals"""
+    term_counts: Counter = Counter()
+    emotion_counts: Counter = Counter({emotion: 0 for emotion in EMOTION_KEYWORDS})
+    sentence_hist: Counter = Counter()
+    sketch_hashes = set()
+    merged = {
+        "post_count": sum(stats.get("post_count", 1) for stats in stats_list),
+        "word_count": 0,
+        "term_count": 0,
+        "sentence_count": 0,
+        "sentence_words": 0
+    }
+    
+    for stats in stats_list:
+        for key in ("word_count", "term_count", "sentence_count", "sentence_words"):
+            merged[key] += stats.get(key, 0)
+        term_counts.update(stats.get("top_terms", {}))
+        emotion_counts.update(stats.get("emotion_counts", {}))
+        sentence_hist.update({int(k): v for k, v in stats.get("sentence_length_hist", {}).items()})
+        sketch_hashes.update(stats.get("unique_terms_sketch", []))
+    
+    merged["top_terms"] = Counter(dict(term_counts.most_common(MERGED_TOP_TERMS_LIMIT)))
+    merged["emotion_counts"] = dict(emotion_counts)
+    merged["sentence_length_hist"] = dict(sorted(sentence_hist.items()))
+    merged["unique_terms_sketch"] = build_sketch(sketch_hashes)
+    merged["unique_terms"] = estimate_unique_terms(merged["unique_terms_sketch"])
+    return merged
+
+
+def summarize_post_stats(entries: List[Tuple[int, Optional[str], Dict]]) -> Dict:
+    """Build the author-level text summary from (post id, month, stats) entries.
+    
+    Produces the same shape as the server-side aggregation in the analytics
+    service, which is preferred; this is the in-Python fallback.
+    """
+    summary = merge_text_stats([stats for _, _, stats in entries])
+    summary["post_word_counts"] = {post_id: stats.get("word_count", 0) for post_id, _, stats in entries}
+    
+    monthly_stats: Dict[str, List[Dict]] = {}
+    for _, month, stats in entries:
+        if month:
+            monthly_stats.setdefault(month, []).append(stats)
+    summary["monthly"] = {}
+    for month, stats_list in monthly_stats.items():
+        merged = merge_text_stats(stats_list)
+        summary["monthly"][month] = {
+            "post_count": merged["post_count"],
+            "word_count": merged["word_count"],
+            "term_count": merged["term_count"],
+            "unique_terms": merged["unique_terms"]
+        }
+    return summary
@@ -0,0 +1,94 @@
+"""
+Benchmark for the analytics content fetch.
+
+Compares the old per-post find_one loop (run twice, once per analyzer) with
+the shared batched $in fetch used by get_user_analytics, for authors with
+10, 100 and 1,000 posts. Refuses to run unless the database name ends in
+_bench, and only deletes the posts it seeded (marked with a bench field).
+
+Usage: python scripts/bench_analytics_fetch.py [--mongo-uri mongodb://localhost:27017/inknechoes_bench]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+parser = argparse.ArgumentParser(description="Benchmark analytics content fetch")
+parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/inknechoes_bench")
+parser.add_argument("--sizes", default="10,100,1000")
+args = parser.parse_args()
+
+# Point the app at the scratch database before settings are loaded
+os.environ["MONGO_URI"] = args.mongo_uri
+
+from bson import ObjectId
+from app.database.mongo import connect_to_mongo, close_mongo_connection, get_mongo_db
+from app.models.post import Post
+from app.services.analytics_service import fetch_post_bodies
+from app.utils.text_stats import strip_html
+
+SAMPLE_BODY = "<p>" + " ".join(["The quiet river carried every sorrow and every joy downstream."] * 60) + "</p>"
+
+
+# Marks the posts this script seeds, so cleanup never touches anything else
+BENCH_MARKER = {"bench": "analytics_fetch"}
+
+
+async def seed_posts(count: int) -> list:
+    """Insert synthetic post bodies and return transient Post objects pointing at them"""
+    mongo_db = get_mongo_db()
+    result = await mongo_db.posts.insert_many([
+        {"body": SAMPLE_BODY, "tags": [], **BENCH_MARKER} for _ in range(count)
+    ])
+    return [
+        Post(id=i, mongo_id=str(mongo_id), author_id=1, title=f"Post {i}", slug=f"post-{i}")
+        for i, mongo_id in enumerate(result.inserted_ids)
+    ]
+
+
+async def fetch_sequential(posts: list) -> dict:
+    """The previous behaviour: one find_one round-trip per post"""
+    mongo_db = get_mongo_db()
+    texts = {}
+    for post in posts:
+        doc = await mongo_db.posts.find_one({"_id": ObjectId(post.mongo_id)})
+        if doc:
+            texts[post.id] = strip_html(doc.get("body", ""))
+    return texts
+
+
+async def main():
+    await connect_to_mongo()
+    mongo_db = get_mongo_db()
+    if not mongo_db.name.endswith("_bench"):
+        await close_mongo_connection()
+        sys.exit(f"Refusing to run against database '{mongo_db.name}': its name must end in _bench")
+    try:
+        print(f"{'posts':>6} {'sequential x2 (ms)':>20} {'batched (ms)':>14} {'speedup':>8}")
+        for size in [int(s) for s in args.sizes.split(",")]:
+            await mongo_db.posts.delete_many(BENCH_MARKER)
+            posts = await seed_posts(size)
+            
+            start = time.perf_counter()
+            await fetch_sequential(posts)
+            await fetch_sequential(posts)
+            sequential_ms = (time.perf_counter() - start) * 1000
+            
+            start = time.perf_counter()
+            bodies = await fetch_post_bodies(posts)
+            texts = {post_id: strip_html(body) for post_id, body in bodies.items()}
+            batched_ms = (time.perf_counter() - start) * 1000
+            assert len(texts) == size
+            
+            print(f"{size:>6} {sequential_ms:>20.1f} {batched_ms:>14.1f} {sequential_ms / batched_ms:>7.1f}x")
+    finally:
+        await mongo_db.posts.delete_many(BENCH_MARKER)
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+Microbenchmark for access-token verification.
+
+Replays a synthetic request mix (a Zipf-skewed set of active users, plus a
+share of malformed and expired tokens) through verify_token, first with the
+verified-token cache disabled and then enabled, and reports the per-request
+latency of each.
+
+Usage: python scripts/bench_auth.py [--users 2000] [--requests 50000] [--bad-share 0.02]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from loguru import logger
+from app.utils import jwt_handler
+from app.utils.jwt_handler import create_access_token, verify_token
+
+
+def make_requests(users: int, requests: int, bad_share: float, seed: int = 42):
+    """Build the sequence of tokens presented by incoming requests"""
+    rng = np.random.default_rng(seed)
+    tokens = [create_access_token({"sub": str(user_id)}) for user_id in range(users)]
+    expired = [create_access_token({"sub": str(user_id)}, timedelta(minutes=-5)) for user_id in range(50)]
+    malformed = [token[:-4] + "abcd" for token in tokens[:50]]
+    
+    # A few users account for most requests, as with real sessions
+    picks = (rng.zipf(a=1.3, size=requests) - 1) % users
+    bad = rng.random(requests) < bad_share
+    mix = []
+    for index, user_index in enumerate(picks):
+        if bad[index]:
+            pool = expired if rng.random() < 0.5 else malformed
+            mix.append(pool[rng.integers(len(pool))])
+        else:
+            mix.append(tokens[user_index])
+    return mix
+
+
+async def run(mix, batch: int = 1000):
+    """Per-request latency in microseconds, measured over batches of requests"""
+    timings = []
+    for start in range(0, len(mix), batch):
+        chunk = mix[start:start + batch]
+        began = time.perf_counter()
+        for token in chunk:
+            await verify_token(token)
+        timings.append((time.perf_counter() - began) * 1e6 / len(chunk))
+    return timings
+
+
+def report(label: str, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:>9}: median={statistics.median(timings):.2f}us p95={p95:.2f}us per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark access-token verification")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--bad-share", type=float, default=0.02)
+    args = parser.parse_args()
+    
+    logger.remove()  # Rejected tokens log at debug level
+    mix = make_requests(args.users, args.requests, args.bad_share)
+    print(f"users={args.users} requests={args.requests} bad_share={args.bad_share}")
+    
+    cache_size = jwt_handler.settings.TOKEN_CACHE_SIZE
+    jwt_handler.settings.TOKEN_CACHE_SIZE = 0
+    jwt_handler._verified_tokens.clear()
+    report("uncached", asyncio.run(run(mix)))
+    
+    jwt_handler.settings.TOKEN_CACHE_SIZE = cache_size
+    jwt_handler._verified_tokens.clear()
+    report("cached", asyncio.run(run(mix)))
+    print(f"cache entries={len(jwt_handler._verified_tokens)}")
+
+
+if __name__ == "__main__":
+    main()
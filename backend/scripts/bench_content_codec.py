@@ -0,0 +1,89 @@
+"""
+Benchmark for compressed body storage.
+
+Encodes the seeded posts and a synthetic long-form corpus (chapters of
+~2,000 to ~12,000 words of HTML paragraphs) with content_codec and reports
+the stored size, compression ratio and per-document encode (write path)
+and decode (read path) latency, plus the BSON round-trip each document
+costs on the wire with and without compression.
+
+Usage: python scripts/bench_content_codec.py [--chapters 200] [--repeat 5]
+"""
+import sys
+import os
+import argparse
+import random
+import statistics
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson
+from app.config import get_settings
+from app.utils.content_codec import encode_body, decode_body, BODY_FORMAT_PLAIN
+
+settings = get_settings()
+
+# Bodies inserted by scripts/seed.py
+SEED_BODIES = [
+    "<h1>Welcome!</h1><p>This is a sample post to demonstrate the platform.</p>",
+    "<h2>The Art of Storytelling</h2><p>Storytelling is an ancient art form that has been passed down through generations...</p>",
+    "<h2>Exploring the Cosmos</h2><p>The universe is vast and mysterious, full of wonders waiting to be discovered...</p>",
+]
+
+
+def make_chapters(count: int, seed: int = 7) -> list:
+    """Chapters with a Zipf-like vocabulary, like real prose"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choices(letters, k=rng.randint(2, 9))) for _ in range(15000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+    chapters = []
+    for _ in range(count):
+        words = rng.choices(vocab, weights=weights, k=rng.randint(2000, 12000))
+        sentences = [" ".join(words[i:i + 14]).capitalize() + "." for i in range(0, len(words), 14)]
+        chapters.append("".join(f"<p>{' '.join(sentences[i:i + 5])}</p>" for i in range(0, len(sentences), 5)))
+    return chapters
+
+
+def bench(name: str, bodies: list, repeat: int):
+    """Size and latency of storing and reading back each body"""
+    raw_bytes = sum(len(body.encode("utf-8")) for body in bodies)
+    encoded = [encode_body(body) for body in bodies]
+    stored_bytes = sum(len(fields["body"]) if fields["body_format"] != BODY_FORMAT_PLAIN else len(fields["body"].encode("utf-8")) for fields in encoded)
+    compressed = sum(1 for fields in encoded if fields["body_format"] != BODY_FORMAT_PLAIN)
+    
+    def per_doc_ms(fn, items):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for item in items:
+                fn(item)
+            timings.append((time.perf_counter() - start) * 1000 / len(items))
+        return statistics.median(timings)
+    
+    plain_docs = [bson.encode({"body": body}) for body in bodies]
+    stored_docs = [bson.encode(fields) for fields in encoded]
+    
+    print(f"{name}: {len(bodies)} bodies, {compressed} compressed")
+    print(f"  size      {raw_bytes / 1e6:8.2f} MB -> {stored_bytes / 1e6:8.2f} MB ({raw_bytes / stored_bytes:.2f}x)")
+    print(f"  encode    {per_doc_ms(encode_body, bodies):8.3f} ms/doc")
+    print(f"  decode    {per_doc_ms(decode_body, encoded):8.3f} ms/doc")
+    print(f"  read      {per_doc_ms(lambda doc: bson.decode(doc)['body'], plain_docs):8.3f} ms/doc plain BSON, "
+          f"{per_doc_ms(lambda doc: decode_body(bson.decode(doc)), stored_docs):.3f} ms/doc stored BSON + decode")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compressed body storage")
+    parser.add_argument("--chapters", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    print(f"Threshold {settings.CONTENT_COMPRESSION_MIN_BYTES} bytes, zlib level {settings.CONTENT_COMPRESSION_LEVEL}\n")
+    bench("Seeded posts", SEED_BODIES, args.repeat)
+    bench("Long-form chapters", make_chapters(args.chapters), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Microbenchmark for the feed candidate-scoring stage.
+
+Scores a synthetic candidate pool with score_candidates and reports the
+per-call latency. Exits non-zero when the median exceeds the budget, so it
+can be run in CI to keep ranking within a few milliseconds.
+
+Usage: python scripts/bench_feed_ranking.py [--candidates 5000] [--k 20] [--budget-ms 5]
+"""
+import sys
+import os
+import argparse
+import statistics
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.services.feed_service import score_candidates
+
+
+def make_candidates(n: int, seed: int = 42):
+    """Build a synthetic candidate pool with realistic feature distributions"""
+    rng = np.random.default_rng(seed)
+    return (
+        rng.exponential(scale=96.0, size=n),                      # age in hours
+        rng.zipf(a=2.0, size=n).astype(np.float64) - 1,           # likes + claps, heavy tailed
+        (rng.random(n) < 0.3).astype(np.float64),                 # genre match
+        rng.choice([0.0, 0.1, 0.3, 0.6], size=n),                 # reading-history share
+        (rng.random(n) < 0.1).astype(np.float64),                 # followed author
+        rng.integers(0, max(n // 8, 1), size=n, dtype=np.int64),  # author ids
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark feed candidate scoring")
+    parser.add_argument("--candidates", type=int, default=5000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    
+    features = make_candidates(args.candidates)
+    
+    # Warm up
+    for _ in range(10):
+        score_candidates(*features, k=args.k)
+    
+    timings = []
+    for _ in range(args.iterations):
+        start = time.perf_counter()
+        score_candidates(*features, k=args.k)
+        timings.append((time.perf_counter() - start) * 1000)
+    
+    timings.sort()
+    median = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"candidates={args.candidates} k={args.k} iterations={args.iterations}")
+    print(f"median={median:.3f}ms p95={p95:.3f}ms max={timings[-1]:.3f}ms")
+    
+    if median > args.budget_ms:
+        print(f"FAIL: median {median:.3f}ms exceeds budget {args.budget_ms}ms")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
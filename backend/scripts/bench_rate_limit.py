@@ -0,0 +1,70 @@
+"""
+Microbenchmark for the rate limiter's per-request overhead.
+
+Runs check_rate_limit for a mix of clients (most under their limit, a few
+hammering it) and reports median and p99 latency per check, using Redis
+when it is reachable and the in-process fallback otherwise. Exits non-zero
+when p99 exceeds the budget.
+
+Usage: python scripts/bench_rate_limit.py [--clients 500] [--requests 20000] [--budget-ms 1]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import statistics
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from fastapi import HTTPException
+from app.database.redis import init_redis, close_redis, is_redis_available
+from app.middleware.rate_limiter import POLICIES, check_rate_limit
+
+
+async def run(clients: int, requests: int, seed: int = 42):
+    """Per-check latency in milliseconds, and how many requests were rejected"""
+    rng = np.random.default_rng(seed)
+    picks = (rng.zipf(a=1.5, size=requests) - 1) % clients
+    policy = POLICIES["engagement"]
+    timings = []
+    rejected = 0
+    for client in picks:
+        start = time.perf_counter()
+        try:
+            await check_rate_limit(policy, f"bench:{client}")
+        except HTTPException:
+            rejected += 1
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, rejected
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark rate limit checks")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--budget-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    
+    await init_redis()
+    backend = "redis" if is_redis_available() else "local"
+    try:
+        timings, rejected = await run(args.clients, args.requests)
+    finally:
+        await close_redis()
+    
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"backend={backend} clients={args.clients} requests={args.requests} rejected={rejected}")
+    print(f"median={statistics.median(timings):.4f}ms p99={p99:.4f}ms max={timings[-1]:.4f}ms")
+    
+    if p99 > args.budget_ms:
+        print(f"FAIL: p99 {p99:.4f}ms exceeds budget {args.budget_ms}ms")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Benchmark for the streaming text analyzer.
+
+Builds a synthetic multi-MB corpus with a Zipf-like vocabulary and compares
+the previous multi-pass analysis (separate regex passes for HTML, words,
+terms and sentences plus one str.count scan per emotion keyword over the
+joined corpus) with streaming the corpus through the single-pass per-post
+analyzer in text_stats and merging the results.
+
+Usage: python scripts/bench_text_stats.py [--megabytes 2,8] [--repeat 3]
+"""
+import sys
+import os
+import argparse
+import random
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Iterable
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import re
+from app.utils.text_stats import EMOTION_KEYWORDS, LANGUAGE_STOP_WORDS, compute_text_stats, merge_text_stats
+
+
+def make_corpus(megabytes: float, seed: int = 7) -> list:
+    """Build posts of ~2,000 words each until the corpus reaches the requested size"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = [
+        "".join(rng.choices(letters, k=rng.randint(2, 9))) for _ in range(15000)
+    ] + [keyword for keywords in EMOTION_KEYWORDS.values() for keyword in keywords]
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+    
+    posts = []
+    size = 0
+    while size < megabytes * 1_000_000:
+        words = rng.choices(vocab, weights=weights, k=2000)
+        sentences = [" ".join(words[i:i + 14]).capitalize() + "." for i in range(0, len(words), 14)]
+        body = "".join(f"<p>{' '.join(sentences[i:i + 5])}</p>" for i in range(0, len(sentences), 5))
+        posts.append(body)
+        size += len(body)
+    return posts
+
+
+def multi_pass(posts: list) -> dict:
+    """The previous analysis over one joined corpus string"""
+    full_text = " ".join(re.sub(r'<[^>]+>', '', body) for body in posts)
+    words = re.findall(r'\b[a-z]{3,}\b', full_text.lower())
+    word_freq = Counter(word for word in words if word not in LANGUAGE_STOP_WORDS)
+    sentences = re.split(r'[.!?]+', full_text)
+    sentence_lengths = [len(s.split()) for s in sentences if s.strip()]
+    text_lower = full_text.lower()
+    emotions = {
+        emotion: sum(text_lower.count(keyword) for keyword in keywords)
+        for emotion, keywords in EMOTION_KEYWORDS.items()
+    }
+    return {
+        "top_terms": word_freq.most_common(15),
+        "unique_terms": len(set(words)),
+        "sentence_count": len(sentence_lengths),
+        "emotion_counts": emotions
+    }
+
+
+def analyze_corpus(bodies: Iterable[str]) -> Dict:
+    """Stream a corpus one body at a time and return the merged stats.
+    
+    Only the compact per-post stats are kept, so memory stays bounded no
+    matter how large the corpus is.
+    """
+    merged = merge_text_stats([])
+    for body in bodies:
+        merged = merge_text_stats([merged, compute_text_stats(body)])
+    return merged
+
+
+def measure(func, posts: list, repeat: int):
+    """Best wall time and peak traced memory of func(posts)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(posts)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = func(posts)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text analytics")
+    parser.add_argument("--megabytes", default="2,8")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"{'corpus':>8} {'multi-pass':>12} {'streaming':>12} {'multi-pass peak':>16} {'streaming peak':>15}")
+    for megabytes in [float(mb) for mb in args.megabytes.split(",")]:
+        posts = make_corpus(megabytes)
+        old_time, old_peak, old = measure(multi_pass, posts, args.repeat)
+        new_time, new_peak, new = measure(lambda p: analyze_corpus(iter(p)), posts, args.repeat)
+        print(
+            f"{megabytes:>6.1f}MB {old_time * 1000:>10.0f}ms {new_time * 1000:>10.0f}ms "
+            f"{old_peak / 1e6:>14.1f}MB {new_peak / 1e6:>13.1f}MB"
+        )
+        if old["emotion_counts"] != new["emotion_counts"]:
+            print(f"  emotion counts differ: {old['emotion_counts']} vs {new['emotion_counts']}")
+
+
+if __name__ == "__main__":
+    main()
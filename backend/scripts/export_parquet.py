@@ -0,0 +1,36 @@
+"""
+Export engagement and content metadata to Parquet for offline analysis.
+
+Reads posts, comments, likes/claps and reading progress through server-side
+cursors and writes one Parquet part per table and run. By default only rows
+changed since the previous export in the same directory are written.
+
+    python scripts/export_parquet.py --out exports
+    python scripts/export_parquet.py --out exports --full --tables posts comments
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.export_service import run_export, EXPORT_BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default="exports", help="Export directory (holds the manifest)")
+    parser.add_argument("--full", action="store_true", help="Re-export everything and replace earlier parts")
+    parser.add_argument("--tables", nargs="+", help="Tables to export (default: all)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Rows per cursor batch")
+    args = parser.parse_args()
+
+    result = run_export(args.out, incremental=not args.full, tables=args.tables, batch_size=args.batch_size)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
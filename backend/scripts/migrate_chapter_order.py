@@ -0,0 +1,46 @@
+"""
+Migration script to space out chapter order keys and make them unique per book
+Run this once to update your existing database schema
+"""
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+from app.database.postgres import engine
+from app.services.chapter_service import ORDER_GAP
+
+
+def migrate_chapter_order():
+    """Renumber chapters ORDER_GAP apart in their current order and add the (post_id, order) constraint"""
+    with engine.begin() as conn:
+        result = conn.execute(text("""
+            UPDATE chapters SET "order" = ranked.position * :gap
+            FROM (
+                SELECT id, row_number() OVER (PARTITION BY post_id ORDER BY "order", id) AS position
+                FROM chapters
+            ) AS ranked
+            WHERE chapters.id = ranked.id
+        """), {"gap": ORDER_GAP})
+        print(f"✓ Respaced {result.rowcount} chapters")
+        
+        exists = conn.execute(text("""
+            SELECT 1 FROM pg_constraint WHERE conname = 'uq_chapters_post_order'
+        """)).fetchone()
+        if not exists:
+            conn.execute(text("""
+                ALTER TABLE chapters ADD CONSTRAINT uq_chapters_post_order
+                UNIQUE (post_id, "order") DEFERRABLE INITIALLY DEFERRED
+            """))
+            print("✓ Added uq_chapters_post_order constraint")
+        else:
+            print("✓ uq_chapters_post_order constraint already exists")
+
+
+if __name__ == "__main__":
+    print("Migrating chapters table...")
+    migrate_chapter_order()
+    print("Migration complete!")
@@ -0,0 +1,100 @@
+"""
+Migration script to store existing post and chapter bodies in the current body format
+Run this once after enabling compression; rerunning it only touches documents that still need it.
+Compressed chapters are stored page by page, so chapters compressed whole are re-split as well.
+
+    python scripts/migrate_compress_bodies.py [--batch-size 500] [--decompress]
+
+--decompress rewrites every compressed body as a plain string again (e.g. before a rollback).
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from pymongo import UpdateOne
+from app.config import get_settings
+from app.database.mongo import connect_to_mongo, close_mongo_connection, get_mongo_db
+from app.services.chapter_service import chapter_content_fields
+from app.utils.content_codec import BODY_FIELDS, BODY_FORMAT_PLAIN, BODY_FORMAT_ZLIB, encode_body, decode_body
+
+settings = get_settings()
+
+
+def _candidates(name: str, decompress: bool) -> dict:
+    """Documents whose stored format differs from the one wanted"""
+    if decompress:
+        return {"body_format": {"$nin": [None, BODY_FORMAT_PLAIN]}}
+    large_plain = {
+        "body": {"$type": "string"},
+        "$expr": {"$gte": [{"$strLenBytes": "$body"}, settings.CONTENT_COMPRESSION_MIN_BYTES]}
+    }
+    if name == "chapters":
+        return {"$or": [large_plain, {"body_format": BODY_FORMAT_ZLIB}]}
+    return large_plain
+
+
+def _stored_size(body) -> int:
+    if isinstance(body, list):
+        return sum(len(page) for page in body)
+    return len(body if isinstance(body, bytes) else body.encode("utf-8"))
+
+
+async def migrate_collection(name: str, batch_size: int, decompress: bool):
+    """Re-encode one collection's bodies in _id order, one bulk write per batch"""
+    collection = get_mongo_db()[name]
+    query = _candidates(name, decompress)
+    encode = chapter_content_fields if name == "chapters" else encode_body
+    documents = before = after = 0
+    started = time.perf_counter()
+    last_id = None
+    
+    while True:
+        batch_query = {**query, "_id": {"$gt": last_id}} if last_id else query
+        docs = await collection.find(batch_query, BODY_FIELDS).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+        
+        updates = []
+        for doc in docs:
+            body = decode_body(doc)
+            fields = {"body": body, "body_format": BODY_FORMAT_PLAIN} if decompress else encode(body)
+            if fields["body_format"] == doc.get("body_format", BODY_FORMAT_PLAIN):
+                # Didn't shrink when compressed: leave it plain
+                continue
+            # Matching the old body skips documents edited since they were read
+            updates.append(UpdateOne({"_id": doc["_id"], "body": doc["body"]}, {"$set": fields}))
+            before += _stored_size(doc["body"])
+            after += _stored_size(fields["body"])
+        if updates:
+            result = await collection.bulk_write(updates, ordered=False)
+            documents += result.modified_count
+        print(f"  {name}: {documents} documents re-encoded so far")
+    
+    ratio = f", {before / after:.2f}x" if after else ""
+    print(f"✓ {name}: {documents} documents, {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB{ratio} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Re-encode post and chapter bodies")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--decompress", action="store_true", help="Store every body as a plain string")
+    args = parser.parse_args()
+    
+    await connect_to_mongo()
+    try:
+        for name in ("posts", "chapters"):
+            await migrate_collection(name, args.batch_size, args.decompress)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
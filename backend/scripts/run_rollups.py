@@ -0,0 +1,46 @@
+"""
+Recompute the daily rollups for a range of days.
+
+Use it to backfill history after deploying the rollup table; the app keeps
+recent days current on its own.
+
+    python scripts/run_rollups.py --days 365
+"""
+import argparse
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.database.postgres import engine, SessionLocal
+from app.models.daily_rollup import DailyRollup
+from app.services.rollup_service import rollup_days, utc_today
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=30, help="Number of days to recompute, ending today")
+    parser.add_argument("--chunk-days", type=int, default=31, help="Days recomputed per transaction")
+    args = parser.parse_args()
+
+    DailyRollup.__table__.create(bind=engine, checkfirst=True)
+
+    end = utc_today()
+    start = end - timedelta(days=args.days - 1)
+    db = SessionLocal()
+    try:
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=args.chunk_days - 1), end)
+            rollup_days(db, chunk_start, chunk_end)
+            print(f"✓ Rolled up {chunk_start} to {chunk_end}")
+            chunk_start = chunk_end + timedelta(days=1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
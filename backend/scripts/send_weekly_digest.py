@@ -0,0 +1,51 @@
+"""
+Send the weekly digest of new posts to readers with genre tags.
+
+Schedule it weekly (e.g. Mondays from cron). Rerunning it for the same week
+only sends to readers who haven't received that week's digest yet.
+
+    python scripts/send_weekly_digest.py
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import httpx
+from app.config import get_settings
+from app.database.postgres import engine, SessionLocal
+from app.database.mongo import connect_to_mongo, close_mongo_connection
+from app.models.digest_delivery import DigestDelivery
+from app.services.digest_service import run_weekly_digest
+from app.utils.email_utils import create_transport
+
+settings = get_settings()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    
+    DigestDelivery.__table__.create(bind=engine, checkfirst=True)
+    await connect_to_mongo()
+    
+    # One keep-alive client for every batch request of the run
+    async with httpx.AsyncClient(timeout=settings.EMAIL_SEND_TIMEOUT_SECONDS) as client:
+        transport = create_transport(client)
+        db = SessionLocal()
+        try:
+            result = await run_weekly_digest(db, transport)
+        finally:
+            db.close()
+            await close_mongo_connection()
+    
+    print(f"✓ Digest {result['digest_key']} ({result['status']}): {result['sent']} sent, "
+          f"{result['failed']} failed across {result['groups']} genre groups")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.services import analytics_jobs
+
+
+@pytest.fixture
+def local_jobs(monkeypatch):
+    monkeypatch.setattr(analytics_jobs, "is_redis_available", lambda: False)
+    monkeypatch.setattr(analytics_jobs, "_local_jobs", {})
+    monkeypatch.setattr(analytics_jobs, "_local_user_jobs", {})
+    monkeypatch.setattr(analytics_jobs, "_local_queue", None)
+    return analytics_jobs._local_jobs
+
+
+def test_concurrent_requests_for_a_user_share_one_job(local_jobs):
+    async def run():
+        first = await analytics_jobs.enqueue_analytics_job(1)
+        second = await analytics_jobs.enqueue_analytics_job(1)
+        other = await analytics_jobs.enqueue_analytics_job(2)
+        return first, second, other
+    
+    first, second, other = asyncio.run(run())
+    assert first["id"] == second["id"] != other["id"]
+
+
+def test_finished_jobs_are_pruned_after_the_ttl(local_jobs):
+    expired = (datetime.now(timezone.utc) - timedelta(seconds=analytics_jobs.settings.ANALYTICS_JOB_TTL_SECONDS + 1)).isoformat()
+    local_jobs["old-done"] = {"id": "old-done", "status": "done", "updated_at": expired}
+    local_jobs["old-queued"] = {"id": "old-queued", "status": "queued", "updated_at": expired}
+    
+    asyncio.run(analytics_jobs.enqueue_analytics_job(1))
+    
+    assert "old-done" not in local_jobs
+    assert "old-queued" in local_jobs
+    assert len(local_jobs) == 2
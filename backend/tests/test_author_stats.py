@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+from app.services import author_stats_service
+from app.services.author_stats_service import compute_streaks, effective_streak, record_post_published
+
+TODAY = date(2026, 3, 10)
+
+
+def days(*offsets: int) -> list:
+    return [TODAY - timedelta(days=offset) for offset in sorted(offsets, reverse=True)]
+
+
+class FakeQuery:
+    def __init__(self, row):
+        self.row = row
+    
+    def filter(self, *criteria):
+        return self
+    
+    def with_for_update(self):
+        return self
+    
+    def first(self):
+        return self.row
+
+
+class FakeSession:
+    def __init__(self, row):
+        self.row = row
+        self.commits = 0
+    
+    def query(self, *entities):
+        return FakeQuery(self.row)
+    
+    def commit(self):
+        self.commits += 1
+
+
+def author_row(last_post_date, current_streak, longest_streak):
+    return SimpleNamespace(
+        posts_by_type={"article": 3}, post_count=3, last_post_date=last_post_date,
+        current_streak=current_streak, longest_streak=longest_streak
+    )
+
+
+def test_no_days_means_no_streak():
+    assert compute_streaks([]) == (0, 0)
+
+
+def test_current_run_ends_at_the_latest_day():
+    assert compute_streaks(days(0, 1, 2)) == (3, 3)
+    assert compute_streaks(days(0, 2, 3, 4, 5)) == (1, 4)
+    assert compute_streaks(days(1, 2, 7, 8, 9)) == (2, 3)
+
+
+def test_month_and_year_boundaries_are_consecutive():
+    assert compute_streaks([date(2025, 12, 31), date(2026, 1, 1), date(2026, 1, 2)]) == (3, 3)
+    assert compute_streaks([date(2024, 2, 28), date(2024, 2, 29), date(2024, 3, 1)]) == (3, 3)
+
+
+def test_streak_lapses_after_a_full_day_without_posts(monkeypatch):
+    monkeypatch.setattr(author_stats_service, "utc_today", lambda: TODAY)
+    assert effective_streak(author_row(TODAY, 4, 4)) == 4
+    assert effective_streak(author_row(TODAY - timedelta(days=1), 4, 4)) == 4
+    assert effective_streak(author_row(TODAY - timedelta(days=2), 4, 4)) == 0
+    assert effective_streak(author_row(None, 0, 0)) == 0
+
+
+def test_publishing_extends_or_restarts_the_streak(monkeypatch):
+    monkeypatch.setattr(author_stats_service, "utc_today", lambda: TODAY)
+    post = SimpleNamespace(visibility="public", author_id=1, content_type="poem")
+    
+    continued = author_row(TODAY - timedelta(days=1), 4, 4)
+    record_post_published(FakeSession(continued), post)
+    assert (continued.current_streak, continued.longest_streak, continued.last_post_date) == (5, 5, TODAY)
+    assert continued.post_count == 4 and continued.posts_by_type == {"article": 3, "poem": 1}
+    
+    same_day = author_row(TODAY, 5, 5)
+    record_post_published(FakeSession(same_day), post)
+    assert (same_day.current_streak, same_day.longest_streak) == (5, 5)
+    
+    broken = author_row(TODAY - timedelta(days=3), 4, 6)
+    record_post_published(FakeSession(broken), post)
+    assert (broken.current_streak, broken.longest_streak) == (1, 6)
+
+
+def test_unlisted_posts_are_not_counted():
+    row = author_row(TODAY, 2, 2)
+    db = FakeSession(row)
+    record_post_published(db, SimpleNamespace(visibility="unlisted", author_id=1, content_type="article"))
+    assert row.post_count == 3 and db.commits == 0
@@ -0,0 +1,67 @@
+import asyncio
+import io
+import struct
+import zipfile
+from datetime import datetime, timezone
+from app.services import book_export_service
+from app.services.book_export_service import BookExport
+
+
+def make_book() -> BookExport:
+    return BookExport(
+        post_id=1,
+        title="Ink & Echoes",
+        author="writer",
+        description="A test book",
+        version=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        chapters=[("One", "a" * 24), ("Two", "b" * 24)]
+    )
+
+
+async def fake_chapter_bodies(book):
+    for number, (title, _) in enumerate(book.chapters, 1):
+        yield number, title, f"<p>Chapter {number}&nbsp;text<br></p>" * 200
+
+
+def collect(chunks) -> bytes:
+    async def run():
+        return b"".join([chunk async for chunk in chunks])
+    return asyncio.run(run())
+
+
+def test_epub_mimetype_entry_is_stored_first_without_data_descriptor(monkeypatch):
+    monkeypatch.setattr(book_export_service, "_chapter_bodies", fake_chapter_bodies)
+    data = collect(book_export_service._epub_chunks(make_book()))
+    
+    signature, _, flags, method, _, _, crc, compressed, size, name_length, extra_length = struct.unpack(
+        "<4sHHHHHIIIHH", data[:30]
+    )
+    assert signature == b"PK\x03\x04"
+    assert flags & 0x08 == 0
+    assert method == zipfile.ZIP_STORED
+    assert compressed == size == len(b"application/epub+zip")
+    assert crc != 0
+    assert extra_length == 0
+    assert data[30:30 + name_length] == b"mimetype"
+    assert data[30 + name_length:30 + name_length + size] == b"application/epub+zip"
+
+
+def test_epub_stream_is_a_valid_zip(monkeypatch):
+    monkeypatch.setattr(book_export_service, "_chapter_bodies", fake_chapter_bodies)
+    data = collect(book_export_service._epub_chunks(make_book()))
+    
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist()[0] == "mimetype"
+        assert "OEBPS/chapter-2.xhtml" in archive.namelist()
+        chapter = archive.read("OEBPS/chapter-1.xhtml").decode("utf-8")
+    assert "<br/>" in chapter and "&#160;" in chapter
+
+
+def test_html_stream_has_every_chapter_in_order(monkeypatch):
+    monkeypatch.setattr(book_export_service, "_chapter_bodies", fake_chapter_bodies)
+    html = collect(book_export_service._html_chunks(make_book())).decode("utf-8")
+    
+    assert html.index('id="chapter-1"') < html.index('id="chapter-2"')
+    assert "Ink &amp; Echoes" in html
+    assert html.endswith("</html>\n")
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+from app.services import chapter_service
+from app.services.chapter_service import ORDER_GAP, _assign_order_keys, _order_key_after
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+    
+    def filter(self, *criteria):
+        return self
+    
+    def order_by(self, *columns):
+        return self
+    
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    """Records executed statements; queries return the book's chapter ids in reading order"""
+    
+    def __init__(self, chapter_ids=()):
+        self.chapter_ids = list(chapter_ids)
+        self.statements = []
+    
+    def query(self, *columns):
+        return FakeQuery([(chapter_id,) for chapter_id in self.chapter_ids])
+    
+    def execute(self, statement):
+        self.statements.append(statement)
+
+
+def chapter(chapter_id: int, order: int) -> SimpleNamespace:
+    return SimpleNamespace(id=chapter_id, order=order, post_id=1)
+
+
+def test_assigns_evenly_spaced_keys_in_one_statement():
+    db = FakeSession()
+    _assign_order_keys(db, 1, [30, 10, 20])
+    
+    assert len(db.statements) == 1
+    compiled = db.statements[0].compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    sql = str(compiled)
+    assert sql.startswith("UPDATE chapters SET")
+    assert f"(30, {ORDER_GAP}), (10, {2 * ORDER_GAP}), (20, {3 * ORDER_GAP})" in sql
+
+
+def test_empty_reorder_issues_no_statement():
+    db = FakeSession()
+    _assign_order_keys(db, 1, [])
+    assert db.statements == []
+
+
+def test_key_after_the_last_chapter_leaves_a_gap(monkeypatch):
+    monkeypatch.setattr(chapter_service, "get_next_chapter", lambda db, after: None)
+    assert _order_key_after(FakeSession(), chapter(1, 3 * ORDER_GAP)) == 4 * ORDER_GAP
+
+
+def test_key_between_two_chapters_splits_the_gap(monkeypatch):
+    monkeypatch.setattr(chapter_service, "get_next_chapter", lambda db, after: chapter(2, 2000))
+    db = FakeSession()
+    assert _order_key_after(db, chapter(1, 1000)) == 1500
+    assert db.statements == []
+
+
+def test_full_gap_respaces_the_book_first(monkeypatch):
+    # Chapters 5 and 6 have adjacent keys, so nothing fits between them
+    monkeypatch.setattr(chapter_service, "get_next_chapter", lambda db, after: chapter(6, 1001))
+    db = FakeSession([4, 5, 6, 7])
+    
+    key = _order_key_after(db, chapter(5, 1000))
+    
+    assert len(db.statements) == 1  # The respacing UPDATE
+    # Chapter 5 is now second (2 * ORDER_GAP) and chapter 6 third, with room between them
+    assert 2 * ORDER_GAP < key < 3 * ORDER_GAP
@@ -0,0 +1,56 @@
+import random
+import string
+import pytest
+from bson import Binary
+from app.services.chapter_service import chapter_content_fields, paginate_body
+from app.utils import content_codec
+from app.utils.content_codec import (
+    BODY_FORMAT_PLAIN, BODY_FORMAT_ZLIB, BODY_FORMAT_ZLIB_PAGES, decode_body, decode_page, encode_body
+)
+
+LONG_BODY = "".join(f"<p>Paragraph {i}: the river carried every sorrow downstream, café naïve.</p>\n" for i in range(400))
+
+
+def test_small_bodies_stay_plain():
+    assert encode_body("<p>Short</p>") == {"body": "<p>Short</p>", "body_format": BODY_FORMAT_PLAIN}
+
+
+def test_large_body_round_trips_compressed():
+    fields = encode_body(LONG_BODY)
+    assert fields["body_format"] == BODY_FORMAT_ZLIB
+    assert isinstance(fields["body"], Binary)
+    assert len(fields["body"]) < len(LONG_BODY.encode("utf-8"))
+    assert decode_body(fields) == LONG_BODY
+
+
+def test_incompressible_body_stays_plain(monkeypatch):
+    monkeypatch.setattr(content_codec.settings, "CONTENT_COMPRESSION_MIN_BYTES", 16)
+    # Short random text can't make up for zlib's header and checksum
+    body = "".join(random.Random(49).choices(string.ascii_letters + string.digits, k=24))
+    assert encode_body(body)["body_format"] == BODY_FORMAT_PLAIN
+
+
+def test_compression_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(content_codec.settings, "CONTENT_COMPRESSION_ENABLED", False)
+    assert encode_body(LONG_BODY)["body_format"] == BODY_FORMAT_PLAIN
+
+
+def test_paged_body_round_trips_and_each_page_decodes_alone():
+    fields = chapter_content_fields(LONG_BODY)
+    offsets = fields["page_offsets"]
+    assert fields["body_format"] == BODY_FORMAT_ZLIB_PAGES
+    assert len(fields["body"]) == len(offsets) > 1
+    assert decode_body(fields) == LONG_BODY
+    ends = [*offsets[1:], len(LONG_BODY)]
+    for page, start, end in zip(fields["body"], offsets, ends):
+        assert decode_page(page) == LONG_BODY[start:end]
+
+
+def test_documents_without_a_format_are_plain():
+    assert decode_body({"body": "<p>Old</p>"}) == "<p>Old</p>"
+    assert decode_body({}) == ""
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        decode_body({"body": "x", "body_format": "brotli-v9"})
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+from app.services.digest_service import digest_period, group_recipients, parse_genres
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+    
+    def filter(self, *criteria):
+        return self
+    
+    def order_by(self, *columns):
+        return self
+    
+    def yield_per(self, count):
+        return iter(self.rows)
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+    
+    def query(self, *columns):
+        return FakeQuery(self.rows)
+
+
+def test_period_is_the_last_complete_iso_week():
+    # Wednesday 2024-01-10: the last complete week ran Monday 1st to Monday 8th
+    key, start, end = digest_period(datetime(2024, 1, 10, 15, 30, tzinfo=timezone.utc))
+    assert key == "2024-W01"
+    assert start == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert end == datetime(2024, 1, 8, tzinfo=timezone.utc)
+
+
+def test_period_on_a_monday_covers_the_week_just_ended():
+    key, start, end = digest_period(datetime(2024, 1, 8, 0, 5, tzinfo=timezone.utc))
+    assert key == "2024-W01"
+    assert end == datetime(2024, 1, 8, tzinfo=timezone.utc)
+
+
+def test_genres_are_normalized():
+    assert parse_genres(" Fantasy,romance, fantasy ,,") == ("fantasy", "romance")
+    assert parse_genres(None) == ()
+
+
+def test_readers_with_the_same_genres_share_a_group():
+    db = FakeSession([
+        (1, "a@example.com", "Romance,Fantasy"),
+        (2, "b@example.com", "fantasy, romance"),
+        (3, "c@example.com", "horror"),
+        (4, "d@example.com", " , "),
+    ])
+    assert group_recipients(db, "2024-W01") == {
+        ("fantasy", "romance"): [(1, "a@example.com"), (2, "b@example.com")],
+        ("horror",): [(3, "c@example.com")],
+    }
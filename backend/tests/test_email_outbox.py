@@ -0,0 +1,80 @@
+import asyncio
+import httpx
+import pytest
+from app.services import email_outbox
+from app.utils.email_utils import BrevoTransport, EmailDeliveryError
+
+
+def brevo_error(status_code: int) -> EmailDeliveryError:
+    """The error BrevoTransport raises when the API answers with status_code"""
+    transport = httpx.MockTransport(lambda request: httpx.Response(status_code, text="nope"))
+    
+    async def send():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await BrevoTransport(client).send("reader@example.com", "Hi", "<p>Hi</p>")
+    
+    with pytest.raises(EmailDeliveryError) as excinfo:
+        asyncio.run(send())
+    return excinfo.value
+
+
+@pytest.mark.parametrize("status_code", [401, 403])
+def test_rejected_api_key_is_a_config_error(status_code):
+    error = brevo_error(status_code)
+    assert error.config and not error.permanent
+
+
+def test_bad_request_is_permanent():
+    error = brevo_error(400)
+    assert error.permanent and not error.config
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 503])
+def test_rate_limits_and_server_errors_are_retried(status_code):
+    error = brevo_error(status_code)
+    assert not error.permanent and not error.config
+
+
+def test_retry_delay_backs_off_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(email_outbox.settings, "EMAIL_RETRY_BASE_SECONDS", 30.0)
+    monkeypatch.setattr(email_outbox.settings, "EMAIL_RETRY_MAX_SECONDS", 3600.0)
+    for attempts, expected in [(1, 30), (2, 60), (4, 240), (20, 3600)]:
+        delay = email_outbox._retry_delay(attempts)
+        assert 0.8 * expected <= delay <= 1.2 * expected
+
+
+class FakeSession:
+    """Records the values of each UPDATE the outbox sender issues"""
+    
+    def __init__(self):
+        self.updates = {}
+    
+    def execute(self, statement):
+        params = statement.compile().params
+        self.updates[params["id_1"]] = params
+    
+    def commit(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+def test_results_settle_or_reschedule_each_message(monkeypatch):
+    db = FakeSession()
+    monkeypatch.setattr(email_outbox, "SessionLocal", lambda: db)
+    monkeypatch.setattr(email_outbox.settings, "EMAIL_MAX_ATTEMPTS", 3)
+    
+    email_outbox._record_results([
+        ((1, "a@example.com", "s", "<p/>", 1), None),
+        ((2, "b@example.com", "s", "<p/>", 1), EmailDeliveryError("timeout")),
+        ((3, "c@example.com", "s", "<p/>", 1), EmailDeliveryError("bad address", permanent=True)),
+        ((4, "d@example.com", "s", "<p/>", 3), EmailDeliveryError("timeout")),
+        ((5, "e@example.com", "s", "<p/>", 3), EmailDeliveryError("bad key", config=True)),
+    ])
+    
+    statuses = {message_id: params["status"] for message_id, params in db.updates.items()}
+    assert statuses == {1: "sent", 2: "pending", 3: "failed", 4: "failed", 5: "pending"}
+    # Settled messages drop their HTML, which may hold a reset token
+    assert db.updates[1]["html_content"] == db.updates[3]["html_content"] == ""
+    assert "html_content" not in db.updates[2]
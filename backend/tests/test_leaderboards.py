@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+from app.models.post import Post
+from app.services import leaderboard_service
+from app.services.leaderboard_service import (
+    AUTHORS_BY_ENGAGEMENT, AUTHORS_BY_POSTS, POSTS_ALL_TIME, record_post_engagement, seed_leaderboards
+)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+    
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+    
+    async def execute(self):
+        for name, args, kwargs in self.calls:
+            await getattr(self.redis, name)(*args, **kwargs)
+
+
+class FakeRedis:
+    """The sorted-set and key commands the leaderboards use"""
+    
+    def __init__(self):
+        self.zsets = {}
+        self.keys = {}
+    
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+    
+    async def zincrby(self, key, amount, member):
+        board = self.zsets.setdefault(key, {})
+        board[member] = board.get(member, 0) + amount
+    
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+    
+    async def zrem(self, key, member):
+        self.zsets.get(key, {}).pop(member, None)
+    
+    async def expire(self, key, seconds):
+        pass
+    
+    async def delete(self, key):
+        self.zsets.pop(key, None)
+        self.keys.pop(key, None)
+    
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = value
+        return True
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+    
+    def filter(self, *criteria):
+        return self
+    
+    def group_by(self, *columns):
+        return self
+    
+    def all(self):
+        return self.rows
+    
+    def yield_per(self, count):
+        return self.rows
+
+
+class FakeSession:
+    """Answers seed_leaderboards' author query, then its post query"""
+    
+    def __init__(self, author_rows, post_rows):
+        self.results = [author_rows, post_rows]
+    
+    def query(self, *columns):
+        return FakeQuery(self.results.pop(0))
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(leaderboard_service, "get_redis", lambda: fake)
+    monkeypatch.setattr(leaderboard_service, "is_redis_available", lambda: True)
+    return fake
+
+
+def all_time_scores(redis) -> dict:
+    return {
+        board: dict(redis.zsets.get(leaderboard_service._board_key(board), {}))
+        for board in (AUTHORS_BY_POSTS, AUTHORS_BY_ENGAGEMENT, POSTS_ALL_TIME)
+    }
+
+
+def seed(author_rows, post_rows):
+    assert asyncio.run(seed_leaderboards(FakeSession(author_rows, post_rows)))
+
+
+def test_like_on_unlisted_post_leaves_scores_unchanged_across_reconcile(redis):
+    # Author 7 has one public post (1) with 5 engagement and one unlisted post (2)
+    seed([(7, 1, 5)], [(1, 5)])
+    seeded = all_time_scores(redis)
+    
+    asyncio.run(record_post_engagement(Post(id=2, author_id=7, visibility="unlisted"), 1))
+    assert all_time_scores(redis) == seeded
+    
+    # The unlisted like didn't touch the public counts, so re-seeding agrees
+    seed([(7, 1, 5)], [(1, 5)])
+    assert all_time_scores(redis) == seeded
+
+
+def test_like_on_public_post_matches_reseed(redis):
+    seed([(7, 1, 5)], [(1, 5)])
+    
+    asyncio.run(record_post_engagement(Post(id=1, author_id=7, visibility="public"), 1))
+    incremented = all_time_scores(redis)
+    assert incremented[POSTS_ALL_TIME] == {"1": 6}
+    assert incremented[AUTHORS_BY_ENGAGEMENT] == {"7": 6}
+    
+    seed([(7, 1, 6)], [(1, 6)])
+    assert all_time_scores(redis) == incremented
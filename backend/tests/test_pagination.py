@@ -0,0 +1,51 @@
+import random
+from app.services.chapter_service import paginate_body
+
+
+def pages(body: str, offsets: list) -> list:
+    return [body[start:end] for start, end in zip(offsets, [*offsets[1:], len(body)])]
+
+
+def test_short_body_is_one_page():
+    assert paginate_body("<p>Hello</p>", page_chars=100) == [0]
+    assert paginate_body("", page_chars=100) == [0]
+
+
+def test_pages_cover_the_body_and_break_after_block_elements():
+    body = "".join(f"<p>{'word ' * random.Random(i).randint(5, 40)}</p>" for i in range(200))
+    offsets = paginate_body(body, page_chars=500)
+    
+    assert offsets[0] == 0
+    assert offsets == sorted(set(offsets))
+    assert "".join(pages(body, offsets)) == body
+    for page in pages(body, offsets)[:-1]:
+        assert 250 <= len(page) <= 500
+        assert page.endswith("</p>")
+
+
+def test_falls_back_to_line_breaks_then_spaces():
+    body = "line of text<br>" * 100
+    for page in pages(body, paginate_body(body, page_chars=200))[:-1]:
+        assert page.endswith("<br>")
+    
+    body = "word " * 500
+    for page in pages(body, paginate_body(body, page_chars=200))[:-1]:
+        assert page.endswith(" ")
+
+
+def test_hard_cut_never_splits_a_tag():
+    body = ("x" * 150 + '<img src="a.png">') * 20
+    for page in pages(body, paginate_body(body, page_chars=100)):
+        assert page.count("<") == page.count(">")
+
+
+def test_offsets_are_code_points():
+    body = "é" * 2500 + "<p>done</p>"
+    offsets = paginate_body(body, page_chars=1000)
+    assert "".join(pages(body, offsets)) == body
+    assert all(offset <= len(body) for offset in offsets)
+
+
+def test_same_body_always_splits_the_same_way():
+    body = "<p>" + "sentence here. " * 1000 + "</p>"
+    assert paginate_body(body, page_chars=700) == paginate_body(body, page_chars=700)
@@ -0,0 +1,31 @@
+import asyncio
+import time
+import pytest
+from app.utils import process_pool
+from app.utils.process_pool import run_cpu_bound, shutdown_analytics_executor
+
+
+@pytest.fixture
+def single_worker_pool(monkeypatch):
+    monkeypatch.setattr(process_pool.settings, "ANALYTICS_WORKERS", 1)
+    monkeypatch.setattr(process_pool.settings, "ANALYTICS_TASK_TIMEOUT_SECONDS", 5.0)
+    shutdown_analytics_executor()
+    yield
+    shutdown_analytics_executor()
+
+
+def test_timed_out_task_does_not_block_the_next_call(single_worker_pool):
+    async def run():
+        # Warm the pool up so worker start-up doesn't count against the timeout
+        assert await run_cpu_bound(abs, -1) == 1
+        process_pool.settings.ANALYTICS_TASK_TIMEOUT_SECONDS = 0.5
+        with pytest.raises(asyncio.TimeoutError):
+            await run_cpu_bound(time.sleep, 60)
+        
+        # The only worker was busy with the abandoned sleep; it must have been replaced
+        process_pool.settings.ANALYTICS_TASK_TIMEOUT_SECONDS = 5.0
+        started = time.perf_counter()
+        assert await run_cpu_bound(abs, -2) == 2
+        return time.perf_counter() - started
+    
+    assert asyncio.run(run()) < 5.0
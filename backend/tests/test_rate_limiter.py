@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from typing import Optional
+from fastapi import HTTPException
+from starlette.requests import Request
+from app.middleware import rate_limiter
+from app.middleware.rate_limiter import RateLimitPolicy, check_rate_limit, get_client_ip
+
+
+def make_request(peer: str, forwarded_for: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (peer, 12345)})
+
+
+def test_direct_client_uses_peer_address():
+    assert get_client_ip(make_request("203.0.113.7")) == "203.0.113.7"
+
+
+def test_forwarded_header_from_trusted_proxy_gives_client_address():
+    request = make_request("10.1.2.3", "198.51.100.20, 10.4.5.6")
+    assert get_client_ip(request) == "198.51.100.20"
+
+
+def test_spoofed_leftmost_hop_is_ignored():
+    # The client sent its own X-Forwarded-For; the proxy appended the real address
+    request = make_request("10.1.2.3", "1.2.3.4, 198.51.100.20")
+    assert get_client_ip(request) == "198.51.100.20"
+
+
+def test_forwarded_header_from_untrusted_peer_is_ignored():
+    request = make_request("203.0.113.7", "198.51.100.20")
+    assert get_client_ip(request) == "203.0.113.7"
+
+
+@pytest.fixture
+def local_limiter(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "is_redis_available", lambda: False)
+    monkeypatch.setattr(rate_limiter, "_local_counts", {})
+    monkeypatch.setattr(rate_limiter, "_local_pruned_at", 0.0)
+    # Pruning looks the window up by policy name
+    monkeypatch.setitem(rate_limiter.POLICIES, "test", RateLimitPolicy("test", limit=10, window=60))
+    clock = {"now": 600.0}  # Start of a 60s window
+    monkeypatch.setattr(rate_limiter.time, "time", lambda: clock["now"])
+    return clock
+
+
+def attempt(policy: RateLimitPolicy) -> Optional[HTTPException]:
+    try:
+        asyncio.run(check_rate_limit(policy, "203.0.113.7"))
+    except HTTPException as e:
+        return e
+    return None
+
+
+def test_limit_is_enforced_with_retry_after(local_limiter):
+    policy = RateLimitPolicy("test", limit=10, window=60)
+    assert all(attempt(policy) is None for _ in range(10))
+    
+    rejected = attempt(policy)
+    assert rejected.status_code == 429
+    assert 1 <= int(rejected.headers["Retry-After"]) <= 120
+
+
+def test_previous_window_slides_out_gradually(local_limiter):
+    policy = RateLimitPolicy("test", limit=10, window=60)
+    for _ in range(10):
+        attempt(policy)
+    
+    # Just into the next window the previous one still weighs 59/60: 9.8 leaves room for one
+    local_limiter["now"] = 661.0
+    assert attempt(policy) is None
+    assert attempt(policy) is not None
+    
+    # Halfway through it weighs 5, so four more fit beside the one already counted
+    local_limiter["now"] = 690.0
+    assert all(attempt(policy) is None for _ in range(4))
+    assert attempt(policy) is not None
+
+
+def test_clients_are_limited_separately(local_limiter):
+    policy = RateLimitPolicy("test", limit=1, window=60)
+    assert attempt(policy) is None
+    asyncio.run(check_rate_limit(policy, "198.51.100.20"))
+    assert attempt(policy) is not None
+
+
+def test_rejected_requests_are_not_counted(local_limiter):
+    policy = RateLimitPolicy("test", limit=2, window=60)
+    for _ in range(20):
+        attempt(policy)
+    # Only the two allowed requests weigh on the next window
+    local_limiter["now"] = 690.0
+    assert attempt(policy) is None
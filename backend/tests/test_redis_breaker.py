@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from app.database import redis as breaker
+from app.database.redis import CLOSED, HALF_OPEN, OPEN
+
+
+@pytest.fixture(autouse=True)
+def closed_circuit(monkeypatch):
+    monkeypatch.setattr(breaker, "_state", CLOSED)
+    monkeypatch.setattr(breaker, "_consecutive_failures", 0)
+    monkeypatch.setattr(breaker, "_probe_delay", 0.0)
+    monkeypatch.setattr(breaker, "_metrics", {
+        **breaker._metrics, "transitions": {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}, "failures": 0
+    })
+    monkeypatch.setattr(breaker.settings, "REDIS_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(breaker.settings, "REDIS_PROBE_MIN_SECONDS", 1.0)
+    monkeypatch.setattr(breaker.settings, "REDIS_PROBE_MAX_SECONDS", 60.0)
+
+
+def fail():
+    breaker.record_redis_failure(RedisConnectionError("Connection refused"))
+
+
+def test_consecutive_failures_open_the_circuit():
+    fail()
+    fail()
+    assert breaker._state == CLOSED
+    fail()
+    assert breaker._state == OPEN
+    assert breaker._probe_delay == 1.0
+
+
+def test_scattered_failures_between_successes_keep_it_closed():
+    for _ in range(10):
+        fail()
+        fail()
+        breaker._record_command_success()
+    assert breaker._state == CLOSED
+    assert breaker._metrics["failures"] == 20
+
+
+def test_failed_probe_reopens_with_longer_backoff_and_success_closes():
+    for _ in range(3):
+        fail()
+    breaker._set_state(HALF_OPEN)
+    fail()
+    assert breaker._state == OPEN
+    assert breaker._probe_delay == 2.0
+    
+    breaker._set_state(HALF_OPEN)
+    breaker._record_success()
+    assert breaker._state == CLOSED
+    assert breaker._probe_delay == 0.0
+    assert breaker._metrics["transitions"] == {CLOSED: 1, OPEN: 2, HALF_OPEN: 2}
+
+
+def test_pool_exhaustion_is_not_a_server_failure():
+    for _ in range(5):
+        breaker._record_command_error(RedisConnectionError("Too many connections"))
+    assert breaker._state == CLOSED
+    assert breaker._consecutive_failures == 0
+
+
+def test_pipeline_failures_are_counted():
+    # Nothing listens on port 1, so every connection attempt is refused
+    client = breaker._MonitoredRedis(host="127.0.0.1", port=1, socket_connect_timeout=0.5)
+    
+    async def run():
+        for _ in range(3):
+            pipe = client.pipeline(transaction=False)
+            pipe.get("key")
+            with pytest.raises(RedisConnectionError):
+                await pipe.execute()
+        await client.aclose()
+    
+    asyncio.run(run())
+    assert breaker._state == OPEN
@@ -0,0 +1,88 @@
+import random
+from app.utils.text_stats import (
+    EMOTION_KEYWORDS, EMOTION_NAMES, SKETCH_SIZE, build_automaton, build_sketch, compute_text_stats,
+    estimate_unique_terms, match_emotions, merge_text_stats, term_hash
+)
+
+
+def naive_emotion_hits(word: str) -> list:
+    """Every (possibly overlapping) keyword occurrence in a word, by brute force"""
+    hits = []
+    for index, emotion in enumerate(EMOTION_NAMES):
+        for keyword in EMOTION_KEYWORDS[emotion]:
+            hits.extend([index] * sum(1 for start in range(len(word)) if word.startswith(keyword, start)))
+    return sorted(hits)
+
+
+def test_counts_words_terms_and_sentences():
+    stats = compute_text_stats("<p>The cat sat. The <b>do</b>g ran!</p><p>Go</p>")
+    
+    assert stats["word_count"] == 7
+    assert stats["term_count"] == 6  # "Go" is too short to be a term
+    assert stats["sentence_count"] == 3
+    assert stats["sentence_length_hist"] == {"3": 2, "1": 1}
+    # Tags split no words, and stop words are left out of the top terms
+    assert stats["top_terms"] == {"cat": 1, "sat": 1, "dog": 1, "ran": 1}
+
+
+def test_empty_body():
+    stats = compute_text_stats("")
+    assert stats["word_count"] == stats["sentence_count"] == 0
+    assert stats["unique_terms_sketch"] == []
+
+
+def test_emotion_matcher_agrees_with_brute_force():
+    rng = random.Random(28)
+    keywords = [keyword for keywords in EMOTION_KEYWORDS.values() for keyword in keywords]
+    words = ["unhappy", "cheerful", "sadness", "madness", "tearful", "surefire", "sadmadsad", "xyz"]
+    for _ in range(500):
+        # Keywords glued to each other and to noise exercise the failure links
+        parts = rng.choices(keywords + list("aeiourst"), k=rng.randint(1, 5))
+        words.append("".join(parts))
+    
+    for word in words:
+        assert sorted(match_emotions(word)) == naive_emotion_hits(word), word
+
+
+def test_automaton_reports_keywords_that_end_inside_longer_ones():
+    goto, fail, output = build_automaton([("she", 0), ("he", 1), ("hers", 2)])
+    state, hits = 0, []
+    for char in "ushers":
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+        hits.extend(output[state])
+    assert sorted(hits) == [0, 1, 2]
+
+
+def test_emotion_counts_weight_repeated_words():
+    stats = compute_text_stats("Happy happy day. I was so sad, sadly.")
+    assert stats["emotion_counts"]["joy"] == 2
+    assert stats["emotion_counts"]["sadness"] == 2
+
+
+def test_sketch_is_exact_for_small_vocabularies():
+    terms = [f"term{chr(97 + i % 26)}{chr(97 + i // 26)}" for i in range(100)]
+    sketch = build_sketch(term_hash(term) for term in terms)
+    assert estimate_unique_terms(sketch) == 100
+
+
+def test_sketch_estimates_large_vocabularies():
+    rng = random.Random(31)
+    hashes = {rng.randrange(2 ** 32) for _ in range(50_000)}
+    sketch = build_sketch(hashes)
+    assert len(sketch) == SKETCH_SIZE
+    assert abs(estimate_unique_terms(sketch) - len(hashes)) / len(hashes) < 0.2
+
+
+def test_merging_per_post_stats_matches_the_combined_text():
+    first = "<p>Joyful readers smile at every chapter.</p>"
+    second = "<p>Grief and fear fill the second story, and readers cry.</p>"
+    merged = merge_text_stats([compute_text_stats(first), compute_text_stats(second)])
+    combined = compute_text_stats(first + second)
+    
+    assert merged["post_count"] == 2
+    for key in ("word_count", "term_count", "sentence_count", "sentence_words", "emotion_counts"):
+        assert merged[key] == combined[key], key
+    assert merged["unique_terms_sketch"] == combined["unique_terms_sketch"]
+    assert merged["top_terms"]["readers"] == 2
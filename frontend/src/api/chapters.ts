@@ -21,7 +21,8 @@ export interface ChapterWithContent extends Chapter {
 
 export interface ChapterCreate {
   title: string
-  order: number
+  order?: number // Appended to the book when neither order nor after_chapter_id is given
+  after_chapter_id?: number
   content: ChapterContent
 }
 
@@ -57,5 +58,12 @@ export const chaptersApi = {
   deleteChapter: async (chapterId: number): Promise<void> => {
     await axiosClient.delete(`/api/v1/chapters/${chapterId}`)
   },
+
+  reorderChapters: async (postId: number, chapterIds: number[]): Promise<Chapter[]> => {
+    const response = await axiosClient.put(`/api/v1/books/${postId}/chapter-order`, {
+      chapter_ids: chapterIds
+    })
+    return response.data
+  },
 }
 
@@ -1,5 +1,7 @@
 import axiosClient from './axiosClient'
 
+const ANALYTICS_POLL_INTERVAL_MS = 1500
+
 export interface User {
   id: number
   email: string
@@ -39,7 +41,26 @@ export const usersApi = {
 
   getUserAnalytics: async (username: string) => {
     const response = await axiosClient.get(`/api/v1/users/${username}/analytics`)
-    return response.data
+    if (response.status !== 202) {
+      return response.data
+    }
+
+    // Analytics are being computed in the background: poll the job, then fetch the result
+    let jobId = response.data.job_id
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, ANALYTICS_POLL_INTERVAL_MS))
+      const job = await axiosClient.get(`/api/v1/analytics/jobs/${jobId}`)
+      if (job.data.status === 'failed') {
+        throw new Error(job.data.error || 'Analytics computation failed')
+      }
+      if (job.data.status === 'done') {
+        const result = await axiosClient.get(`/api/v1/users/${username}/analytics`)
+        if (result.status !== 202) {
+          return result.data
+        }
+        jobId = result.data.job_id
+      }
+    }
   },
 }
 
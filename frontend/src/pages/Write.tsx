@@ -244,27 +244,33 @@ export default function Write() {
           }
 
           // Update or create chapters
+          const chapterIds: number[] = []
           for (const chapter of chapters) {
             if (chapter.id) {
               // Update existing chapter
               await chaptersApi.updateChapter(chapter.id, {
                 title: chapter.title,
-                order: chapter.order,
                 content: {
                   body: chapter.content
                 }
               })
+              chapterIds.push(chapter.id)
             } else {
               // Create new chapter
-              await chaptersApi.createChapter(post.id, {
+              const created = await chaptersApi.createChapter(post.id, {
                 title: chapter.title,
-                order: chapter.order,
                 content: {
                   body: chapter.content
                 }
               })
+              chapterIds.push(created.id)
             }
           }
+
+          // Apply the editor's order in one request
+          if (chapterIds.length > 0) {
+            await chaptersApi.reorderChapters(post.id, chapterIds)
+          }
         }
 
         if (visibility === 'public') {
@@ -293,9 +299,9 @@ export default function Write() {
         // If it's a book, create chapters
         if (contentType === 'book' && chapters.length > 0) {
           for (const chapter of chapters) {
+            // Created in sequence, so each one is appended after the last
             await chaptersApi.createChapter(post.id, {
               title: chapter.title,
-              order: chapter.order,
               content: {
                 body: chapter.content
               }
@@ -495,7 +501,7 @@ export default function Write() {
                         <div className="flex items-center gap-3">
                           <GripVertical className="w-5 h-5 text-amber-600" />
                           <span className="font-semibold text-amber-900">
-                            Chapter {chapter.order}: {chapter.title || 'Untitled'}
+                            Chapter {index + 1}: {chapter.title || 'Untitled'}
                           </span>
                         </div>
                         <button